@@ -0,0 +1,267 @@
+"""
+ALMACÉN DE RESULTADOS EN SQLITE
+Guarda partidas y respuestas en una base de datos de solo anexado (una
+transacción por partida) y exporta a Excel solo cuando se pide
+
+ARCHIVO: almacen_resultados.py
+
+USO DESDE CONSOLA:
+    python almacen_resultados.py exportar [archivo.xlsx]
+    python almacen_resultados.py ranking [principiante|avanzado|todos] [desde AAAA-MM-DD] [hasta AAAA-MM-DD]
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import json
+import os
+import sqlite3
+import sys
+
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+ARCHIVO_BASE_DATOS = "resultados_caries.db"
+ARCHIVO_EXCEL = "datos_juego_caries.xlsx"
+ARCHIVO_RANKING_ANTIGUO = "ranking.json"
+TAMANO_RANKING = 10
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    hora TEXT NOT NULL,
+    jugador TEXT NOT NULL,
+    experiencia TEXT,
+    puntos INTEGER NOT NULL,
+    precision REAL NOT NULL,
+    vidas INTEGER,
+    racha_maxima INTEGER,
+    tiempo_total INTEGER,
+    preguntas INTEGER,
+    aciertos INTEGER
+);
+CREATE TABLE IF NOT EXISTS respuestas (
+    id INTEGER PRIMARY KEY,
+    partida_id INTEGER REFERENCES partidas(id),
+    fecha TEXT NOT NULL,
+    jugador TEXT NOT NULL,
+    pregunta INTEGER,
+    imagen TEXT,
+    dificultad TEXT,
+    correcto INTEGER,
+    precision REAL,
+    puntos INTEGER,
+    tiempo REAL
+);
+CREATE INDEX IF NOT EXISTS idx_partidas_puntos ON partidas(puntos DESC);
+CREATE INDEX IF NOT EXISTS idx_partidas_experiencia_puntos ON partidas(experiencia, puntos DESC);
+CREATE INDEX IF NOT EXISTS idx_partidas_fecha ON partidas(fecha);
+CREATE INDEX IF NOT EXISTS idx_respuestas_partida ON respuestas(partida_id);
+"""
+
+COLUMNAS_PARTIDA = ['fecha', 'hora', 'jugador', 'experiencia', 'puntos', 'precision', 'vidas',
+                    'racha_maxima', 'tiempo_total', 'preguntas', 'aciertos']
+COLUMNAS_RESPUESTA = ['fecha', 'jugador', 'pregunta', 'imagen', 'dificultad', 'correcto',
+                      'precision', 'puntos', 'tiempo']
+
+# Hojas del Excel: (nombre, cabeceras) con el mismo formato que el libro original
+HOJAS_EXCEL = [
+    ('Partidas', ['Fecha', 'Hora', 'Jugador', 'Experiencia', 'Puntos', 'Precisión %', 'Vidas Restantes', 'Racha Máxima', 'Tiempo Total (seg)', 'Preguntas Totales', 'Aciertos']),
+    ('Respuestas', ['Fecha', 'Jugador', 'Pregunta #', 'Imagen', 'Dificultad', 'Correcto', 'Precisión %', 'Puntos', 'Tiempo (seg)']),
+    ('Ranking', ['Posición', 'Jugador', 'Puntos', 'Precisión %', 'Experiencia', 'Fecha'])
+]
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def ajustar_fila(fila, columnas):
+    """Recorta o rellena con None una fila de Excel hasta `columnas` valores"""
+    fila = tuple(fila[:columnas])
+    return fila + (None,) * (columnas - len(fila))
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class AlmacenResultados:
+    """
+    Base de datos SQLite con las partidas jugadas.
+
+    Terminar una partida es un INSERT en una sola transacción, así que el
+    coste no depende de cuántas partidas haya guardadas, y un cierre
+    inesperado solo puede perder la partida en curso, nunca el historial.
+    """
+
+    def __init__(self, ruta=ARCHIVO_BASE_DATOS):
+        nueva = not os.path.exists(ruta)
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+        if nueva and os.path.exists(ARCHIVO_EXCEL):
+            self.importar_excel(ARCHIVO_EXCEL)
+        if os.path.exists(ARCHIVO_RANKING_ANTIGUO):
+            self.importar_ranking_json(ARCHIVO_RANKING_ANTIGUO)
+
+    def guardar_partida(self, partida, respuestas):
+        """
+        Guarda una partida y sus respuestas en una sola transacción.
+        partida: dict con COLUMNAS_PARTIDA; respuestas: lista de dicts con COLUMNAS_RESPUESTA
+        Devuelve el id de la partida.
+        """
+        with self.conexion:
+            cursor = self.conexion.execute(
+                f"INSERT INTO partidas ({', '.join(COLUMNAS_PARTIDA)}) VALUES ({', '.join('?' * len(COLUMNAS_PARTIDA))})",
+                [partida[c] for c in COLUMNAS_PARTIDA])
+            partida_id = cursor.lastrowid
+            self.conexion.executemany(
+                f"INSERT INTO respuestas (partida_id, {', '.join(COLUMNAS_RESPUESTA)}) VALUES (?, {', '.join('?' * len(COLUMNAS_RESPUESTA))})",
+                [[partida_id] + [r[c] for c in COLUMNAS_RESPUESTA] for r in respuestas])
+        return partida_id
+
+    def ranking(self, limite=TAMANO_RANKING, experiencia=None, desde=None, hasta=None):
+        """
+        Mejores `limite` partidas por puntos, sin cargar el resto del historial.
+        experiencia: 'principiante' / 'avanzado' o None para todas
+        desde, hasta: fechas 'AAAA-MM-DD' incluidas, o None para no acotar
+        Con experiencia se recorre idx_partidas_experiencia_puntos; sin ella,
+        idx_partidas_puntos (o idx_partidas_fecha si la ventana es estrecha).
+        Devuelve una lista de dicts con nombre, puntos, precision, experiencia y fecha.
+        """
+        condiciones = []
+        parametros = []
+        if experiencia is not None:
+            condiciones.append("experiencia = ?")
+            parametros.append(experiencia)
+        if desde is not None:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("fecha <= ?")
+            parametros.append(hasta)
+        donde = f"WHERE {' AND '.join(condiciones)} " if condiciones else ""
+        cursor = self.conexion.execute(
+            f"SELECT jugador, puntos, precision, experiencia, fecha || ' ' || substr(hora, 1, 5) FROM partidas "
+            f"{donde}ORDER BY puntos DESC, id LIMIT ?", parametros + [limite])
+        return [{'nombre': nombre, 'puntos': puntos, 'precision': precision, 'experiencia': exp, 'fecha': fecha}
+                for nombre, puntos, precision, exp, fecha in cursor]
+
+    def contar_partidas(self):
+        """Número de partidas guardadas"""
+        return self.conexion.execute("SELECT COUNT(*) FROM partidas").fetchone()[0]
+
+    def importar_excel(self, ruta_excel):
+        """Copia una sola vez el historial del libro Excel anterior a la base de datos"""
+        try:
+            libro = openpyxl.load_workbook(ruta_excel, read_only=True)
+            with self.conexion:
+                if 'Partidas' in libro.sheetnames:
+                    filas = [fila for fila in libro['Partidas'].iter_rows(min_row=2, values_only=True) if fila and fila[0] is not None]
+                    self.conexion.executemany(
+                        f"INSERT INTO partidas ({', '.join(COLUMNAS_PARTIDA)}) VALUES ({', '.join('?' * len(COLUMNAS_PARTIDA))})",
+                        [ajustar_fila(fila, len(COLUMNAS_PARTIDA)) for fila in filas])
+                if 'Respuestas' in libro.sheetnames:
+                    filas = [ajustar_fila(fila, len(COLUMNAS_RESPUESTA)) for fila in libro['Respuestas'].iter_rows(min_row=2, values_only=True) if fila and fila[0] is not None]
+                    self.conexion.executemany(
+                        f"INSERT INTO respuestas ({', '.join(COLUMNAS_RESPUESTA)}) VALUES ({', '.join('?' * len(COLUMNAS_RESPUESTA))})",
+                        [fila[:5] + (1 if fila[5] == 'SÍ' else 0,) + fila[6:] for fila in filas])
+            libro.close()
+            print(f"✅ Historial importado desde {ruta_excel}: {self.contar_partidas()} partidas")
+        except Exception as e:
+            print(f"⚠️  No se pudo importar {ruta_excel}: {e}")
+
+    def importar_ranking_json(self, ruta_json):
+        """
+        Incorpora el ranking.json de versiones anteriores (solo las entradas que
+        no estén ya en la base) y lo renombra para no volver a importarlo.
+        """
+        try:
+            with open(ruta_json, 'r', encoding='utf-8') as archivo:
+                entradas = json.load(archivo)
+            nuevas = 0
+            with self.conexion:
+                for entrada in entradas:
+                    fecha, _, hora = entrada.get('fecha', '').partition(' ')
+                    existe = self.conexion.execute(
+                        "SELECT 1 FROM partidas WHERE jugador = ? AND puntos = ? AND fecha = ? AND substr(hora, 1, 5) = ? LIMIT 1",
+                        (entrada['nombre'], entrada['puntos'], fecha, hora)).fetchone()
+                    if existe:
+                        continue
+                    self.conexion.execute(
+                        "INSERT INTO partidas (fecha, hora, jugador, experiencia, puntos, precision, racha_maxima) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (fecha, hora, entrada['nombre'], entrada.get('experiencia'), entrada['puntos'],
+                         entrada.get('precision', 0), entrada.get('racha_maxima')))
+                    nuevas += 1
+            os.replace(ruta_json, ruta_json + ".migrado")
+            print(f"✅ Ranking importado desde {ruta_json}: {nuevas} entradas nuevas")
+        except Exception as e:
+            print(f"⚠️  No se pudo importar {ruta_json}: {e}")
+    
+    def exportar_excel(self, ruta_excel=ARCHIVO_EXCEL):
+        """
+        Escribe todo el historial en un libro Excel nuevo. Usa el modo de solo
+        escritura de openpyxl (las filas van directas al disco) y reemplaza el
+        archivo al final, así un fallo a mitad no deja un libro corrupto.
+        """
+        libro = Workbook(write_only=True)
+        hojas = {}
+        for nombre, cabeceras in HOJAS_EXCEL:
+            hoja = libro.create_sheet(nombre)
+            fila = []
+            for cabecera in cabeceras:
+                celda = WriteOnlyCell(hoja, value=cabecera)
+                celda.font = Font(bold=True, color="FFFFFF")
+                celda.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+                celda.alignment = Alignment(horizontal="center", vertical="center")
+                fila.append(celda)
+            hoja.append(fila)
+            hojas[nombre] = hoja
+
+        for fila in self.conexion.execute(f"SELECT {', '.join(COLUMNAS_PARTIDA)} FROM partidas ORDER BY id"):
+            hojas['Partidas'].append(fila)
+        for fila in self.conexion.execute(f"SELECT {', '.join(COLUMNAS_RESPUESTA)} FROM respuestas ORDER BY id"):
+            fila = list(fila)
+            fila[5] = 'SÍ' if fila[5] else 'NO'
+            hojas['Respuestas'].append(fila)
+        for posicion, entrada in enumerate(self.ranking(), start=1):
+            hojas['Ranking'].append([posicion, entrada['nombre'], entrada['puntos'], entrada['precision'], entrada['experiencia'], entrada['fecha']])
+
+        temporal = ruta_excel + ".tmp"
+        libro.save(temporal)
+        os.replace(temporal, ruta_excel)
+        print(f"✅ Excel exportado: {ruta_excel}")
+        return ruta_excel
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos"""
+        self.conexion.close()
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "exportar":
+        almacen = AlmacenResultados()
+        almacen.exportar_excel(sys.argv[2] if len(sys.argv) > 2 else ARCHIVO_EXCEL)
+        almacen.cerrar()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "ranking":
+        experiencia = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "todos" else None
+        desde = sys.argv[3] if len(sys.argv) > 3 else None
+        hasta = sys.argv[4] if len(sys.argv) > 4 else None
+        almacen = AlmacenResultados()
+        for posicion, entrada in enumerate(almacen.ranking(TAMANO_RANKING, experiencia, desde, hasta), start=1):
+            print(f"#{posicion:<3} {entrada['nombre']:<20} {entrada['puntos']:>6}  {entrada['precision']}%  {entrada['experiencia']}  {entrada['fecha']}")
+        almacen.cerrar()
+    else:
+        print(__doc__)
@@ -0,0 +1,348 @@
+"""
+ARCHIVO EMPAQUETADO DEL DATASET
+Un solo archivo con un índice al principio (nombre -> posición, tamaño,
+dimensiones y etiqueta) seguido de las imágenes tal cual (PNG/JPG). Se
+abre con mmap: arrancar solo lee el índice y cada imagen se decodifica
+cuando se pide, sin abrir miles de archivos sueltos.
+
+Formato:
+    cabecera  "<8sQQ": MAGIA, bytes del índice, posición del primer blob
+    índice    JSON UTF-8 {"version", "entradas": [{"nombre", "offset",
+              "bytes", "ancho", "alto", "etiqueta"}]} (offset relativo al
+              primer blob; etiqueta es el registro del juego o null)
+    blobs     imágenes alineadas a ALINEACION bytes
+
+Uso:
+    python archivo_dataset.py empaquetar [carpeta] [etiquetas.json] [salida.niripak]
+    python archivo_dataset.py desempaquetar archivo.niripak [carpeta_destino]
+    python archivo_dataset.py bench [carpeta] [etiquetas.json] [archivo.niripak]
+
+ARCHIVO: archivo_dataset.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import pygame
+
+from escritor import temporal_junto_a
+from fusionar_etiquetas import leer_registros
+from manifiesto import (ValidadorDataset, analizar_imagen, cargar_manifiesto, entrada_al_dia, problemas_registro,
+                        recorrer_carpeta)
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+MAGIA = b"NIRIPAK1"
+CABECERA = struct.Struct("<8sQQ")
+VERSION_ARCHIVO = 1
+EXTENSION_ARCHIVO = ".niripak"  # imagenes/ -> imagenes.niripak
+ALINEACION = 4096  # Cada imagen empieza en su propia página
+IMAGENES_PARTIDA = 10  # Imágenes que el benchmark lee como "primera partida"
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def ruta_archivo(carpeta_imagenes):
+    """Archivo empaquetado que corresponde a una carpeta de imágenes"""
+    return os.path.normpath(carpeta_imagenes) + EXTENSION_ARCHIVO
+
+
+def ruta_imagen(carpeta, nombre):
+    """Ruta en disco de un nombre relativo con '/' (paciente/visita/imagen.png)"""
+    return os.path.join(carpeta, *nombre.split("/"))
+
+
+def _alinear(posicion):
+    return -(-posicion // ALINEACION) * ALINEACION
+
+
+def empaquetar(carpeta_imagenes, archivo_etiquetas=None, salida=None):
+    """
+    Empaqueta las imágenes legibles de la carpeta y la etiqueta vigente de
+    cada una. Las dimensiones salen del manifiesto (si no está al día se
+    valida antes), pero cada imagen se vuelve a comprobar con os.stat justo
+    antes de escribir el índice: la que cambió desde el manifiesto se
+    vuelve a analizar en vez de empaquetarse con datos viejos. Las
+    etiquetas con problemas se quedan fuera. Devuelve (ruta, número de
+    imágenes, número de etiquetas).
+    """
+    salida = salida or ruta_archivo(carpeta_imagenes)
+    manifiesto = cargar_manifiesto(carpeta_imagenes, archivo_etiquetas)
+    if manifiesto is None or manifiesto.get('etiquetas') != archivo_etiquetas:
+        validador = ValidadorDataset(carpeta_imagenes, archivo_etiquetas)
+        manifiesto = validador.validar()
+        validador.guardar(manifiesto)
+
+    # Imágenes sobrescritas después del manifiesto: tamaño, dimensiones y problemas nuevos
+    imagenes = dict(manifiesto['imagenes'])
+    reanalizadas = set()
+    for nombre, datos in manifiesto['imagenes'].items():
+        ruta = ruta_imagen(carpeta_imagenes, nombre)
+        if entrada_al_dia(datos, ruta):
+            continue
+        _, nuevos, error = analizar_imagen(ruta)
+        if error is None:
+            imagenes[nombre] = nuevos
+            reanalizadas.add(nombre)
+        else:
+            del imagenes[nombre]
+            print(f"⚠️  {nombre} ya no se puede leer y no se empaqueta: {error}")
+    if reanalizadas:
+        print(f"🔁 {len(reanalizadas)} imágenes cambiaron desde el manifiesto y se volvieron a analizar")
+
+    etiquetas = {}
+    if archivo_etiquetas is not None:
+        for registro in leer_registros(archivo_etiquetas):
+            if not isinstance(registro, dict) or registro.get('imageName') not in imagenes:
+                continue
+            nombre = registro['imageName']
+            if nombre in reanalizadas:
+                valida = not problemas_registro(registro, imagenes[nombre])
+            else:
+                valida = nombre not in manifiesto['problemas']
+            if valida:
+                etiquetas[nombre] = registro
+            else:
+                etiquetas.pop(nombre, None)  # La revisión vigente es la última del diario
+
+    entradas = []
+    posicion = 0
+    for nombre, datos in imagenes.items():
+        entradas.append({'nombre': nombre, 'offset': posicion, 'bytes': datos['bytes'],
+                         'ancho': datos['ancho'], 'alto': datos['alto'], 'etiqueta': etiquetas.get(nombre)})
+        posicion = _alinear(posicion + datos['bytes'])
+
+    indice = json.dumps({'version': VERSION_ARCHIVO, 'entradas': entradas},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    inicio_datos = _alinear(CABECERA.size + len(indice))
+
+    temporal = salida + ".tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(CABECERA.pack(MAGIA, len(indice), inicio_datos))
+        archivo.write(indice)
+        for entrada in entradas:
+            archivo.seek(inicio_datos + entrada['offset'])
+            with open(ruta_imagen(carpeta_imagenes, entrada['nombre']), 'rb') as imagen:
+                contenido = imagen.read()
+            if len(contenido) != entrada['bytes']:
+                raise ValueError(f"{entrada['nombre']} cambió durante el empaquetado")
+            archivo.write(contenido)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, salida)
+    return salida, len(entradas), len(etiquetas)
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class ArchivoDataset:
+    """
+    Lectura de un archivo empaquetado a través de mmap. Las lecturas no
+    modifican nada, así que se puede usar desde los hilos de precarga.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.archivo = open(ruta, 'rb')
+        try:
+            self.mapa = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            magia, bytes_indice, self.inicio_datos = CABECERA.unpack_from(self.mapa, 0)
+            if magia != MAGIA:
+                raise ValueError(f"{ruta} no es un archivo de dataset")
+            indice = json.loads(self.mapa[CABECERA.size:CABECERA.size + bytes_indice])
+            if indice.get('version') != VERSION_ARCHIVO:
+                raise ValueError(f"Versión de archivo no soportada: {indice.get('version')}")
+        except Exception:
+            self.archivo.close()
+            raise
+        self.entradas = {entrada['nombre']: entrada for entrada in indice['entradas']}
+
+    def __contains__(self, nombre):
+        return nombre in self.entradas
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def nombres(self):
+        """Nombres de las imágenes en el orden del índice"""
+        return list(self.entradas)
+
+    def registros(self):
+        """Etiquetas del juego de las imágenes etiquetadas"""
+        return [entrada['etiqueta'] for entrada in self.entradas.values() if entrada['etiqueta']]
+
+    def tamano(self, nombre):
+        """(ancho, alto) sin decodificar la imagen"""
+        entrada = self.entradas[nombre]
+        return entrada['ancho'], entrada['alto']
+
+    def leer_bytes(self, nombre):
+        """Contenido del archivo de imagen (solo se tocan sus páginas del mmap)"""
+        entrada = self.entradas[nombre]
+        inicio = self.inicio_datos + entrada['offset']
+        return self.mapa[inicio:inicio + entrada['bytes']]
+
+    def cargar(self, nombre):
+        """Decodifica `nombre`; sirve de cargador para CacheImagenes"""
+        return pygame.image.load(io.BytesIO(self.leer_bytes(nombre)), nombre)
+
+    def extraer(self, nombre, destino):
+        """Escribe la imagen en `destino` (temporal único y renombrado, como copiar_atomico)"""
+        descriptor, temporal = temporal_junto_a(destino)
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(self.leer_bytes(nombre))
+            os.chmod(temporal, 0o644)  # mkstemp lo crea solo para el dueño
+            os.replace(temporal, destino)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+
+    def cerrar(self):
+        self.mapa.close()
+        self.archivo.close()
+
+
+def desempaquetar(ruta, carpeta_destino):
+    """Recrea la carpeta de imágenes y su etiquetas_caries.json; devuelve cuántas imágenes escribió"""
+    archivo = ArchivoDataset(ruta)
+    try:
+        os.makedirs(carpeta_destino, exist_ok=True)
+        for nombre in archivo.nombres():
+            destino = ruta_imagen(carpeta_destino, nombre)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            archivo.extraer(nombre, destino)
+        ruta_etiquetas = os.path.join(os.path.dirname(os.path.abspath(carpeta_destino)), "etiquetas_caries.json")
+        temporal = ruta_etiquetas + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as salida:
+            json.dump(archivo.registros(), salida, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta_etiquetas)
+        return len(archivo)
+    finally:
+        archivo.cerrar()
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _olvidar_cache(rutas):
+    """Pide al sistema que suelte estas rutas de la caché de páginas (arranque en frío)"""
+    for ruta in rutas:
+        try:
+            descriptor = os.open(ruta, os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+                os.posix_fadvise(descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(descriptor)
+        except (OSError, AttributeError):
+            pass
+
+
+def _arranque_carpeta(carpeta, archivo_etiquetas):
+    """Lo que hace el juego con la carpeta: leer el JSON y abrir las imágenes de la primera partida"""
+    inicio = time.perf_counter()
+    with open(archivo_etiquetas, 'r', encoding='utf-8') as archivo:
+        datos = [dato for dato in json.load(archivo) if 'imageName' in dato]
+    listo = time.perf_counter()
+    for dato in datos[:IMAGENES_PARTIDA]:
+        pygame.image.load(ruta_imagen(carpeta, dato['imageName']))
+    return listo - inicio, time.perf_counter() - inicio
+
+
+def _arranque_archivo(ruta):
+    """Lo mismo con el archivo empaquetado"""
+    inicio = time.perf_counter()
+    archivo = ArchivoDataset(ruta)
+    datos = archivo.registros()
+    listo = time.perf_counter()
+    for dato in datos[:IMAGENES_PARTIDA]:
+        archivo.cargar(dato['imageName'])
+    total = time.perf_counter() - inicio
+    archivo.cerrar()
+    return listo - inicio, total
+
+
+def _lectura_completa_carpeta(carpeta, nombres):
+    """Recorre la carpeta y sus subcarpetas y lee las imágenes de `nombres` (las mismas que se empaquetaron)"""
+    inicio = time.perf_counter()
+    imagenes, _ = recorrer_carpeta(carpeta)
+    for nombre, ruta, _ in imagenes:
+        if nombre in nombres:
+            with open(ruta, 'rb') as archivo:
+                archivo.read()
+    return time.perf_counter() - inicio
+
+
+def _lectura_completa_archivo(ruta):
+    inicio = time.perf_counter()
+    archivo = ArchivoDataset(ruta)
+    for nombre in archivo.nombres():
+        archivo.leer_bytes(nombre)
+    archivo.cerrar()
+    return time.perf_counter() - inicio
+
+
+def benchmark(carpeta, archivo_etiquetas, ruta):
+    """Compara el arranque en frío con la carpeta y con el archivo empaquetado"""
+    # Las dos versiones cargan el mismo conjunto: las imágenes que empaquetar() metió en el archivo
+    archivo = ArchivoDataset(ruta)
+    nombres = set(archivo.nombres())
+    archivo.cerrar()
+    rutas_carpeta = [ruta_imagen(carpeta, nombre) for nombre in nombres] + [archivo_etiquetas]
+    print(f"📦 {len(nombres)} archivos sueltos frente a {ruta} ({os.path.getsize(ruta) / 1048576:.1f} MB)")
+    for descripcion, rutas, medir in (
+            ("Carpeta", rutas_carpeta, lambda: _arranque_carpeta(carpeta, archivo_etiquetas)),
+            ("Archivo", [ruta], lambda: _arranque_archivo(ruta))):
+        _olvidar_cache(rutas)
+        indice, partida = medir()
+        print(f"   {descripcion}: índice listo en {indice * 1000:7.1f} ms, "
+              f"{IMAGENES_PARTIDA} primeras imágenes en {partida * 1000:7.1f} ms")
+    for descripcion, rutas, medir in (
+            ("Carpeta", rutas_carpeta, lambda: _lectura_completa_carpeta(carpeta, nombres)),
+            ("Archivo", [ruta], lambda: _lectura_completa_archivo(ruta))):
+        _olvidar_cache(rutas)
+        print(f"   {descripcion}: lectura completa en frío {medir() * 1000:7.1f} ms")
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+if __name__ == "__main__":
+    orden = sys.argv[1] if len(sys.argv) > 1 else None
+    if orden == "empaquetar":
+        carpeta = sys.argv[2] if len(sys.argv) > 2 else "imagenes"
+        etiquetas = sys.argv[3] if len(sys.argv) > 3 else "etiquetas_caries.json"
+        if not os.path.exists(etiquetas):
+            print(f"⚠️  No se encontró {etiquetas}: se empaquetan solo las imágenes")
+            etiquetas = None
+        inicio = time.perf_counter()
+        ruta, imagenes, etiquetadas = empaquetar(carpeta, etiquetas, sys.argv[4] if len(sys.argv) > 4 else None)
+        print(f"✅ {ruta}: {imagenes} imágenes, {etiquetadas} etiquetas "
+              f"({os.path.getsize(ruta) / 1048576:.1f} MB, {time.perf_counter() - inicio:.1f} s)")
+    elif orden == "desempaquetar" and len(sys.argv) > 2:
+        destino = sys.argv[3] if len(sys.argv) > 3 else "imagenes"
+        print(f"✅ {desempaquetar(sys.argv[2], destino)} imágenes extraídas en {destino}/")
+    elif orden == "bench":
+        carpeta = sys.argv[2] if len(sys.argv) > 2 else "imagenes"
+        etiquetas = sys.argv[3] if len(sys.argv) > 3 else "etiquetas_caries.json"
+        ruta = sys.argv[4] if len(sys.argv) > 4 else ruta_archivo(carpeta)
+        benchmark(carpeta, etiquetas, ruta)
+    else:
+        print(__doc__)
@@ -0,0 +1,270 @@
+"""
+MAPA DE BORDES PARA EL ETIQUETADO MAGNÉTICO
+Al cargar una imagen se calcula una vez (con NumPy sobre pygame.surfarray)
+su luminancia suavizada y la magnitud de su gradiente. Con ellas los
+vértices que se marcan se ajustan al borde más fuerte cercano, sobre una
+rejilla reducida de costes se trazan caminos que siguen los bordes entre
+dos vértices (live-wire) y, con un solo click, se hace crecer una región
+de luminancia parecida y se convierte su contorno en polígono.
+
+ARCHIVO: bordes.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import heapq
+import math
+from array import array
+
+import numpy as np
+import pygame
+
+from piramide import preparar_para_suavizado
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+CELDAS_MAXIMAS = 160  # Celdas del lado largo de la rejilla de costes del live-wire
+PERCENTIL_REFERENCIA = 99.95  # Magnitud que pasa a valer 255
+UMBRAL_BORDE = 40  # Magnitud (0-255) por debajo de la cual no se ajusta el punto
+PENALIZACION_DISTANCIA = 64  # Magnitud que se resta a un candidato en el borde del radio de búsqueda
+COSTE_MINIMO = 0.05  # Coste de una celda sobre el borde más fuerte (el de una celda plana es 1)
+SIMPLIFICACION_CONTORNO = 1.5  # Distancia máxima (píxeles) del polígono simplificado al contorno de la región
+FRACCION_MAXIMA_REGION = 0.5  # Una región más grande se ha desbordado al fondo: no se convierte en polígono
+AREA_MINIMA_REGION = 16  # Píxeles
+
+# Vecinos de una celda en la rejilla con borde: (desplazamiento en columnas, en filas, longitud)
+VECINOS = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+           (-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2))]
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def luminancia_suavizada(superficie):
+    """
+    Luminancia con un suavizado binomial 5x5 separable ([1, 4, 6, 4, 1] / 16)
+    contra el ruido del sensor, en un array uint8 con el orden de
+    pygame.surfarray: luminancia[x, y].
+    """
+    gris = pygame.transform.grayscale(preparar_para_suavizado(superficie))
+    canal = pygame.surfarray.pixels_red(gris)
+    luminancia = np.asarray(canal, dtype=np.int16)
+    del canal  # Libera el bloqueo de la superficie
+
+    for eje in (0, 1):
+        ampliada = np.pad(luminancia, [(2, 2) if e == eje else (0, 0) for e in (0, 1)], mode='edge')
+        corte = [slice(None), slice(None)]
+        partes = []
+        for inicio in range(5):
+            corte[eje] = slice(inicio, inicio + luminancia.shape[eje])
+            partes.append(ampliada[tuple(corte)])
+        luminancia = (partes[0] + 4 * partes[1] + 6 * partes[2] + 4 * partes[3] + partes[4] + 8) // 16
+    return luminancia.astype(np.uint8)
+
+
+def magnitud_bordes(luminancia):
+    """
+    Magnitud del gradiente (Sobel, norma L1) de la luminancia, en uint8 y
+    con el mismo orden [x, y]. Se normaliza con el percentil
+    PERCENTIL_REFERENCIA para que el umbral valga igual en imágenes claras u
+    oscuras; los bordes ocupan pocos píxeles, así que el percentil tiene que
+    ser alto para no tomar el ruido como escala.
+    """
+    p = np.pad(luminancia.astype(np.int16), 1, mode='edge')
+    gx = (p[2:, :-2] + 2 * p[2:, 1:-1] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[:-2, 1:-1] + p[:-2, 2:])
+    gy = (p[:-2, 2:] + 2 * p[1:-1, 2:] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[1:-1, :-2] + p[2:, :-2])
+    magnitud = np.abs(gx) + np.abs(gy)
+    del gx, gy, p
+
+    referencia = max(float(np.percentile(magnitud[::2, ::2], PERCENTIL_REFERENCIA)), 1.0)
+    return np.minimum(magnitud.astype(np.float32) * (255.0 / referencia), 255).astype(np.uint8)
+
+
+def simplificar_contorno(puntos, tolerancia=SIMPLIFICACION_CONTORNO):
+    """
+    Douglas-Peucker de un contorno cerrado (lista de (x, y), con o sin el
+    primer punto repetido al final). Se parte por el punto más lejano al
+    primero y cada mitad se simplifica con una pila; las distancias de cada
+    tramo se calculan de una vez con NumPy.
+    """
+    if len(puntos) > 1 and puntos[0] == puntos[-1]:
+        puntos = puntos[:-1]
+    total = len(puntos)
+    if total < 4:
+        return list(puntos)
+    cerrado = np.asarray(list(puntos) + [puntos[0]], dtype=np.float64)
+    lejano = int(np.argmax(np.hypot(cerrado[:total, 0] - cerrado[0, 0], cerrado[:total, 1] - cerrado[0, 1])))
+    conservar = np.zeros(total + 1, dtype=bool)
+    conservar[[0, lejano, total]] = True
+
+    pendientes = [(0, lejano), (lejano, total)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        if fin - inicio < 2:
+            continue
+        ax, ay = cerrado[inicio]
+        dx, dy = cerrado[fin] - cerrado[inicio]
+        interior = cerrado[inicio + 1:fin]
+        largo = math.hypot(dx, dy)
+        if largo == 0:
+            distancias = np.hypot(interior[:, 0] - ax, interior[:, 1] - ay)
+        else:
+            distancias = np.abs(dx * (interior[:, 1] - ay) - dy * (interior[:, 0] - ax)) / largo
+        mayor = int(np.argmax(distancias))
+        if distancias[mayor] > tolerancia:
+            medio = inicio + 1 + mayor
+            conservar[medio] = True
+            pendientes.append((inicio, medio))
+            pendientes.append((medio, fin))
+    return [(int(x), int(y)) for x, y in cerrado[:total][conservar[:total]]]
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class MapaBordes:
+    """
+    Luminancia suavizada y magnitud de bordes de una imagen a resolución
+    completa (para hacer crecer regiones y ajustar vértices) y rejilla
+    reducida de costes (para el live-wire). La rejilla lleva un marco de
+    celdas infinitas, así el bucle de Dijkstra no comprueba los límites.
+    """
+
+    def __init__(self, superficie, celdas_maximas=CELDAS_MAXIMAS):
+        self.ancho, self.alto = superficie.get_size()
+        self.luminancia = luminancia_suavizada(superficie)
+        self.magnitud = magnitud_bordes(self.luminancia)
+
+        # Cada celda toma el máximo de su bloque: un borde de 1-2 píxeles no se diluye
+        self.celda = max(1, math.ceil(max(self.ancho, self.alto) / celdas_maximas))
+        columnas = math.ceil(self.ancho / self.celda)
+        filas = math.ceil(self.alto / self.celda)
+        relleno = np.zeros((columnas * self.celda, filas * self.celda), dtype=np.uint8)
+        relleno[:self.ancho, :self.alto] = self.magnitud
+        bloques = relleno.reshape(columnas, self.celda, filas, self.celda).max(axis=(1, 3))
+
+        costes = np.full((columnas + 2, filas + 2), np.inf)
+        costes[1:-1, 1:-1] = COSTE_MINIMO + (1.0 - COSTE_MINIMO) * (1.0 - bloques / 255.0) ** 2
+        self.columnas, self.filas = columnas, filas
+        self.alto_rejilla = filas + 2  # Índice plano de la celda (c, f) con marco: (c + 1) * alto_rejilla + f + 1
+        self.costes = costes.ravel().tolist()
+
+    def ajustar(self, x, y, radio):
+        """
+        Punto con el borde más fuerte a menos de `radio` píxeles de (x, y);
+        los candidatos lejanos pierden hasta PENALIZACION_DISTANCIA. Si no hay
+        borde suficiente se devuelve (x, y) tal cual.
+        """
+        radio = max(1, int(radio))
+        x0, x1 = max(0, x - radio), min(self.ancho, x + radio + 1)
+        y0, y1 = max(0, y - radio), min(self.alto, y + radio + 1)
+        if x0 >= x1 or y0 >= y1:
+            return x, y
+        ventana = self.magnitud[x0:x1, y0:y1]
+        dx, dy = np.ogrid[x0 - x:x1 - x, y0 - y:y1 - y]
+        puntuacion = ventana - (PENALIZACION_DISTANCIA / radio) * np.sqrt(dx * dx + dy * dy)
+        mejor = int(np.argmax(puntuacion))
+        bx, by = divmod(mejor, y1 - y0)
+        if ventana[bx, by] < UMBRAL_BORDE:
+            return x, y
+        return x0 + bx, y0 + by
+
+    def indice_celda(self, x, y):
+        """Índice plano (con marco) de la celda que contiene el píxel (x, y)"""
+        columna = min(max(int(x) // self.celda, 0), self.columnas - 1)
+        fila = min(max(int(y) // self.celda, 0), self.filas - 1)
+        return (columna + 1) * self.alto_rejilla + fila + 1
+
+    def arbol_caminos(self, x, y):
+        """
+        Dijkstra desde la celda de (x, y) a toda la rejilla. Devuelve el
+        predecesor de cada celda: con él, camino() sale en O(longitud) para
+        cualquier destino, que es lo que pide el movimiento del cursor.
+        Tarda decenas de ms: se llama en un hilo de trabajo.
+        """
+        costes = self.costes
+        total = len(costes)
+        semilla = self.indice_celda(x, y)
+        distancias = [math.inf] * total
+        previos = array('i', [-1]) * total
+        desplazamientos = [(dx * self.alto_rejilla + dy, longitud) for dx, dy, longitud in VECINOS]
+
+        distancias[semilla] = 0.0
+        abiertos = [(0.0, semilla)]
+        while abiertos:
+            distancia, actual = heapq.heappop(abiertos)
+            if distancia > distancias[actual]:
+                continue
+            for desplazamiento, longitud in desplazamientos:
+                vecino = actual + desplazamiento
+                nueva = distancia + longitud * costes[vecino]
+                if nueva < distancias[vecino]:
+                    distancias[vecino] = nueva
+                    previos[vecino] = actual
+                    heapq.heappush(abiertos, (nueva, vecino))
+        return semilla, previos
+
+    def camino(self, arbol, x, y):
+        """Centros de celda (en píxeles de la imagen) del camino de la semilla del árbol hasta (x, y)"""
+        semilla, previos = arbol
+        actual = self.indice_celda(x, y)
+        celdas = []
+        while actual != semilla and actual >= 0 and len(celdas) <= len(previos):
+            celdas.append(actual)
+            actual = previos[actual]
+        if actual != semilla:
+            return []
+        centro = self.celda // 2
+        puntos = []
+        for indice in reversed(celdas):
+            columna, fila = divmod(indice, self.alto_rejilla)
+            puntos.append((min((columna - 1) * self.celda + centro, self.ancho - 1),
+                           min((fila - 1) * self.celda + centro, self.alto - 1)))
+        return puntos
+
+    def refinar(self, puntos):
+        """Lleva cada punto de un camino al borde más fuerte dentro de su celda"""
+        return [self.ajustar(x, y, max(1, self.celda // 2)) for x, y in puntos]
+
+    def crecer_region(self, x, y, tolerancia, simplificacion=SIMPLIFICACION_CONTORNO):
+        """
+        Región conectada de píxeles cuya luminancia se aleja como mucho
+        `tolerancia` de la de (x, y), y su contorno simplificado. La
+        comparación es una sola operación de NumPy sobre la luminancia ya
+        calculada; la componente conectada y el contorno los sacan
+        pygame.mask.Mask.connected_component() y outline(), en C.
+
+        Devuelve (puntos, fracción de la imagen que ocupa la región). Los
+        puntos quedan vacíos si la región es minúscula o si pasa de
+        FRACCION_MAXIMA_REGION (se ha desbordado al fondo).
+        """
+        x = min(max(int(x), 0), self.ancho - 1)
+        y = min(max(int(y), 0), self.alto - 1)
+        referencia = int(self.luminancia[x, y])
+        bajo, alto = max(referencia - int(tolerancia), 0), min(referencia + int(tolerancia), 255)
+        # En uint8 la resta da la vuelta por debajo de `bajo`: un solo rango cubre los dos límites
+        dentro = (self.luminancia - np.uint8(bajo)) <= (alto - bajo)
+
+        candidatos = pygame.surfarray.make_surface(dentro.view(np.uint8))
+        candidatos.set_colorkey(0)
+        region = pygame.mask.from_surface(candidatos).connected_component((x, y))
+        del candidatos, dentro
+
+        area = region.count()
+        fraccion = area / (self.ancho * self.alto)
+        if area < AREA_MINIMA_REGION or fraccion > FRACCION_MAXIMA_REGION:
+            return [], fraccion
+        puntos = simplificar_contorno(region.outline(), simplificacion)
+        if len(puntos) < 3:
+            return [], fraccion
+        return puntos, fraccion
+
+    def resumen(self):
+        """Texto corto para consola o depuración"""
+        megas = (self.magnitud.nbytes + self.luminancia.nbytes) / (1024 * 1024)
+        return (f"Bordes: {self.ancho}x{self.alto}, rejilla {self.columnas}x{self.filas} "
+                f"(celda {self.celda} px), {megas:.1f} MB")
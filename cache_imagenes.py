@@ -0,0 +1,161 @@
+"""
+CACHÉ DE IMÁGENES CON PRESUPUESTO DE MEMORIA
+Decodifica cada imagen la primera vez que se pide y desaloja las menos
+usadas recientemente (LRU) cuando se supera el presupuesto en bytes
+
+ARCHIVO: cache_imagenes.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pygame
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+PRESUPUESTO_POR_DEFECTO = 256 * 1024 * 1024  # 256 MB de superficies decodificadas
+ESPERA_REINTENTO_S = 10.0  # Tras un fallo no se vuelve a intentar antes (p. ej. una unidad de red caída)
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def bytes_superficie(superficie):
+    """Memoria que ocupan los píxeles de una superficie"""
+    return superficie.get_pitch() * superficie.get_height()
+
+
+def cargador_desde_carpeta(carpeta):
+    """Devuelve una función que decodifica `nombre` desde `carpeta`"""
+    def cargar(nombre):
+        return pygame.image.load(os.path.join(carpeta, nombre))
+    return cargar
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class CacheImagenes:
+    """
+    Caché LRU de superficies decodificadas bajo demanda.
+
+    Se puede usar desde varios hilos: la decodificación ocurre fuera del
+    cerrojo para que varias imágenes se carguen en paralelo.
+    """
+
+    def __init__(self, cargador, presupuesto_bytes=PRESUPUESTO_POR_DEFECTO, espera_reintento=ESPERA_REINTENTO_S):
+        """
+        cargador: función nombre -> pygame.Surface (puede lanzar excepciones)
+        presupuesto_bytes: memoria máxima para las imágenes desalojables
+        espera_reintento: segundos que se deja una imagen fallida sin reintentar
+        """
+        self.cargador = cargador
+        self.presupuesto_bytes = presupuesto_bytes
+        self.espera_reintento = espera_reintento
+
+        self.entradas = OrderedDict()  # nombre -> superficie, de la más antigua a la más reciente
+        self.fijas = {}  # Imágenes que no se pueden volver a decodificar (p. ej. simuladas)
+        self.fallidas = {}  # nombre -> momento del último fallo, para no reintentar cada frame
+
+        self.bytes_residentes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.cerrojo = threading.Lock()
+
+    def __contains__(self, nombre):
+        return nombre in self.entradas or nombre in self.fijas
+
+    def obtener(self, nombre):
+        """Devuelve la superficie de `nombre` (decodificándola si hace falta) o None"""
+        with self.cerrojo:
+            if nombre in self.fijas:
+                self.aciertos += 1
+                return self.fijas[nombre]
+
+            superficie = self.entradas.get(nombre)
+            if superficie is not None:
+                self.entradas.move_to_end(nombre)
+                self.aciertos += 1
+                return superficie
+
+            self.fallos += 1
+            if self._fallo_reciente(nombre):
+                return None
+
+        try:
+            superficie = self.cargador(nombre)
+        except Exception as e:
+            print(f"❌ Error cargando {nombre}: {e}")
+            with self.cerrojo:
+                self.fallidas[nombre] = time.monotonic()
+            return None
+
+        with self.cerrojo:
+            self.fallidas.pop(nombre, None)
+        self.insertar(nombre, superficie)
+        return superficie
+
+    def _fallo_reciente(self, nombre):
+        """True si `nombre` falló hace menos de espera_reintento segundos"""
+        momento = self.fallidas.get(nombre)
+        return momento is not None and time.monotonic() - momento < self.espera_reintento
+
+    def ha_fallado(self, nombre):
+        """True si la imagen se intentó decodificar hace poco y no se pudo"""
+        return self._fallo_reciente(nombre)
+
+    def olvidar_fallidas(self):
+        """Permite reintentar ya las que fallaron (p. ej. al empezar una partida)"""
+        with self.cerrojo:
+            self.fallidas.clear()
+
+    def insertar(self, nombre, superficie):
+        """Añade una superficie ya decodificada y desaloja lo necesario"""
+        with self.cerrojo:
+            anterior = self.entradas.pop(nombre, None)
+            if anterior is not None:
+                self.bytes_residentes -= bytes_superficie(anterior)
+
+            self.entradas[nombre] = superficie
+            self.bytes_residentes += bytes_superficie(superficie)
+            self.desalojar()
+
+    def fijar(self, nombre, superficie):
+        """Guarda una superficie que nunca se desaloja"""
+        with self.cerrojo:
+            self.fijas[nombre] = superficie
+
+    def desalojar(self):
+        """Libera las menos usadas hasta cumplir el presupuesto (conserva la última; requiere el cerrojo)"""
+        while self.bytes_residentes > self.presupuesto_bytes and len(self.entradas) > 1:
+            _, superficie = self.entradas.popitem(last=False)
+            self.bytes_residentes -= bytes_superficie(superficie)
+            self.desalojos += 1
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+            'residentes': len(self.entradas) + len(self.fijas),
+            'bytes_residentes': self.bytes_residentes,
+            'presupuesto_bytes': self.presupuesto_bytes
+        }
+
+    def resumen(self):
+        """Texto corto con las estadísticas, para consola o depuración"""
+        total = self.aciertos + self.fallos
+        tasa = (self.aciertos / total * 100) if total > 0 else 0
+        return (f"Caché imágenes: {tasa:.0f}% aciertos ({self.aciertos}/{total}), "
+                f"{self.desalojos} desalojos, {self.bytes_residentes / 1048576:.1f}/"
+                f"{self.presupuesto_bytes / 1048576:.0f} MB")
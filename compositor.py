@@ -0,0 +1,124 @@
+"""
+COMPOSITOR DE CAPAS CON RECTÁNGULOS SUCIOS
+Compone una capa estática que solo se redibuja cuando cambia su clave y,
+encima, elementos dinámicos que solo se repintan cuando cambia su firma
+
+ARCHIVO: compositor.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+from collections import namedtuple
+
+import pygame
+
+# ============================================================================
+# ESTRUCTURAS
+# ============================================================================
+
+# nombre: identificador estable entre frames
+# rect: zona de pantalla que ocupa (el dibujo se recorta a ella)
+# firma: valor comparable; si no cambia, el elemento no se repinta
+# dibujar: función superficie -> None
+Elemento = namedtuple('Elemento', ['nombre', 'rect', 'firma', 'dibujar'])
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class Compositor:
+    """
+    Mantiene en memoria la capa estática de la escena actual y repinta solo
+    las zonas de pantalla que cambian.
+
+    En cada frame la escena entrega su clave estática, la función que dibuja
+    esa capa y la lista de elementos dinámicos en orden de dibujo. Si la
+    clave cambia se recompone todo y se hace flip(); si no, se restauran
+    desde la capa estática los rectángulos de los elementos que cambiaron
+    (y de los que se solapan con ellos) y se envían con display.update().
+    """
+
+    def __init__(self, ventana):
+        self.ventana = ventana
+        self.capa_estatica = pygame.Surface(ventana.get_size()).convert()
+        self.clave_estatica = None
+        self.firmas = {}  # nombre -> (firma, rect) del último frame
+        self.rects_sucios = []
+        self.pantalla_completa = False
+
+        self.recomposiciones = 0
+        self.frames_parciales = 0
+
+    def invalidar(self):
+        """Obliga a recomponer la capa estática en el próximo frame"""
+        self.clave_estatica = None
+
+    def componer(self, clave_estatica, dibujar_estatico, elementos):
+        """Actualiza la ventana para este frame (no la presenta)"""
+        if clave_estatica != self.clave_estatica:
+            dibujar_estatico(self.capa_estatica)
+            self.clave_estatica = clave_estatica
+            self.ventana.blit(self.capa_estatica, (0, 0))
+            for elemento in elementos:
+                self._dibujar_elemento(elemento)
+            self.firmas = {e.nombre: (e.firma, pygame.Rect(e.rect)) for e in elementos}
+            self.pantalla_completa = True
+            self.recomposiciones += 1
+            return
+
+        # Elementos que cambiaron, aparecieron o desaparecieron
+        sucios = set()
+        rects = []
+        for elemento in elementos:
+            previo = self.firmas.get(elemento.nombre)
+            rect = pygame.Rect(elemento.rect)
+            if previo is None or previo[0] != elemento.firma or previo[1] != rect:
+                sucios.add(elemento.nombre)
+                rects.append(rect)
+                if previo is not None and previo[1] != rect:
+                    rects.append(previo[1])
+        nombres = {e.nombre for e in elementos}
+        for nombre, (_, rect) in self.firmas.items():
+            if nombre not in nombres:
+                rects.append(rect)
+
+        # Un elemento que se solapa con una zona restaurada también se repinta
+        cambio = len(rects) > 0
+        while cambio:
+            cambio = False
+            for elemento in elementos:
+                if elemento.nombre not in sucios and pygame.Rect(elemento.rect).collidelist(rects) != -1:
+                    sucios.add(elemento.nombre)
+                    rects.append(pygame.Rect(elemento.rect))
+                    cambio = True
+
+        for rect in rects:
+            self.ventana.blit(self.capa_estatica, rect, rect)
+        for elemento in elementos:
+            if elemento.nombre in sucios:
+                self._dibujar_elemento(elemento)
+
+        self.firmas = {e.nombre: (e.firma, pygame.Rect(e.rect)) for e in elementos}
+        self.rects_sucios.extend(rects)
+
+    def _dibujar_elemento(self, elemento):
+        """Dibuja un elemento recortado a su rect"""
+        self.ventana.set_clip(elemento.rect)
+        elemento.dibujar(self.ventana)
+        self.ventana.set_clip(None)
+
+    def presentar(self):
+        """Envía a pantalla solo lo que cambió desde el último frame"""
+        if self.pantalla_completa:
+            pygame.display.flip()
+        elif self.rects_sucios:
+            pygame.display.update(self.rects_sucios)
+            self.frames_parciales += 1
+        self.rects_sucios = []
+        self.pantalla_completa = False
+
+    def resumen(self):
+        """Texto corto para la superposición de depuración"""
+        return f"Compositor: {self.recomposiciones} recomposiciones, {self.frames_parciales} parciales"
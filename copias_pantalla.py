@@ -0,0 +1,241 @@
+"""
+COPIAS A RESOLUCIÓN DE PANTALLA
+Reduce cada imagen una sola vez al tamaño máximo al que se muestra y guarda
+la copia en disco con el hash de su contenido como clave. En memoria solo
+vive la copia (en el formato de la pantalla), nunca la captura original;
+la escala copia/original se conserva para que las coordenadas sigan en
+píxeles de la imagen original.
+
+Uso:
+    python copias_pantalla.py generar [carpeta_imagenes]
+
+ARCHIVO: copias_pantalla.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+from piramide import escalar_suave
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+CARPETA_COPIAS = ".copias_pantalla"
+TAMANO_COPIA_POR_DEFECTO = (800, 640)  # Área de imagen más grande del juego
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def lector_desde_carpeta(carpeta):
+    """Devuelve una función que lee los bytes de `nombre` desde `carpeta`"""
+    def leer(nombre):
+        with open(os.path.join(carpeta, nombre), 'rb') as archivo:
+            return archivo.read()
+    return leer
+
+
+def firma_desde_carpeta(carpeta):
+    """Devuelve una función que da [tamaño, mtime_ns] de `nombre` en `carpeta` (None si no existe)"""
+    def firma(nombre):
+        try:
+            estado = os.stat(os.path.join(carpeta, nombre))
+        except OSError:
+            return None
+        return [estado.st_size, estado.st_mtime_ns]
+    return firma
+
+
+def escala_copia(ancho, alto, tamano_maximo):
+    """Escala de la copia respecto al original (nunca amplía)"""
+    return min(tamano_maximo[0] / ancho, tamano_maximo[1] / alto, 1.0)
+
+
+def nombre_copia(huella, tamano_maximo, ancho, alto):
+    """<sha256>_<máximo>_<tamaño original>.png: el tamaño original basta para recalcular la escala"""
+    return f"{huella}_{tamano_maximo[0]}x{tamano_maximo[1]}_{ancho}x{alto}.png"
+
+
+def crear_copia(contenido, nombre, carpeta_copias, tamano_maximo, huella=None):
+    """
+    Decodifica el original, lo reduce y guarda la copia (temporal y
+    renombrado). Devuelve (huella, copia, ancho original, alto original).
+    """
+    huella = huella or hashlib.sha256(contenido).hexdigest()
+    original = pygame.image.load(io.BytesIO(contenido), nombre)
+    ancho, alto = original.get_size()
+    escala = escala_copia(ancho, alto, tamano_maximo)
+    if escala < 1.0:
+        copia = escalar_suave(original, (max(1, int(ancho * escala)), max(1, int(alto * escala))))
+    else:
+        copia = original
+    del original
+
+    ruta = os.path.join(carpeta_copias, nombre_copia(huella, tamano_maximo, ancho, alto))
+    temporal = ruta + ".tmp"
+    with open(temporal, 'wb') as archivo:
+        pygame.image.save(copia, archivo, "copia.png")
+    os.replace(temporal, ruta)
+    return huella, copia, ancho, alto
+
+
+def _generar_desde_ruta(argumentos):
+    """Trabajo de cada proceso en `generar`"""
+    ruta, carpeta_copias, tamano_maximo = argumentos
+    try:
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        crear_copia(contenido, os.path.basename(ruta), carpeta_copias, tamano_maximo)
+        return None
+    except Exception as e:
+        return f"{os.path.basename(ruta)}: {e}"
+
+
+def a_formato_pantalla(superficie):
+    """convert()/convert_alpha() si hay ventana; sin ella (p. ej. en la CLI) se deja igual"""
+    try:
+        if superficie.get_flags() & pygame.SRCALPHA:
+            return superficie.convert_alpha()
+        return superficie.convert()
+    except pygame.error:
+        return superficie
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class CopiasPantalla:
+    """
+    Cargador para CacheImagenes que devuelve la copia a resolución de
+    pantalla. Si la copia ya está en disco solo se decodifica ella; si no,
+    se crea a partir del original. escala(nombre) da la escala copia/original
+    de la última copia entregada.
+
+    Un hash del manifiesto solo se usa sin leer el original si el archivo
+    conserva el tamaño y el mtime con que se calculó: una imagen
+    sobrescrita se vuelve a leer y a hashear.
+    """
+
+    def __init__(self, leer_bytes, carpeta_copias=CARPETA_COPIAS, tamano_maximo=TAMANO_COPIA_POR_DEFECTO, firma=None):
+        """
+        leer_bytes: función nombre -> bytes del archivo original
+        firma: función nombre -> [tamaño, mtime_ns] del original (o None);
+            sin ella no se confía en ningún hash conocido
+        """
+        self.leer_bytes = leer_bytes
+        self.firma = firma
+        self.carpeta_copias = carpeta_copias
+        self.tamano_maximo = tuple(tamano_maximo)
+        self.huellas = {}  # nombre -> (sha256, [tamaño, mtime_ns]) del manifiesto: un acierto no lee el original
+        self.escalas = {}  # nombre -> escala copia/original
+        self.cerrojo = threading.Lock()
+        self.leidas_de_disco = 0
+        self.creadas = 0
+
+        os.makedirs(carpeta_copias, exist_ok=True)
+        self.en_disco = self.explorar()  # sha256 -> (ruta, ancho original, alto original)
+
+    def explorar(self):
+        """Copias ya guardadas para este tamaño máximo (un solo scandir)"""
+        sufijo_tamano = f"{self.tamano_maximo[0]}x{self.tamano_maximo[1]}"
+        copias = {}
+        with os.scandir(self.carpeta_copias) as entradas:
+            for entrada in entradas:
+                partes = entrada.name[:-len(".png")].split("_") if entrada.name.endswith(".png") else []
+                if len(partes) != 3 or partes[1] != sufijo_tamano:
+                    continue
+                try:
+                    ancho, alto = (int(valor) for valor in partes[2].split("x"))
+                except ValueError:
+                    continue
+                copias[partes[0]] = (entrada.path, ancho, alto)
+        return copias
+
+    def usar_huellas(self, entradas):
+        """Hashes ya calculados: nombre -> entrada del manifiesto ('sha256', 'bytes', 'mtime_ns')"""
+        self.huellas = {nombre: (datos['sha256'], [datos['bytes'], datos['mtime_ns']])
+                        for nombre, datos in entradas.items()}
+
+    def huella_conocida(self, nombre):
+        """sha256 del manifiesto si el original sigue siendo el mismo archivo; si no, None"""
+        conocida = self.huellas.get(nombre)
+        if conocida is None or self.firma is None:
+            return None
+        huella, firma = conocida
+        return huella if self.firma(nombre) == firma else None
+
+    def cargar(self, nombre):
+        """Copia de pantalla de `nombre` en el formato de la pantalla (se llama desde los hilos de precarga)"""
+        huella = self.huella_conocida(nombre)
+        contenido = None
+        if huella is None:
+            contenido = self.leer_bytes(nombre)
+            huella = hashlib.sha256(contenido).hexdigest()
+
+        with self.cerrojo:
+            guardada = self.en_disco.get(huella)
+        copia = None
+        if guardada is not None:
+            ruta, ancho, alto = guardada
+            try:
+                copia = pygame.image.load(ruta)
+                with self.cerrojo:
+                    self.leidas_de_disco += 1
+            except (pygame.error, OSError):
+                copia = None  # Copia dañada o borrada: se vuelve a crear
+
+        if copia is None:
+            if contenido is None:
+                contenido = self.leer_bytes(nombre)
+            huella, copia, ancho, alto = crear_copia(contenido, nombre, self.carpeta_copias, self.tamano_maximo, huella)
+            with self.cerrojo:
+                self.en_disco[huella] = (os.path.join(self.carpeta_copias,
+                                                      nombre_copia(huella, self.tamano_maximo, ancho, alto)), ancho, alto)
+                self.creadas += 1
+
+        with self.cerrojo:
+            self.escalas[nombre] = copia.get_width() / ancho
+        return a_formato_pantalla(copia)
+
+    def escala(self, nombre):
+        """Escala copia/original de `nombre` (1.0 si nunca pasó por aquí, p. ej. imágenes simuladas)"""
+        with self.cerrojo:
+            return self.escalas.get(nombre, 1.0)
+
+    def resumen(self):
+        """Texto corto para consola o depuración"""
+        return (f"Copias de pantalla: {self.leidas_de_disco} desde disco, {self.creadas} creadas, "
+                f"{len(self.en_disco)} en {self.carpeta_copias}/")
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "generar":
+        carpeta = sys.argv[2] if len(sys.argv) > 2 else "imagenes"
+        os.makedirs(CARPETA_COPIAS, exist_ok=True)
+        rutas = [entrada.path for entrada in os.scandir(carpeta)
+                 if entrada.name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor() as ejecutor:
+            errores = [error for error in ejecutor.map(_generar_desde_ruta,
+                                                        [(ruta, CARPETA_COPIAS, TAMANO_COPIA_POR_DEFECTO) for ruta in rutas],
+                                                        chunksize=8) if error]
+        for error in errores:
+            print(f"❌ {error}")
+        print(f"✅ {len(rutas) - len(errores)} copias en {CARPETA_COPIAS}/ ({time.perf_counter() - inicio:.1f} s)")
+    else:
+        print(__doc__)
@@ -0,0 +1,113 @@
+"""
+DIARIO DE ETIQUETAS
+Cada guardado se añade como una línea JSON (JSONL) y se fuerza a disco con
+fsync, así un cierre inesperado no pierde ninguna etiqueta ya guardada.
+En memoria, un índice por imagen guarda la versión vigente y su historial
+
+ARCHIVO: diario.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import json
+import os
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+NOMBRE_DIARIO = "diario_etiquetas.jsonl"
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class DiarioEtiquetas:
+    """Archivo de solo anexado con un registro JSON por línea"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.reparar_final()
+
+    def reparar_final(self):
+        """Si el último registro quedó cortado, cierra su línea para que el siguiente no se pegue a él"""
+        if not os.path.exists(self.ruta) or os.path.getsize(self.ruta) == 0:
+            return
+        with open(self.ruta, 'rb+') as archivo:
+            archivo.seek(-1, os.SEEK_END)
+            if archivo.read(1) != b"\n":
+                archivo.write(b"\n")
+                archivo.flush()
+                os.fsync(archivo.fileno())
+
+    def anexar(self, registro):
+        """Escribe `registro` al final del diario y no vuelve hasta que está en disco"""
+        linea = json.dumps(registro, ensure_ascii=False) + "\n"
+        with open(self.ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(linea)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def leer(self):
+        """
+        Devuelve los registros en el orden en que se guardaron. Una última
+        línea incompleta (cierre a mitad de escritura) se ignora.
+        """
+        if not os.path.exists(self.ruta):
+            return []
+        registros = []
+        with open(self.ruta, 'r', encoding='utf-8') as archivo:
+            for numero, linea in enumerate(archivo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    registros.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    print(f"⚠️  Línea {numero} del diario dañada, se ignora")
+        return registros
+
+
+class IndiceEtiquetas:
+    """
+    Etiqueta vigente de cada imagen (la última guardada gana) y el historial
+    de revisiones anteriores. Se reconstruye reproduciendo el diario.
+    """
+
+    def __init__(self, registros=()):
+        self.revisiones = {}  # imageName -> [registro, ...] de la más antigua a la vigente
+        for registro in registros:
+            self.registrar(registro)
+
+    def registrar(self, registro):
+        """Añade una revisión; pasa a ser la vigente de su imagen"""
+        self.revisiones.setdefault(registro['imageName'], []).append(registro)
+
+    def __contains__(self, nombre):
+        return nombre in self.revisiones
+
+    def __len__(self):
+        """Número de imágenes distintas etiquetadas"""
+        return len(self.revisiones)
+
+    def actual(self, nombre):
+        """Registro vigente de `nombre`, o None si nunca se etiquetó"""
+        historial = self.revisiones.get(nombre)
+        return historial[-1] if historial else None
+
+    def historial(self, nombre):
+        """Todas las revisiones de `nombre`, de la más antigua a la vigente"""
+        return self.revisiones.get(nombre, [])
+
+    def actuales(self):
+        """Un registro por imagen (el vigente), en el orden en que se etiquetaron por primera vez"""
+        return [historial[-1] for historial in self.revisiones.values()]
+
+    def vigentes(self):
+        """(orden, revision, registro) de cada imagen: su posición de primer etiquetado, su n.º de guardados y el vigente"""
+        return [(orden, len(historial), historial[-1]) for orden, historial in enumerate(self.revisiones.values())]
+
+    def total_revisiones(self):
+        """Guardados totales, incluidas las revisiones sustituidas"""
+        return sum(len(historial) for historial in self.revisiones.values())
@@ -0,0 +1,127 @@
+"""
+ESCRITOR EN SEGUNDO PLANO
+Ejecuta las escrituras a disco (copias de imágenes, archivos) en hilos de
+trabajo con concurrencia limitada, para que la interfaz no espere al disco
+
+ARCHIVO: escritor.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+HILOS_POR_DEFECTO = 2  # Escrituras simultáneas (un recurso de red no gana nada con más)
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def temporal_junto_a(destino):
+    """
+    Crea un temporal con nombre único en la carpeta del destino y devuelve
+    (descriptor, ruta). Con un nombre fijo, dos escrituras encoladas del
+    mismo destino (guardar, volver con ← y guardar otra vez) escribirían a
+    la vez en el mismo temporal.
+    """
+    return tempfile.mkstemp(dir=os.path.dirname(destino) or ".", prefix=os.path.basename(destino) + ".",
+                            suffix=".tmp")
+
+
+def copiar_atomico(origen, destino):
+    """Copia a un temporal junto al destino y lo renombra: nunca queda un archivo a medias"""
+    descriptor, temporal = temporal_junto_a(destino)
+    os.close(descriptor)
+    try:
+        shutil.copy2(origen, temporal)
+        os.replace(temporal, destino)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class EscritorAsincrono:
+    """
+    Cola de escrituras atendida por unos pocos hilos.
+
+    encolar() vuelve al instante; pendientes() y fallidas sirven para el
+    indicador de estado, y cerrar() espera a que todo termine.
+    """
+
+    def __init__(self, hilos=HILOS_POR_DEFECTO, al_terminar=None):
+        """
+        al_terminar: función (descripcion, error) -> None que se llama desde el
+            hilo de trabajo al acabar cada escritura (error es None si fue bien)
+        """
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="escritor")
+        self.al_terminar = al_terminar
+
+        self.cerrojo = threading.Lock()
+        self.en_curso = 0
+        self.completadas = 0
+        self.fallidas = []  # (descripcion, funcion, args, error)
+
+    def encolar(self, descripcion, funcion, *args):
+        """Programa funcion(*args) en segundo plano"""
+        with self.cerrojo:
+            self.en_curso += 1
+        self.ejecutor.submit(self._ejecutar, descripcion, funcion, args)
+
+    def _ejecutar(self, descripcion, funcion, args):
+        """Trabajo de cada hilo"""
+        error = None
+        try:
+            funcion(*args)
+        except Exception as e:
+            error = e
+            print(f"❌ Error guardando {descripcion}: {e}")
+        with self.cerrojo:
+            self.en_curso -= 1
+            if error is None:
+                self.completadas += 1
+            else:
+                self.fallidas.append((descripcion, funcion, args, error))
+        if self.al_terminar is not None:
+            self.al_terminar(descripcion, error)
+
+    def pendientes(self):
+        """Escrituras encoladas o en curso"""
+        with self.cerrojo:
+            return self.en_curso
+
+    def reintentar_fallidas(self):
+        """Vuelve a encolar las escrituras que fallaron"""
+        with self.cerrojo:
+            fallidas, self.fallidas = self.fallidas, []
+        for descripcion, funcion, args, _ in fallidas:
+            self.encolar(descripcion, funcion, *args)
+        return len(fallidas)
+
+    def cerrar(self):
+        """Espera a que terminen todas las escrituras y detiene los hilos"""
+        self.ejecutor.shutdown(wait=True)
+
+    def resumen(self):
+        """Texto corto para el indicador de estado"""
+        with self.cerrojo:
+            en_curso, fallidas = self.en_curso, len(self.fallidas)
+        if fallidas:
+            return f"{fallidas} sin guardar (R: reintentar)"
+        if en_curso:
+            return f"Guardando {en_curso}..."
+        return "Todo guardado"
@@ -5,10 +5,26 @@ y exportar las coordenadas en formato JSON compatible con el juego
 """
 
 import pygame
-import json
 import os
 from datetime import datetime
 import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from textos import CACHE_TEXTOS
+from piramide import PiramideImagen
+from bordes import MapaBordes, FRACCION_MAXIMA_REGION
+from cache_imagenes import CacheImagenes
+from precarga import PrecargadorImagenes
+from escritor import EscritorAsincrono, copiar_atomico
+from diario import DiarioEtiquetas, IndiceEtiquetas, NOMBRE_DIARIO
+from exportacion import ExportadorEtiquetas
+from manifiesto import cargar_manifiesto
+from archivo_dataset import ArchivoDataset, ruta_archivo
+from indice_imagenes import IndiceImagenes
+from miniaturas import CacheMiniaturas, TAMANO_MINIATURA
+from planificador import PlanificadorFrames
 
 # ============================================================================
 # INICIALIZACIÓN
@@ -27,6 +43,37 @@ COLOR_ROJO = (239, 68, 68)
 COLOR_AMARILLO = (250, 204, 21)
 COLOR_GRIS = (148, 163, 184)
 COLOR_FONDO = (15, 23, 42)
+REFRESCO_DEPURACION_MS = 250  # Con la superposición F3 visible el bucle no duerme más que esto
+
+# Zoom y desplazamiento
+ZOOM_MAXIMO = 8.0
+PASO_ZOOM = 1.25  # Factor por cada paso de la rueda del ratón
+
+# Navegación
+ANILLO_PRECARGA = 2  # Imágenes a cada lado de la actual que se mantienen decodificadas
+PRESUPUESTO_IMAGENES = 256 * 1024 * 1024  # Bytes de originales decodificados en memoria
+INTERVALO_REVISION_S = 5.0  # Cada cuánto se buscan imágenes nuevas o borradas en la carpeta
+COLOR_TRANSPARENTE = (255, 0, 255)  # Clave de color de la capa de polígonos
+
+# Tira de miniaturas y búsqueda
+ALTO_TIRA = TAMANO_MINIATURA[1] + 30  # Miniaturas, marca de estado y barra de desplazamiento
+PASO_TIRA = TAMANO_MINIATURA[0] + 8  # Ancho de cada hueco de la tira
+MINIATURAS_POR_RUEDA = 3  # Huecos que avanza la tira por cada paso de la rueda
+FILTROS_BUSQUEDA = ["todas", "sin etiquetar", "etiquetadas", "easy", "medium", "hard"]
+
+# Ajuste magnético a los bordes
+RADIO_IMAN = 12  # Píxeles de pantalla alrededor del cursor en los que se busca el borde
+RADIO_IMAN_MAXIMO = 64  # Píxeles de imagen (con poco zoom el radio en pantalla abarcaría demasiado)
+
+# Siembra de regiones (un click marca la lesión entera)
+TOLERANCIA_REGION = 24  # Diferencia de luminancia (0-255) con el píxel del click que aún entra en la región
+PASO_TOLERANCIA = 4
+TOLERANCIA_REGION_MINIMA = 2
+TOLERANCIA_REGION_MAXIMA = 120
+
+EVENTO_ESCRITURA = pygame.event.custom_type()  # Lo publica el escritor al terminar cada copia
+EVENTO_MINIATURA = pygame.event.custom_type()  # Lo publica la caché de miniaturas al tener una lista
+EVENTO_BORDES = pygame.event.custom_type()  # Lo publica el hilo del live-wire al terminar un árbol de caminos
 
 # ============================================================================
 # CLASE PRINCIPAL
@@ -40,13 +87,17 @@ class HerramientaEtiquetado:
         self.ventana = pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
         pygame.display.set_caption("🦷 Herramienta de Etiquetado de Caries NIRI")
         
-        self.reloj = pygame.time.Clock()
+        self.planificador = PlanificadorFrames(motivos={EVENTO_ESCRITURA: "escritura", EVENTO_MINIATURA: "miniatura",
+                                                        EVENTO_BORDES: "bordes"})
+        self.escritor = EscritorAsincrono(al_terminar=self.avisar_escritura)
+        self.mostrar_depuracion = False
         
         # Fuentes
         self.fuente_titulo = pygame.font.Font(None, 48)
         self.fuente_grande = pygame.font.Font(None, 36)
         self.fuente_mediana = pygame.font.Font(None, 28)
         self.fuente_pequena = pygame.font.Font(None, 22)
+        self.textos = CACHE_TEXTOS
         
         # Carpetas
         self.carpeta_imagenes = "imagenes_niri"  # Carpeta de entrada
@@ -54,25 +105,66 @@ class HerramientaEtiquetado:
         self.crear_carpetas()
         
         # Imágenes
-        self.imagenes = []
+        self.imagenes = IndiceImagenes.desde_nombres([])  # Se rellena en cargar_imagenes
+        self.ultima_revision = time.perf_counter()
+        self.manifiesto = None  # Manifiesto de la carpeta de imágenes, si está al día
+        self.archivo_dataset = None  # ArchivoDataset si existe imagenes_niri.niripak
         self.indice_actual = 0
         self.imagen_actual = None
-        self.imagen_escalada = None
-        self.rect_imagen = None
+        self.cache_imagenes = CacheImagenes(self.cargar_original, PRESUPUESTO_IMAGENES)
+        self.precargador = PrecargadorImagenes(self.cache_imagenes, self.preparar_imagen, 2 * ANILLO_PRECARGA)
+        self.inicio_navegacion = None  # Momento en que se pidió la imagen que aún no se ha mostrado
+        self.navegacion_precargada = False
+        self.latencias_navegacion = deque(maxlen=50)  # (ms, estaba precargada)
+        self.rect_imagen = None  # Parte visible de la imagen en pantalla
+        self.rect_vista = pygame.Rect(50, 120, ANCHO_VENTANA - 450, ALTO_VENTANA - 120 - 60 - ALTO_TIRA)
         self.escala = 1.0
         
+        # Tira de miniaturas: solo se dibujan los huecos visibles, sea cual sea el número de imágenes
+        self.miniaturas = CacheMiniaturas(self.cargar_original, self.firma_imagen, al_terminar=self.avisar_miniatura)
+        self.rect_tira = pygame.Rect(self.rect_vista.left, self.rect_vista.bottom + 10, self.rect_vista.width, ALTO_TIRA)
+        self.inicio_tira = 0.0  # Primer hueco visible (con fracción: desplazamiento suave)
+        self.arrastrando_barra = False
+        
+        # Búsqueda por nombre (tecla /)
+        self.buscando = False
+        self.consulta = ""
+        self.filtro_busqueda = 0  # Índice en FILTROS_BUSQUEDA
+        self.mascara_busqueda = None  # Máscara del filtro actual, hasta que cambien las etiquetas
+        self.resultado_busqueda = None  # Próxima imagen que coincide (se salta a ella con ENTER)
+        self.coincidencias_busqueda = 0
+        
         # Polígonos
         self.puntos_poligono_actual = []  # Puntos del polígono en progreso
+        self.tramos = []  # Puntos que añadió cada click (un tramo del live-wire son muchos), para deshacer
         self.poligonos_completados = []  # Lista de polígonos terminados
+        self.version_poligonos = 0  # Sube con cada cambio de poligonos_completados
+        self.capa_poligonos = None  # Polígonos completados ya proyectados a pantalla
+        self.clave_capa = None
         
-        # Datos etiquetados
-        self.datos_etiquetados = []
+        # Ajuste a bordes: el mapa se calcula al preparar cada imagen; el árbol del live-wire, en su propio hilo
+        self.mapa_bordes = None
+        self.iman = True  # Los clicks se ajustan al borde más fuerte cercano (SHIFT: sin ajuste)
+        self.seguir_bordes = False  # Live-wire: entre dos clicks el trazo sigue los bordes
+        self.hilo_bordes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bordes")
+        self.futuro_arbol = None  # (clave, Future) del árbol que se está calculando
+        self.arbol_bordes = None  # (clave, árbol) del último vértice
+        self.modo_region = False  # Un click hace crecer una región y la convierte en polígono (tecla G)
+        self.tolerancia_region = TOLERANCIA_REGION
+        self.semilla_region = None  # Click del que sale el polígono en curso, mientras no se edite a mano
+        
+        # Datos etiquetados (se recuperan del diario de sesiones anteriores)
+        self.diario = DiarioEtiquetas(os.path.join(self.carpeta_salida, NOMBRE_DIARIO))
+        self.etiquetas = IndiceEtiquetas(self.diario.leer())
+        self.exportador = ExportadorEtiquetas(self.carpeta_salida, self.tamano_imagen_registro)
         self.dificultad = "medium"  # easy, medium, hard
         
-        # UI
+        # UI: offset_x/offset_y son la esquina superior izquierda visible, en píxeles de la imagen
         self.zoom = 1.0
         self.offset_x = 0
         self.offset_y = 0
+        self.piramide = None  # PiramideImagen de la imagen actual
+        self.arrastre_previo = None  # Última posición del ratón mientras se desplaza la vista
         
         # Cargar imágenes
         self.cargar_imagenes()
@@ -82,7 +174,14 @@ class HerramientaEtiquetado:
         print("=" * 70)
         print(f"\n📁 Carpeta de imágenes: {self.carpeta_imagenes}")
         print(f"📁 Carpeta de salida: {self.carpeta_salida}")
-        print(f"✅ {len(self.imagenes)} imágenes cargadas\n")
+        print(f"✅ {len(self.imagenes)} imágenes cargadas ({self.imagenes.duracion_ultimo_escaneo * 1000:.0f} ms)\n")
+        
+        if len(self.etiquetas) > 0:
+            print(f"📓 Sesión recuperada del diario: {self.etiquetas.total_revisiones()} guardados, "
+                  f"{self.imagenes.total_etiquetadas} imágenes etiquetadas")
+        
+        # Continuar por la primera imagen sin etiquetar
+        self.indice_actual = self.imagenes.siguiente_sin_etiquetar() or 0
         
         if len(self.imagenes) > 0:
             self.cargar_imagen_actual()
@@ -99,45 +198,296 @@ class HerramientaEtiquetado:
             print(f"📁 Carpeta creada: {self.carpeta_salida}")
     
     def cargar_imagenes(self):
-        """Carga todas las imágenes de la carpeta"""
-        extensiones = ('.jpg', '.jpeg', '.png', '.bmp')
-        
+        """
+        Indexa las imágenes de la carpeta y de sus subcarpetas
+        (paciente/visita/...), en orden natural. El nombre de cada imagen es
+        su ruta relativa con '/', que en una carpeta plana es el nombre de
+        archivo de siempre.
+        """
+        esta_etiquetada = lambda nombre: nombre in self.etiquetas
         try:
-            archivos = os.listdir(self.carpeta_imagenes)
-            for archivo in archivos:
-                if archivo.lower().endswith(extensiones):
-                    ruta = os.path.join(self.carpeta_imagenes, archivo)
-                    self.imagenes.append({
-                        'nombre': archivo,
-                        'ruta': ruta,
-                        'etiquetada': False
-                    })
+            # Un archivo empaquetado ya lista las imágenes; un manifiesto al día dice cuáles no se leen
+            ruta_empaquetado = ruta_archivo(self.carpeta_imagenes)
+            if os.path.exists(ruta_empaquetado):
+                self.archivo_dataset = ArchivoDataset(ruta_empaquetado)
+                print(f"📦 Imágenes desde {ruta_empaquetado}")
+            self.manifiesto = cargar_manifiesto(self.carpeta_imagenes)
+            if self.archivo_dataset is not None:
+                self.imagenes = IndiceImagenes.desde_nombres(self.archivo_dataset.nombres(), esta_etiquetada)
+            else:
+                excluidas = ()
+                if self.manifiesto is not None and self.manifiesto['defectuosas']:
+                    excluidas = self.manifiesto['defectuosas']
+                    print(f"⚠️  {len(excluidas)} imágenes ilegibles omitidas (ver manifiesto)")
+                self.imagenes = IndiceImagenes(self.carpeta_imagenes, esta_etiquetada, excluidas)
         except Exception as e:
             print(f"❌ Error al cargar imágenes: {e}")
     
+    def revisar_carpeta(self):
+        """
+        Incorpora las imágenes añadidas o borradas desde la última revisión
+        (solo se releen las carpetas cuyo mtime cambió) y sigue en la misma
+        imagen aunque cambie su posición
+        """
+        self.ultima_revision = time.perf_counter()
+        nombre_actual = self.imagenes[self.indice_actual] if self.imagenes else None
+        try:
+            anadidas, quitadas = self.imagenes.revisar()
+        except Exception as e:
+            print(f"❌ Error al revisar la carpeta: {e}")
+            return False
+        if not anadidas and not quitadas:
+            return False
+        print(f"🔄 Carpeta revisada: {anadidas} imágenes nuevas, {quitadas} ya no están "
+              f"({self.imagenes.duracion_ultimo_escaneo * 1000:.0f} ms)")
+        self.mascara_busqueda = None
+        self.miniaturas.olvidar_fallidas()
+        self.cache_imagenes.olvidar_fallidas()
+        posicion = self.imagenes.posicion(nombre_actual)
+        if posicion is not None:
+            self.indice_actual = posicion
+            self.programar_precarga()
+        else:
+            # La imagen actual desapareció: se queda en la que ocupe su lugar
+            self.indice_actual = min(self.indice_actual, max(len(self.imagenes) - 1, 0))
+            if self.imagenes:
+                self.cargar_imagen_actual()
+            else:
+                self.imagen_actual = None
+                self.piramide = None
+        return True
+    
+    def cargar_original(self, nombre):
+        """Decodifica una imagen desde el archivo empaquetado o la carpeta (en los hilos de precarga)"""
+        if self.archivo_dataset is not None:
+            return self.archivo_dataset.cargar(nombre)
+        return pygame.image.load(os.path.join(self.carpeta_imagenes, *nombre.split("/")))
+    
+    def firma_imagen(self, nombre):
+        """Lo que identifica el contenido de una imagen para la caché de miniaturas (en los hilos de trabajo)"""
+        if self.archivo_dataset is not None:
+            entrada = self.archivo_dataset.entradas[nombre]
+            return f"{entrada['bytes']}-{entrada['ancho']}x{entrada['alto']}"
+        estado = os.stat(os.path.join(self.carpeta_imagenes, *nombre.split("/")))
+        return f"{estado.st_size}-{estado.st_mtime_ns}"
+    
+    def avisar_miniatura(self, nombre):
+        """Despierta el bucle para dibujar la miniatura nueva (se llama desde los hilos de miniaturas)"""
+        try:
+            pygame.event.post(pygame.event.Event(EVENTO_MINIATURA, nombre=nombre))
+        except pygame.error:
+            pass  # La ventana ya se cerró
+    
+    def preparar_imagen(self, superficie, vista):
+        """
+        Construye la pirámide de una imagen vecina en segundo plano y deja ya
+        escaladas las teselas de la vista sin zoom (`vista` es su tamaño), que
+        es como se muestra al llegar a ella. También calcula aquí su mapa de
+        bordes, para que el ajuste magnético esté listo al abrirla.
+        """
+        piramide = PiramideImagen(superficie)
+        ancho, alto = superficie.get_size()
+        escala = min(vista[0] / ancho, vista[1] / alto, 1.0)
+        piramide.dibujar(pygame.Surface(vista), (0, 0), escala, pygame.Rect((0, 0), vista))
+        try:
+            mapa = MapaBordes(superficie)
+        except Exception as e:
+            print(f"⚠️  Sin mapa de bordes: {e}")
+            mapa = None  # Se etiqueta igual, sin ajuste magnético
+        return piramide, superficie, mapa
+    
+    def programar_precarga(self):
+        """Anillo de precarga: la actual y ANILLO_PRECARGA imágenes a cada lado, de la más cercana a la más lejana"""
+        peticiones = [self.imagenes[self.indice_actual]]
+        for distancia in range(1, ANILLO_PRECARGA + 1):
+            for indice in (self.indice_actual + distancia, self.indice_actual - distancia):
+                if 0 <= indice < len(self.imagenes):
+                    peticiones.append(self.imagenes[indice])
+        vista = tuple(self.rect_vista.size)
+        self.precargador.programar([(nombre, vista) for nombre in peticiones])
+    
     def cargar_imagen_actual(self):
-        """Carga la imagen actual en memoria"""
+        """Carga la imagen actual en memoria (al instante si el anillo de precarga ya la tiene)"""
         if 0 <= self.indice_actual < len(self.imagenes):
-            info = self.imagenes[self.indice_actual]
+            nombre = self.imagenes[self.indice_actual]
+            self.inicio_navegacion = time.perf_counter()
+            self.seguir_en_tira(self.indice_actual)
             try:
-                self.imagen_actual = pygame.image.load(info['ruta'])
+                vista = tuple(self.rect_vista.size)
+                lista = self.precargador.obtener(nombre, vista)
+                self.navegacion_precargada = lista is not None
+                if lista is None:
+                    lista = self.precargador.esperar(nombre, vista)
+                if lista is None:
+                    raise ValueError(f"no se pudo decodificar {nombre}")
+                self.piramide, self.imagen_actual, self.mapa_bordes = lista
+                self.zoom = 1.0
+                self.offset_x = 0
+                self.offset_y = 0
                 self.puntos_poligono_actual = []
+                self.tramos = []
+                self.semilla_region = None
                 self.poligonos_completados = []
-                print(f"\n📷 Cargando: {info['nombre']}")
+                self.cargar_etiquetas_existentes(nombre)
+                self.version_poligonos += 1
+                print(f"\n📷 Cargando: {nombre}")
+                print(f"   {self.piramide.resumen()}")
             except Exception as e:
                 print(f"❌ Error al cargar imagen: {e}")
                 self.imagen_actual = None
+                self.piramide = None
+                self.mapa_bordes = None
+                self.inicio_navegacion = None
+            self.programar_precarga()
+    
+    def huecos_tira(self):
+        """Miniaturas que caben a la vez en la tira"""
+        return max(1, self.rect_tira.width // PASO_TIRA)
+    
+    def mover_tira(self, inicio):
+        """Coloca la tira con `inicio` como primer hueco visible, sin salirse de la lista"""
+        self.inicio_tira = min(max(float(inicio), 0.0), float(max(len(self.imagenes) - self.huecos_tira(), 0)))
+    
+    def seguir_en_tira(self, indice):
+        """Centra la tira en `indice` si ahora mismo no se ve entero"""
+        huecos = self.huecos_tira()
+        if not self.inicio_tira <= indice <= self.inicio_tira + huecos - 1:
+            self.mover_tira(indice - huecos // 2)
+    
+    def indice_en_tira(self, pos):
+        """Imagen bajo `pos` en la tira, o None"""
+        if not self.rect_tira.collidepoint(pos) or pos[1] >= self.rect_tira.bottom - 12:
+            return None
+        indice = int(self.inicio_tira + (pos[0] - self.rect_tira.left) / PASO_TIRA)
+        return indice if 0 <= indice < len(self.imagenes) else None
+    
+    def rect_barra_tira(self):
+        """Pista de la barra de desplazamiento, bajo las miniaturas"""
+        return pygame.Rect(self.rect_tira.left, self.rect_tira.bottom - 8, self.rect_tira.width, 6)
+    
+    def mover_tira_con_barra(self, x):
+        """Lleva la tira a la proporción de la barra donde está el ratón"""
+        barra = self.rect_barra_tira()
+        proporcion = min(max((x - barra.left) / barra.width, 0.0), 1.0)
+        self.mover_tira(proporcion * (len(self.imagenes) - self.huecos_tira()))
+    
+    def mascara_filtro(self):
+        """Máscara de IndiceImagenes.buscar para el filtro elegido (None = todas)"""
+        filtro = FILTROS_BUSQUEDA[self.filtro_busqueda]
+        if filtro == "todas":
+            return None
+        if filtro == "etiquetadas":
+            return self.imagenes.etiquetadas
+        if filtro == "sin etiquetar":
+            return self.imagenes.sin_etiquetar()
+        # Dificultad: se recorre solo lo etiquetado y se guarda hasta el próximo guardado o revisión
+        if self.mascara_busqueda is None or self.mascara_busqueda[0] != filtro:
+            mascara = bytearray(len(self.imagenes))
+            for registro in self.etiquetas.actuales():
+                posicion = self.imagenes.posicion(registro['imageName'])
+                if posicion is not None and registro.get('difficulty') == filtro:
+                    mascara[posicion] = 1
+            self.mascara_busqueda = (filtro, mascara)
+        return self.mascara_busqueda[1]
+    
+    def actualizar_busqueda(self):
+        """Busca la próxima coincidencia después de la imagen actual y la enseña en la tira"""
+        self.resultado_busqueda = self.imagenes.buscar(self.consulta, self.indice_actual + 1, self.mascara_filtro())
+        self.coincidencias_busqueda = self.imagenes.contar(self.consulta)
+        if self.resultado_busqueda is not None:
+            self.seguir_en_tira(self.resultado_busqueda)
+    
+    def manejar_tecla_busqueda(self, evento):
+        """Teclas mientras la barra de búsqueda está abierta (no llegan a los atajos)"""
+        if evento.key == pygame.K_ESCAPE:
+            self.buscando = False
+            self.seguir_en_tira(self.indice_actual)
+        elif evento.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            if self.resultado_busqueda is not None:
+                self.ir_a(self.resultado_busqueda)
+                self.actualizar_busqueda()
+        elif evento.key == pygame.K_TAB:
+            self.filtro_busqueda = (self.filtro_busqueda + 1) % len(FILTROS_BUSQUEDA)
+            self.actualizar_busqueda()
+        elif evento.key == pygame.K_BACKSPACE:
+            self.consulta = self.consulta[:-1]
+            self.actualizar_busqueda()
+        elif evento.unicode and evento.unicode.isprintable():
+            self.consulta += evento.unicode
+            self.actualizar_busqueda()
+    
+    def ir_a(self, indice):
+        """Salta a la imagen `indice`"""
+        if 0 <= indice < len(self.imagenes) and indice != self.indice_actual:
+            self.indice_actual = indice
+            self.cargar_imagen_actual()
+    
+    def actualizar_vista(self):
+        """
+        Recalcula la escala (ajuste a la vista por zoom), limita el
+        desplazamiento a la imagen y deja en rect_imagen la parte visible
+        """
+        ancho, alto = self.imagen_actual.get_size()
+        escala_ajuste = min(self.rect_vista.width / ancho, self.rect_vista.height / alto, 1.0)
+        self.escala = escala_ajuste * self.zoom
+        
+        self.offset_x = min(max(self.offset_x, 0), max(0, ancho - self.rect_vista.width / self.escala))
+        self.offset_y = min(max(self.offset_y, 0), max(0, alto - self.rect_vista.height / self.escala))
+        
+        izquierda, arriba = self.imagen_a_pantalla(0, 0)
+        derecha, abajo = self.imagen_a_pantalla(ancho, alto)
+        rect_completo = pygame.Rect(round(izquierda), round(arriba), round(derecha - izquierda), round(abajo - arriba))
+        self.rect_imagen = rect_completo.clip(self.rect_vista)
+    
+    def imagen_a_pantalla(self, x, y):
+        """Convierte coordenadas de imagen a coordenadas de pantalla"""
+        return (self.rect_vista.left + (x - self.offset_x) * self.escala,
+                self.rect_vista.top + (y - self.offset_y) * self.escala)
+    
+    def cambiar_zoom(self, factor, pos_mouse):
+        """Multiplica el zoom por `factor` manteniendo fijo el punto de la imagen bajo el ratón"""
+        if not self.imagen_actual:
+            return
+        nuevo_zoom = min(max(self.zoom * factor, 1.0), ZOOM_MAXIMO)
+        if nuevo_zoom == self.zoom:
+            return
+        x = self.offset_x + (pos_mouse[0] - self.rect_vista.left) / self.escala
+        y = self.offset_y + (pos_mouse[1] - self.rect_vista.top) / self.escala
+        self.zoom = nuevo_zoom
+        self.actualizar_vista()
+        self.offset_x = x - (pos_mouse[0] - self.rect_vista.left) / self.escala
+        self.offset_y = y - (pos_mouse[1] - self.rect_vista.top) / self.escala
+        self.actualizar_vista()
+    
+    def cargar_etiquetas_existentes(self, nombre):
+        """Si la imagen ya se etiquetó, recupera sus polígonos y dificultad vigentes para editarlos"""
+        dato = self.etiquetas.actual(nombre)
+        if dato is None:
+            return
+        self.poligonos_completados = [[dict(punto) for punto in poligono] for poligono in dato['polygons']]
+        self.dificultad = dato.get('difficulty', self.dificultad)
+        print(f"✏️  Editando etiqueta existente ({len(self.etiquetas.historial(nombre))} revisiones)")
+    
+    def ir_a_siguiente_sin_etiquetar(self):
+        """Salta a la próxima imagen (dando la vuelta) que no esté etiquetada"""
+        if self.imagenes:
+            indice = self.imagenes.siguiente_sin_etiquetar((self.indice_actual + 1) % len(self.imagenes))
+            if indice is not None:
+                self.indice_actual = indice
+                self.cargar_imagen_actual()
+                return
+        print("🎉 Todas las imágenes están etiquetadas")
     
     def obtener_coordenadas_imagen(self, pos_mouse):
-        """Convierte coordenadas de pantalla a coordenadas de imagen"""
+        """Convierte coordenadas de pantalla a coordenadas de imagen (exacto con cualquier zoom)"""
         if not self.rect_imagen:
             return None
         
         if not self.rect_imagen.collidepoint(pos_mouse):
             return None
         
-        x = (pos_mouse[0] - self.rect_imagen.left) / self.escala
-        y = (pos_mouse[1] - self.rect_imagen.top) / self.escala
+        x = self.offset_x + (pos_mouse[0] - self.rect_vista.left) / self.escala
+        y = self.offset_y + (pos_mouse[1] - self.rect_vista.top) / self.escala
         
         # Asegurar que está dentro de los límites de la imagen
         if 0 <= x < self.imagen_actual.get_width() and 0 <= y < self.imagen_actual.get_height():
@@ -148,19 +498,140 @@ class HerramientaEtiquetado:
         """Cierra el polígono actual y lo añade a completados"""
         if len(self.puntos_poligono_actual) >= 3:
             self.poligonos_completados.append(self.puntos_poligono_actual[:])
+            self.version_poligonos += 1
             self.puntos_poligono_actual = []
+            self.tramos = []
+            self.semilla_region = None
+            self.preparar_trazado()
             print(f"✅ Polígono completado. Total: {len(self.poligonos_completados)}")
     
     def deshacer_punto(self):
-        """Elimina el último punto del polígono actual"""
+        """Elimina el último click del polígono actual (con el live-wire, todo su tramo)"""
         if len(self.puntos_poligono_actual) > 0:
-            self.puntos_poligono_actual.pop()
+            cuantos = self.tramos.pop() if self.tramos else 1
+            del self.puntos_poligono_actual[-cuantos:]
+            self.semilla_region = None  # Ya editado a mano: otra siembra no lo reemplaza
+            self.preparar_trazado()
             print(f"↶ Punto eliminado. Quedan: {len(self.puntos_poligono_actual)}")
     
+    def ajustar_punto(self, coords):
+        """Lleva un punto al borde más fuerte cercano si el imán está activo (y no se pulsa SHIFT)"""
+        if not self.iman or self.mapa_bordes is None or pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            return coords
+        radio = min(RADIO_IMAN / self.escala, RADIO_IMAN_MAXIMO)
+        x, y = self.mapa_bordes.ajustar(coords['x'], coords['y'], radio)
+        return {'x': int(x), 'y': int(y)}
+    
+    def preparar_trazado(self):
+        """Pide en segundo plano el árbol de caminos del último vértice si el live-wire está activo"""
+        if not self.seguir_bordes or self.mapa_bordes is None or not self.puntos_poligono_actual:
+            return
+        ultimo = self.puntos_poligono_actual[-1]
+        clave = (id(self.mapa_bordes), ultimo['x'], ultimo['y'])
+        if self.arbol_bordes is not None and self.arbol_bordes[0] == clave:
+            return
+        if self.futuro_arbol is not None:
+            if self.futuro_arbol[0] == clave:
+                return
+            self.futuro_arbol[1].cancel()
+        self.futuro_arbol = (clave, self.hilo_bordes.submit(self.calcular_arbol, self.mapa_bordes, ultimo['x'], ultimo['y']))
+    
+    def calcular_arbol(self, mapa, x, y):
+        """Trabajo del hilo de bordes: Dijkstra sobre la rejilla reducida y aviso al bucle"""
+        arbol = mapa.arbol_caminos(x, y)
+        try:
+            pygame.event.post(pygame.event.Event(EVENTO_BORDES))
+        except pygame.error:
+            pass  # La ventana ya se cerró
+        return arbol
+    
+    def arbol_actual(self):
+        """Árbol de caminos del último vértice, o None si aún no está (o el live-wire está apagado)"""
+        if not self.seguir_bordes or not self.puntos_poligono_actual or self.mapa_bordes is None:
+            return None
+        if self.futuro_arbol is not None and self.futuro_arbol[1].done():
+            clave, futuro = self.futuro_arbol
+            self.futuro_arbol = None
+            if not futuro.cancelled() and futuro.exception() is None:
+                self.arbol_bordes = (clave, futuro.result())
+        ultimo = self.puntos_poligono_actual[-1]
+        if self.arbol_bordes is not None and self.arbol_bordes[0] == (id(self.mapa_bordes), ultimo['x'], ultimo['y']):
+            return self.arbol_bordes[1]
+        return None
+    
+    def tramo_hasta(self, coords, refinar=True):
+        """
+        Puntos intermedios del live-wire entre el último vértice y `coords`
+        (vacío si no hay árbol). Sin refinar son los centros de las celdas
+        de la rejilla: basta para la vista previa de cada frame.
+        """
+        arbol = self.arbol_actual()
+        if arbol is None:
+            return []
+        camino = self.mapa_bordes.camino(arbol, coords['x'], coords['y'])[:-1]
+        if refinar:
+            camino = self.mapa_bordes.refinar(camino)
+        tramo = []
+        anterior = self.puntos_poligono_actual[-1]
+        for x, y in camino:
+            punto = {'x': int(x), 'y': int(y)}
+            if punto != anterior and punto != coords:
+                tramo.append(punto)
+                anterior = punto
+        return tramo
+    
+    def anadir_vertice(self, coords):
+        """Añade un click al polígono: el vértice y, con el live-wire, el tramo que sigue el borde hasta él"""
+        tramo = self.tramo_hasta(coords) if self.puntos_poligono_actual else []
+        self.puntos_poligono_actual.extend(tramo)
+        self.puntos_poligono_actual.append(coords)
+        self.tramos.append(len(tramo) + 1)
+        self.semilla_region = None
+        self.preparar_trazado()
+    
+    def sembrar_region(self, coords):
+        """
+        Modo región: hace crecer desde `coords` la región de luminancia
+        parecida y deja su contorno simplificado como polígono en curso, con
+        un vértice por click para poder editarlo (ESPACIO, más clicks) antes
+        de cerrarlo con ENTER. Usa la luminancia del mapa de bordes, ya
+        calculada al preparar la imagen.
+        """
+        if self.mapa_bordes is None:
+            print("⚠️  Esta imagen no tiene mapa de bordes: no se pueden sembrar regiones")
+            return
+        if self.puntos_poligono_actual and self.semilla_region is None:
+            print("⚠️  Cierra (ENTER) o deshaz (ESPACIO) el polígono en curso antes de sembrar una región")
+            return
+        inicio = time.perf_counter()
+        puntos, fraccion = self.mapa_bordes.crecer_region(coords['x'], coords['y'], self.tolerancia_region)
+        duracion = (time.perf_counter() - inicio) * 1000
+        if not puntos:
+            if fraccion > FRACCION_MAXIMA_REGION:
+                print(f"⚠️  La región se desborda ({fraccion:.0%} de la imagen): baja la tolerancia (-)")
+            else:
+                print("⚠️  Región demasiado pequeña: sube la tolerancia (+)")
+            return
+        self.puntos_poligono_actual = [{'x': x, 'y': y} for x, y in puntos]
+        self.tramos = [1] * len(puntos)
+        self.semilla_region = coords
+        self.preparar_trazado()
+        print(f"🌱 Región: {len(puntos)} vértices, {fraccion:.1%} de la imagen, tolerancia {self.tolerancia_region} "
+              f"({duracion:.0f} ms). ENTER para aceptarla")
+    
+    def cambiar_tolerancia(self, paso):
+        """Sube o baja la tolerancia de la región y vuelve a sembrar la que está en curso"""
+        self.tolerancia_region = min(max(self.tolerancia_region + paso, TOLERANCIA_REGION_MINIMA),
+                                     TOLERANCIA_REGION_MAXIMA)
+        print(f"🌱 Tolerancia de la región: {self.tolerancia_region}")
+        if self.semilla_region is not None and self.puntos_poligono_actual:
+            self.sembrar_region(self.semilla_region)
+    
     def eliminar_ultimo_poligono(self):
         """Elimina el último polígono completado"""
         if len(self.poligonos_completados) > 0:
             self.poligonos_completados.pop()
+            self.version_poligonos += 1
             print(f"🗑️  Polígono eliminado. Quedan: {len(self.poligonos_completados)}")
     
     def guardar_etiquetas(self):
@@ -168,35 +639,37 @@ class HerramientaEtiquetado:
         if self.indice_actual >= len(self.imagenes):
             return
         
-        info = self.imagenes[self.indice_actual]
+        nombre = self.imagenes[self.indice_actual]
         
         # Preparar datos
         dato = {
-            'imageName': info['nombre'],
+            'imageName': nombre,
             'difficulty': self.dificultad,
             'polygons': self.poligonos_completados[:],  # Copia de los polígonos
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'es_negativo': len(self.poligonos_completados) == 0
         }
+        if self.imagen_actual is not None:
+            dato['width'], dato['height'] = self.imagen_actual.get_size()  # Para la exportación COCO
         
-        self.datos_etiquetados.append(dato)
-        info['etiquetada'] = True
-        
-        # Copiar imagen a carpeta de salida
-        nombre_sin_ext = os.path.splitext(info['nombre'])[0]
-        extension = os.path.splitext(info['nombre'])[1]
-        
-        # Guardar imagen
-        ruta_salida_img = os.path.join(self.carpeta_salida, info['nombre'])
         try:
-            # Copiar imagen original
-            import shutil
-            shutil.copy2(info['ruta'], ruta_salida_img)
-            print(f"💾 Imagen guardada en: {ruta_salida_img}")
+            self.diario.anexar(dato)
         except Exception as e:
-            print(f"⚠️  Error al copiar imagen: {e}")
+            print(f"❌ Error al escribir el diario: {e}")
+            return
+        self.etiquetas.registrar(dato)
+        self.imagenes.marcar_etiquetada(self.indice_actual)
+        self.mascara_busqueda = None
         
-        print(f"✅ Etiquetas guardadas para: {info['nombre']}")
+        # Copiar la imagen original a la carpeta de salida en segundo plano (con sus subcarpetas)
+        ruta_salida_img = os.path.join(self.carpeta_salida, *nombre.split("/"))
+        os.makedirs(os.path.dirname(ruta_salida_img), exist_ok=True)
+        if self.archivo_dataset is not None:
+            self.escritor.encolar(nombre, self.archivo_dataset.extraer, nombre, ruta_salida_img)
+        else:
+            self.escritor.encolar(nombre, copiar_atomico, self.imagenes.ruta(self.indice_actual), ruta_salida_img)
+        
+        print(f"✅ Etiquetas guardadas para: {nombre}")
         print(f"   Polígonos: {len(self.poligonos_completados)}")
         print(f"   Dificultad: {self.dificultad}")
         
@@ -207,31 +680,49 @@ class HerramientaEtiquetado:
         else:
             print("\n🎉 ¡Has etiquetado todas las imágenes!")
     
+    def avisar_escritura(self, descripcion, error):
+        """Despierta el bucle para refrescar el indicador (se llama desde los hilos del escritor)"""
+        try:
+            pygame.event.post(pygame.event.Event(EVENTO_ESCRITURA, descripcion=descripcion))
+        except pygame.error:
+            pass  # La ventana ya se cerró
+    
+    def tamano_imagen_registro(self, registro):
+        """Tamaño de la imagen de un registro antiguo sin 'width'/'height' (del manifiesto o abriendo la imagen)"""
+        if self.archivo_dataset is not None and registro['imageName'] in self.archivo_dataset:
+            return self.archivo_dataset.tamano(registro['imageName'])
+        if self.manifiesto is not None and registro['imageName'] in self.manifiesto['imagenes']:
+            datos = self.manifiesto['imagenes'][registro['imageName']]
+            return datos['ancho'], datos['alto']
+        rutas = [os.path.join(self.carpeta_imagenes, *registro['imageName'].split("/")),
+                 os.path.join(self.carpeta_salida, *registro['imageName'].split("/"))]
+        for ruta in rutas:
+            if os.path.exists(ruta):
+                return pygame.image.load(ruta).get_size()
+        raise FileNotFoundError(f"No se encuentra la imagen {registro['imageName']}")
+    
     def exportar_json(self):
-        """Exporta todos los datos a un archivo JSON"""
-        if len(self.datos_etiquetados) == 0:
+        """Exporta las etiquetas vigentes (JSON del juego, JSONL y COCO) en segundo plano"""
+        if len(self.etiquetas) == 0:
             print("⚠️  No hay datos para exportar")
             return
         
-        # Nombre del archivo con timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nombre_archivo = f"etiquetas_caries_{timestamp}.json"
-        ruta_salida = os.path.join(self.carpeta_salida, nombre_archivo)
+        print("📤 Exportando en segundo plano...")
+        self.escritor.encolar("exportación", self.exportar_formatos, self.etiquetas.vigentes())
+    
+    def exportar_formatos(self, vigentes):
+        """Trabajo del escritor: solo se regeneran los registros que cambiaron desde la última exportación"""
+        resultado = self.exportador.exportar(vigentes)
         
-        try:
-            with open(ruta_salida, 'w', encoding='utf-8') as f:
-                json.dump(self.datos_etiquetados, f, indent=2, ensure_ascii=False)
-            
-            print("\n" + "=" * 70)
-            print("✅ EXPORTACIÓN EXITOSA")
-            print("=" * 70)
-            print(f"📄 Archivo: {ruta_salida}")
-            print(f"📊 Total de imágenes etiquetadas: {len(self.datos_etiquetados)}")
-            print(f"📁 Imágenes copiadas a: {self.carpeta_salida}")
-            print("\n💡 Usa este archivo JSON en el juego de detección de caries")
-            print("=" * 70 + "\n")
-        except Exception as e:
-            print(f"❌ Error al exportar JSON: {e}")
+        print("\n" + "=" * 70)
+        print("✅ EXPORTACIÓN EXITOSA")
+        print("=" * 70)
+        for ruta, regenerados in resultado.values():
+            print(f"📄 Archivo: {ruta} ({regenerados} registros actualizados)")
+        print(f"📊 Total de imágenes etiquetadas: {len(vigentes)}")
+        print(f"📁 Imágenes copiadas a: {self.carpeta_salida}")
+        print("\n💡 Usa etiquetas_caries.json en el juego de detección de caries")
+        print("=" * 70 + "\n")
     
     def dibujar(self):
         """Dibuja toda la interfaz"""
@@ -243,101 +734,224 @@ class HerramientaEtiquetado:
         # Imagen con polígonos
         self.dibujar_imagen()
         
+        # Tira de miniaturas y búsqueda
+        self.dibujar_tira()
+        if self.buscando:
+            self.dibujar_busqueda()
+        
         # Panel lateral
         self.dibujar_panel_lateral()
         
         # Instrucciones en pantalla
         self.dibujar_instrucciones()
         
+        if self.mostrar_depuracion:
+            self.dibujar_depuracion()
+        
         pygame.display.flip()
+        
+        # Latencia de navegación: desde que se pidió la imagen hasta que está en pantalla
+        if self.inicio_navegacion is not None:
+            latencia = (time.perf_counter() - self.inicio_navegacion) * 1000
+            self.latencias_navegacion.append((latencia, self.navegacion_precargada))
+            self.inicio_navegacion = None
     
     def dibujar_panel_superior(self):
         """Dibuja el panel superior con información"""
         # Título
-        titulo = self.fuente_titulo.render("🦷 Etiquetado de Caries NIRI", True, COLOR_BLANCO)
+        titulo = self.textos.renderizar(self.fuente_titulo, "🦷 Etiquetado de Caries NIRI", COLOR_BLANCO)
         self.ventana.blit(titulo, (20, 20))
         
         # Contador de imágenes
         if len(self.imagenes) > 0:
             texto = f"Imagen {self.indice_actual + 1} de {len(self.imagenes)}"
-            etiquetadas = sum(1 for img in self.imagenes if img['etiquetada'])
-            texto += f" | Etiquetadas: {etiquetadas}/{len(self.imagenes)}"
+            texto += f" | Etiquetadas: {self.imagenes.total_etiquetadas}/{len(self.imagenes)}"
         else:
             texto = "No hay imágenes en la carpeta"
         
-        contador = self.fuente_mediana.render(texto, True, COLOR_GRIS)
+        contador = self.textos.renderizar(self.fuente_mediana, texto, COLOR_GRIS)
         self.ventana.blit(contador, (20, 75))
+        
+        # Estado de las copias en segundo plano
+        if self.escritor.fallidas:
+            color_estado = COLOR_ROJO
+        elif self.escritor.pendientes():
+            color_estado = COLOR_AMARILLO
+        else:
+            color_estado = COLOR_VERDE
+        estado = self.textos.renderizar(self.fuente_mediana, self.escritor.resumen(), color_estado)
+        self.ventana.blit(estado, estado.get_rect(topright=(ANCHO_VENTANA - 20, 75)))
     
     def dibujar_imagen(self):
         """Dibuja la imagen con los polígonos"""
         if not self.imagen_actual:
             # Mensaje de ayuda
-            texto1 = self.fuente_grande.render("📁 Coloca tus imágenes NIRI en:", True, COLOR_AMARILLO)
-            texto2 = self.fuente_mediana.render(f"    {os.path.abspath(self.carpeta_imagenes)}", True, COLOR_BLANCO)
-            texto3 = self.fuente_mediana.render("Luego reinicia la herramienta", True, COLOR_GRIS)
+            texto1 = self.textos.renderizar(self.fuente_grande, "📁 Coloca tus imágenes NIRI en:", COLOR_AMARILLO)
+            texto2 = self.textos.renderizar(self.fuente_mediana, f"    {os.path.abspath(self.carpeta_imagenes)}", COLOR_BLANCO)
+            texto3 = self.textos.renderizar(self.fuente_mediana, "Luego reinicia la herramienta", COLOR_GRIS)
             
             self.ventana.blit(texto1, (50, 300))
             self.ventana.blit(texto2, (50, 350))
             self.ventana.blit(texto3, (50, 400))
             return
         
-        # Calcular escala para que quepa
-        margen_x = 50
-        margen_y = 120
-        ancho_disponible = ANCHO_VENTANA - 450  # Menos panel lateral
-        alto_disponible = ALTO_VENTANA - margen_y - 50
-        
-        escala_ancho = ancho_disponible / self.imagen_actual.get_width()
-        escala_alto = alto_disponible / self.imagen_actual.get_height()
-        self.escala = min(escala_ancho, escala_alto, 1.0) * self.zoom
-        
-        nuevo_ancho = int(self.imagen_actual.get_width() * self.escala)
-        nuevo_alto = int(self.imagen_actual.get_height() * self.escala)
-        
-        self.imagen_escalada = pygame.transform.scale(self.imagen_actual, (nuevo_ancho, nuevo_alto))
-        
-        # Posición de la imagen
-        x_imagen = margen_x
-        y_imagen = margen_y
-        
-        self.rect_imagen = self.imagen_escalada.get_rect(topleft=(x_imagen, y_imagen))
+        self.actualizar_vista()
         
-        # Dibujar imagen
-        self.ventana.blit(self.imagen_escalada, self.rect_imagen)
+        # Dibujar solo las teselas visibles del nivel de la pirámide más cercano
+        self.ventana.set_clip(self.rect_vista)
+        self.piramide.dibujar(self.ventana, self.imagen_a_pantalla(0, 0), self.escala, self.rect_imagen)
         
         # Borde de la imagen
         pygame.draw.rect(self.ventana, COLOR_GRIS, self.rect_imagen, 2)
         
-        # Dibujar polígonos completados
-        for poligono in self.poligonos_completados:
-            puntos_pantalla = []
-            for punto in poligono:
-                x = self.rect_imagen.left + punto['x'] * self.escala
-                y = self.rect_imagen.top + punto['y'] * self.escala
-                puntos_pantalla.append((x, y))
-            
-            if len(puntos_pantalla) > 2:
-                pygame.draw.polygon(self.ventana, COLOR_ROJO, puntos_pantalla, 3)
-                # Puntos
-                for punto in puntos_pantalla:
-                    pygame.draw.circle(self.ventana, COLOR_ROJO, punto, 5)
+        # Polígonos completados: capa ya proyectada
+        self.ventana.blit(self.obtener_capa_poligonos(), self.rect_vista)
         
         # Dibujar polígono en progreso
         if len(self.puntos_poligono_actual) > 0:
-            puntos_pantalla = []
-            for punto in self.puntos_poligono_actual:
-                x = self.rect_imagen.left + punto['x'] * self.escala
-                y = self.rect_imagen.top + punto['y'] * self.escala
-                puntos_pantalla.append((x, y))
+            puntos_pantalla = [self.imagen_a_pantalla(punto['x'], punto['y']) for punto in self.puntos_poligono_actual]
             
-            # Líneas
+            # Líneas (la región sembrada ya es un contorno cerrado)
             if len(puntos_pantalla) > 1:
-                pygame.draw.lines(self.ventana, COLOR_AZUL, False, puntos_pantalla, 3)
+                pygame.draw.lines(self.ventana, COLOR_AZUL, self.semilla_region is not None, puntos_pantalla, 3)
             
             # Puntos
             for i, punto in enumerate(puntos_pantalla):
                 color = COLOR_VERDE if i == 0 else COLOR_AZUL
                 pygame.draw.circle(self.ventana, color, punto, 6)
+        
+        self.dibujar_vista_previa_borde()
+        self.ventana.set_clip(None)
+    
+    def dibujar_vista_previa_borde(self):
+        """
+        Dónde caería el próximo click (anillo amarillo) y, con el live-wire,
+        el tramo que se añadiría. Se calcula en cada frame en que se mueve el
+        ratón: ajustar es una ventana pequeña de NumPy y el camino un
+        recorrido de predecesores, muy por debajo de los 16 ms de un frame.
+        """
+        if not (self.iman or self.seguir_bordes) or self.mapa_bordes is None or self.buscando or self.modo_region:
+            return
+        coords = self.obtener_coordenadas_imagen(pygame.mouse.get_pos())
+        if coords is None:
+            return
+        destino = self.ajustar_punto(coords)
+        puntos = [destino]
+        if self.puntos_poligono_actual:
+            puntos = [self.puntos_poligono_actual[-1]] + self.tramo_hasta(destino, refinar=False) + [destino]
+        if len(puntos) > 1:
+            pygame.draw.lines(self.ventana, COLOR_AMARILLO, False,
+                              [self.imagen_a_pantalla(punto['x'], punto['y']) for punto in puntos], 2)
+        pygame.draw.circle(self.ventana, COLOR_AMARILLO, self.imagen_a_pantalla(destino['x'], destino['y']), 7, 2)
+    
+    def dibujar_tira(self):
+        """
+        Tira de miniaturas: solo se recorren los huecos visibles (más uno por
+        la fracción del desplazamiento), así que cuesta lo mismo con cien que
+        con cien mil imágenes. Pide a la caché las visibles y, detrás, una
+        pantalla a cada lado.
+        """
+        pygame.draw.rect(self.ventana, (30, 41, 59), self.rect_tira)
+        total = len(self.imagenes)
+        if total == 0:
+            return
+        
+        self.mover_tira(self.inicio_tira)
+        huecos = self.huecos_tira()
+        primero = int(self.inicio_tira)
+        desplazamiento = int((self.inicio_tira - primero) * PASO_TIRA)
+        visibles = range(primero, min(primero + huecos + 1, total))
+        
+        self.ventana.set_clip(self.rect_tira)
+        for hueco, indice in enumerate(visibles):
+            x = self.rect_tira.left + hueco * PASO_TIRA - desplazamiento + 4
+            y = self.rect_tira.top + 6
+            marco = pygame.Rect(x - 2, y - 2, TAMANO_MINIATURA[0] + 4, TAMANO_MINIATURA[1] + 4)
+            miniatura = self.miniaturas.obtener(self.imagenes[indice])
+            if miniatura is not None:
+                self.ventana.blit(miniatura, miniatura.get_rect(center=marco.center))
+            else:
+                pygame.draw.rect(self.ventana, COLOR_FONDO, marco)
+            
+            # Marca inferior: verde si ya está etiquetada
+            color_marca = COLOR_VERDE if self.imagenes.etiquetadas[indice] else COLOR_GRIS
+            pygame.draw.rect(self.ventana, color_marca, (marco.left, marco.bottom + 3, marco.width, 4))
+            if indice == self.indice_actual:
+                pygame.draw.rect(self.ventana, COLOR_AZUL, marco, 3)
+            elif self.buscando and indice == self.resultado_busqueda:
+                pygame.draw.rect(self.ventana, COLOR_AMARILLO, marco, 3)
+        self.ventana.set_clip(None)
+        
+        # Barra de desplazamiento proporcional a la lista entera
+        barra = self.rect_barra_tira()
+        pygame.draw.rect(self.ventana, COLOR_FONDO, barra)
+        if total > huecos:
+            ancho = max(24, barra.width * huecos // total)
+            x = barra.left + (barra.width - ancho) * self.inicio_tira / (total - huecos)
+            pygame.draw.rect(self.ventana, COLOR_GRIS, (int(x), barra.top, ancho, barra.height))
+        
+        pedidas = [self.imagenes[indice] for indice in visibles]
+        for distancia in range(1, huecos + 1):
+            for indice in (visibles.stop - 1 + distancia, visibles.start - distancia):
+                if 0 <= indice < total:
+                    pedidas.append(self.imagenes[indice])
+        self.miniaturas.programar(pedidas)
+    
+    def dibujar_busqueda(self):
+        """Barra de búsqueda sobre la parte superior de la imagen"""
+        rect = pygame.Rect(self.rect_vista.left, self.rect_vista.top, self.rect_vista.width, 64)
+        pygame.draw.rect(self.ventana, (30, 41, 59), rect)
+        pygame.draw.rect(self.ventana, COLOR_AMARILLO, rect, 2)
+        
+        coincidencias = self.coincidencias_busqueda
+        texto_total = f"{coincidencias}+" if coincidencias >= 1000 else str(coincidencias)
+        linea = f"🔎 {self.consulta}_   |   Filtro: {FILTROS_BUSQUEDA[self.filtro_busqueda]}   |   {texto_total} nombres"
+        self.ventana.blit(self.textos.renderizar(self.fuente_mediana, linea, COLOR_BLANCO), (rect.left + 10, rect.top + 8))
+        if self.resultado_busqueda is not None:
+            detalle = f"ENTER: ir a {self.imagenes[self.resultado_busqueda]} ({self.resultado_busqueda + 1})"
+            color = COLOR_AMARILLO
+        else:
+            detalle = "Sin resultados"
+            color = COLOR_ROJO
+        detalle += "   ·   TAB: filtro   ·   ^ al inicio: prefijo   ·   ESC: cerrar"
+        self.ventana.blit(self.textos.renderizar(self.fuente_pequena, detalle, color), (rect.left + 10, rect.top + 38))
+    
+    def obtener_capa_poligonos(self):
+        """
+        Superficie del tamaño de la vista con los polígonos completados ya
+        proyectados. Solo se vuelve a dibujar cuando cambian los polígonos,
+        el zoom o el desplazamiento; los píxeles vacíos usan clave de color
+        con RLE, así pegarla cuesta poco.
+        """
+        clave = (self.version_poligonos, self.escala, self.offset_x, self.offset_y, tuple(self.rect_vista))
+        if clave == self.clave_capa:
+            return self.capa_poligonos
+        
+        if self.capa_poligonos is None or self.capa_poligonos.get_size() != self.rect_vista.size:
+            self.capa_poligonos = pygame.Surface(self.rect_vista.size)
+        self.capa_poligonos.fill(COLOR_TRANSPARENTE)
+        for poligono in self.poligonos_completados:
+            puntos_pantalla = [self.imagen_a_pantalla(punto['x'], punto['y']) for punto in poligono]
+            puntos_capa = [(x - self.rect_vista.left, y - self.rect_vista.top) for x, y in puntos_pantalla]
+            
+            if len(puntos_capa) > 2:
+                pygame.draw.polygon(self.capa_poligonos, COLOR_ROJO, puntos_capa, 3)
+                # Puntos
+                for punto in puntos_capa:
+                    pygame.draw.circle(self.capa_poligonos, COLOR_ROJO, punto, 5)
+        self.capa_poligonos.set_colorkey(COLOR_TRANSPARENTE, pygame.RLEACCEL)
+        self.clave_capa = clave
+        return self.capa_poligonos
+    
+    def resumen_navegacion(self):
+        """Latencia de la última navegación y media de las recientes"""
+        if not self.latencias_navegacion:
+            return "Navegación: -"
+        ultima, precargada = self.latencias_navegacion[-1]
+        media = sum(latencia for latencia, _ in self.latencias_navegacion) / len(self.latencias_navegacion)
+        aciertos = sum(1 for _, estaba_lista in self.latencias_navegacion if estaba_lista)
+        return (f"Navegación: {ultima:.0f} ms ({'precargada' if precargada else 'en espera'}), "
+                f"media {media:.0f} ms, {aciertos}/{len(self.latencias_navegacion)} precargadas")
     
     def dibujar_panel_lateral(self):
         """Dibuja el panel lateral con controles"""
@@ -355,7 +969,7 @@ class HerramientaEtiquetado:
         y_actual = y_panel + 20
         
         # Título
-        titulo = self.fuente_grande.render("Controles", True, COLOR_BLANCO)
+        titulo = self.textos.renderizar(self.fuente_grande, "Controles", COLOR_BLANCO)
         self.ventana.blit(titulo, (x_panel + 20, y_actual))
         y_actual += 50
         
@@ -365,16 +979,21 @@ class HerramientaEtiquetado:
             f"Polígonos: {len(self.poligonos_completados)}",
             f"Dificultad: {self.dificultad.upper()}"
         ]
+        if self.imagenes:
+            revisiones = len(self.etiquetas.historial(self.imagenes[self.indice_actual]))
+            stats.append(f"Revisiones guardadas: {revisiones}")
+        stats.append(f"Imán (M): {'sí' if self.iman else 'no'} | Seguir bordes (L): {'sí' if self.seguir_bordes else 'no'}")
+        stats.append(f"Región (G): {'sí' if self.modo_region else 'no'} | Tolerancia (+/-): {self.tolerancia_region}")
         
         for stat in stats:
-            texto = self.fuente_pequena.render(stat, True, COLOR_GRIS)
+            texto = self.textos.renderizar(self.fuente_pequena, stat, COLOR_GRIS)
             self.ventana.blit(texto, (x_panel + 20, y_actual))
             y_actual += 30
         
         y_actual += 20
         
         # Selección de dificultad
-        texto = self.fuente_mediana.render("Dificultad:", True, COLOR_BLANCO)
+        texto = self.textos.renderizar(self.fuente_mediana, "Dificultad:", COLOR_BLANCO)
         self.ventana.blit(texto, (x_panel + 20, y_actual))
         y_actual += 35
         
@@ -397,7 +1016,7 @@ class HerramientaEtiquetado:
                 (x_panel + 20, y_actual, 100, 35),
                 2
             )
-            texto = self.fuente_pequena.render(etiqueta, True, COLOR_BLANCO)
+            texto = self.textos.renderizar(self.fuente_pequena, etiqueta, COLOR_BLANCO)
             texto_rect = texto.get_rect(center=(x_panel + 70, y_actual + 17))
             self.ventana.blit(texto, texto_rect)
             y_actual += 45
@@ -411,19 +1030,23 @@ class HerramientaEtiquetado:
             ("ESPACIO", "Deshacer punto"),
             ("BACKSPACE", "Borrar polígono"),
             ("S", "Guardar y siguiente"),
+            ("R", "Reintentar copias fallidas"),
             ("E", "Exportar JSON"),
             ("1/2/3", "Cambiar dificultad"),
             ("←/→", "Imagen anterior/siguiente"),
+            ("N", "Siguiente sin etiquetar"),
+            ("RUEDA", "Zoom (0: quitar zoom)"),
+            ("ARRASTRAR", "Mover (botón derecho)"),
             ("ESC", "Salir")
         ]
         
-        texto = self.fuente_mediana.render("Atajos:", True, COLOR_BLANCO)
+        texto = self.textos.renderizar(self.fuente_mediana, "Atajos:", COLOR_BLANCO)
         self.ventana.blit(texto, (x_panel + 20, y_actual))
         y_actual += 35
         
         for tecla, accion in atajos:
-            texto_tecla = self.fuente_pequena.render(tecla, True, COLOR_AZUL)
-            texto_accion = self.fuente_pequena.render(f": {accion}", True, COLOR_GRIS)
+            texto_tecla = self.textos.renderizar(self.fuente_pequena, tecla, COLOR_AZUL)
+            texto_accion = self.textos.renderizar(self.fuente_pequena, f": {accion}", COLOR_GRIS)
             self.ventana.blit(texto_tecla, (x_panel + 20, y_actual))
             self.ventana.blit(texto_accion, (x_panel + 100, y_actual))
             y_actual += 25
@@ -440,20 +1063,65 @@ class HerramientaEtiquetado:
         ]
         
         texto = "".join(instrucciones)
-        rendered = self.fuente_pequena.render(texto, True, COLOR_AMARILLO)
+        rendered = self.textos.renderizar(self.fuente_pequena, texto, COLOR_AMARILLO)
         rect = rendered.get_rect(center=(ANCHO_VENTANA // 2, y))
         self.ventana.blit(rendered, rect)
     
-    def manejar_eventos(self):
+    def dibujar_depuracion(self):
+        """Superposición con el modo del bucle y las cachés (F3)"""
+        lineas = [self.planificador.resumen(), self.textos.resumen(), self.resumen_navegacion(),
+                  self.cache_imagenes.resumen(), self.imagenes.resumen(), self.miniaturas.resumen()]
+        if self.piramide is not None:
+            lineas.append(self.piramide.resumen())
+        if self.mapa_bordes is not None:
+            lineas.append(self.mapa_bordes.resumen())
+        y = ALTO_VENTANA - 10 - len(lineas) * 22
+        pygame.draw.rect(self.ventana, COLOR_NEGRO, (5, y - 5, 760, len(lineas) * 22 + 10))
+        for i, linea in enumerate(lineas):
+            self.ventana.blit(self.textos.renderizar(self.fuente_pequena, linea, COLOR_AMARILLO), (10, y + i * 22))
+    
+    def manejar_eventos(self, eventos):
         """Maneja los eventos del usuario"""
-        for evento in pygame.event.get():
+        for evento in eventos:
             if evento.type == pygame.QUIT:
                 return False
             
+            # Rueda: desplaza la tira si el ratón está sobre ella; si no, zoom centrado en el ratón
+            if evento.type == pygame.MOUSEWHEEL:
+                if self.rect_tira.collidepoint(pygame.mouse.get_pos()):
+                    self.mover_tira(self.inicio_tira - evento.y * MINIATURAS_POR_RUEDA)
+                else:
+                    self.cambiar_zoom(PASO_ZOOM ** evento.y, pygame.mouse.get_pos())
+            
+            # Tira: arrastrar la barra para recorrer la lista entera, click en una miniatura para ir a ella
+            if evento.type == pygame.MOUSEBUTTONDOWN and evento.button == 1 and self.rect_tira.collidepoint(evento.pos):
+                if self.rect_barra_tira().inflate(0, 8).collidepoint(evento.pos):
+                    self.arrastrando_barra = True
+                    self.mover_tira_con_barra(evento.pos[0])
+                elif self.indice_en_tira(evento.pos) is not None:
+                    self.ir_a(self.indice_en_tira(evento.pos))
+                continue
+            if evento.type == pygame.MOUSEBUTTONUP and evento.button == 1:
+                self.arrastrando_barra = False
+            if evento.type == pygame.MOUSEMOTION and self.arrastrando_barra:
+                self.mover_tira_con_barra(evento.pos[0])
+            
+            # Botón central o derecho: arrastrar para desplazar la vista
+            if evento.type == pygame.MOUSEBUTTONDOWN and evento.button in (2, 3):
+                self.arrastre_previo = evento.pos
+            if evento.type == pygame.MOUSEBUTTONUP and evento.button in (2, 3):
+                self.arrastre_previo = None
+            if evento.type == pygame.MOUSEMOTION and self.arrastre_previo is not None:
+                self.offset_x -= (evento.pos[0] - self.arrastre_previo[0]) / self.escala
+                self.offset_y -= (evento.pos[1] - self.arrastre_previo[1]) / self.escala
+                self.arrastre_previo = evento.pos
+            
             # Click del mouse
-            if evento.type == pygame.MOUSEBUTTONDOWN:
+            if evento.type == pygame.MOUSEBUTTONDOWN and evento.button == 1:
                 coords = self.obtener_coordenadas_imagen(evento.pos)
-                if coords:
+                if coords and self.modo_region:
+                    self.sembrar_region(coords)
+                elif coords:
                     # Verificar si clickea cerca del primer punto para cerrar
                     if len(self.puntos_poligono_actual) > 2:
                         primer_punto = self.puntos_poligono_actual[0]
@@ -461,17 +1129,38 @@ class HerramientaEtiquetado:
                                (coords['y'] - primer_punto['y'])**2) ** 0.5
                         
                         if dist < 15 / self.escala:
+                            # Con el live-wire el cierre también sigue el borde hasta el primer punto
+                            self.puntos_poligono_actual.extend(self.tramo_hasta(primer_punto))
                             self.cerrar_poligono()
                             return True
                     
-                    self.puntos_poligono_actual.append(coords)
+                    self.anadir_vertice(self.ajustar_punto(coords))
             
             # Teclas
             if evento.type == pygame.KEYDOWN:
+                if self.buscando:
+                    self.manejar_tecla_busqueda(evento)
+                    continue
+                
+                # / o Ctrl+F: Buscar por nombre
+                if evento.unicode == "/" or (evento.key == pygame.K_f and evento.mod & pygame.KMOD_CTRL):
+                    self.buscando = True
+                    self.actualizar_busqueda()
+                    continue
+                
                 # ESC: Salir
                 if evento.key == pygame.K_ESCAPE:
                     return False
                 
+                # F3: Superposición de depuración
+                if evento.key == pygame.K_F3:
+                    self.mostrar_depuracion = not self.mostrar_depuracion
+                
+                # F5: Revisar la carpeta ahora
+                if evento.key == pygame.K_F5:
+                    if not self.revisar_carpeta():
+                        print("🔄 Sin cambios en la carpeta")
+                
                 # ENTER: Cerrar polígono
                 if evento.key == pygame.K_RETURN:
                     self.cerrar_poligono()
@@ -488,6 +1177,12 @@ class HerramientaEtiquetado:
                 if evento.key == pygame.K_s:
                     self.guardar_etiquetas()
                 
+                # R: Reintentar las copias que fallaron
+                if evento.key == pygame.K_r:
+                    reintentadas = self.escritor.reintentar_fallidas()
+                    if reintentadas:
+                        print(f"🔁 Reintentando {reintentadas} copias")
+                
                 # E: Exportar JSON
                 if evento.key == pygame.K_e:
                     self.exportar_json()
@@ -503,6 +1198,38 @@ class HerramientaEtiquetado:
                         self.indice_actual += 1
                         self.cargar_imagen_actual()
                 
+                # N: Siguiente imagen sin etiquetar
+                if evento.key == pygame.K_n:
+                    self.ir_a_siguiente_sin_etiquetar()
+                
+                # M: Imán a los bordes
+                if evento.key == pygame.K_m:
+                    self.iman = not self.iman
+                    print(f"🧲 Ajuste a bordes: {'activado' if self.iman else 'desactivado'}")
+                
+                # L: Live-wire (el trazo entre clicks sigue los bordes)
+                if evento.key == pygame.K_l:
+                    self.seguir_bordes = not self.seguir_bordes
+                    self.preparar_trazado()
+                    print(f"〰️  Seguir bordes entre clicks: {'activado' if self.seguir_bordes else 'desactivado'}")
+                
+                # G: Modo región (un click siembra el polígono de la lesión)
+                if evento.key == pygame.K_g:
+                    self.modo_region = not self.modo_region
+                    print(f"🌱 Sembrar regiones con un click: {'activado' if self.modo_region else 'desactivado'}")
+                
+                # +/-: Tolerancia de la región
+                if evento.unicode == "+" or evento.key == pygame.K_KP_PLUS:
+                    self.cambiar_tolerancia(PASO_TOLERANCIA)
+                if evento.unicode == "-" or evento.key == pygame.K_KP_MINUS:
+                    self.cambiar_tolerancia(-PASO_TOLERANCIA)
+                
+                # 0: Quitar el zoom
+                if evento.key == pygame.K_0:
+                    self.zoom = 1.0
+                    self.offset_x = 0
+                    self.offset_y = 0
+                
                 # 1, 2, 3: Cambiar dificultad
                 if evento.key == pygame.K_1:
                     self.dificultad = "easy"
@@ -519,14 +1246,39 @@ class HerramientaEtiquetado:
     def ejecutar(self):
         """Bucle principal de la aplicación"""
         ejecutando = True
+        self.dibujar()
         
         while ejecutando:
-            ejecutando = self.manejar_eventos()
-            self.dibujar()
-            self.reloj.tick(60)
+            # La pantalla solo cambia con la entrada del usuario: sin eventos no se
+            # redibuja, y solo se gira a ritmo completo mientras se arrastra el ratón
+            arrastrando = any(pygame.mouse.get_pressed())
+            plazo = REFRESCO_DEPURACION_MS if self.mostrar_depuracion else None
+            eventos = self.planificador.esperar(activo=arrastrando, plazo_ms=plazo)
+            ejecutando = self.manejar_eventos(eventos)
+            # El bucle se despierta al menos una vez por segundo, así que no hace falta plazo propio
+            revisada = False
+            if time.perf_counter() - self.ultima_revision >= INTERVALO_REVISION_S:
+                revisada = self.revisar_carpeta()
+            if eventos or arrastrando or self.mostrar_depuracion or revisada:
+                self.dibujar()
+        
+        print(f"📊 {self.textos.resumen()}")
+        print(f"📊 {self.resumen_navegacion()}")
+        
+        # Terminar las copias pendientes antes de salir
+        if self.escritor.pendientes():
+            print(f"💾 Esperando {self.escritor.pendientes()} copias pendientes...")
+        self.escritor.cerrar()
+        for descripcion, _, _, error in self.escritor.fallidas:
+            print(f"❌ No se pudo guardar {descripcion}: {error}")
+        self.precargador.cerrar()
+        self.miniaturas.cerrar()
+        self.hilo_bordes.shutdown(cancel_futures=True)
+        if self.archivo_dataset is not None:
+            self.archivo_dataset.cerrar()
         
         # Al salir, preguntar si exportar
-        if len(self.datos_etiquetados) > 0:
+        if len(self.etiquetas) > 0:
             print("\n¿Quieres exportar las etiquetas antes de salir? (S/N)")
             # Nota: En una versión más avanzada, podrías usar un diálogo gráfico
         
@@ -543,17 +1295,27 @@ if __name__ == "__main__":
     print("=" * 70)
     print("\n📋 INSTRUCCIONES INICIALES:")
     print("\n1. Coloca tus imágenes NIRI en la carpeta: imagenes_niri/")
+    print("   (pueden ir en subcarpetas por paciente/visita, o en un archivo")
+    print("   imagenes_niri.niripak creado con archivo_dataset.py)")
     print("2. La herramienta creará automáticamente las carpetas necesarias")
     print("3. Las imágenes etiquetadas se guardarán en: imagenes_etiquetadas/")
     print("\n💡 CONTROLES:")
     print("   • Click en la imagen para añadir puntos al polígono")
+    print("     (se ajustan al borde más cercano; M activa/desactiva, SHIFT+click sin ajuste)")
+    print("   • L para que el trazo entre clicks siga los bordes (live-wire)")
+    print("   • G para marcar una lesión con un solo click (la región crece desde el click;")
+    print("     +/- cambian la tolerancia, ENTER acepta el polígono)")
     print("   • ENTER para cerrar el polígono actual")
     print("   • ESPACIO para deshacer el último punto")
     print("   • BACKSPACE para borrar el último polígono")
     print("   • S para guardar la imagen actual y pasar a la siguiente")
     print("   • E para exportar todo a JSON")
     print("   • 1/2/3 para cambiar dificultad (Fácil/Media/Difícil)")
-    print("   • ←/→ para navegar entre imágenes")
+    print("   • Rueda del ratón para hacer zoom, 0 para quitarlo")
+    print("   • Arrastrar con el botón derecho para mover la imagen ampliada")
+    print("   • ←/→ para navegar entre imágenes, o click en la tira de miniaturas")
+    print("   • / (o Ctrl+F) para buscar por nombre; TAB cambia el filtro, ENTER salta")
+    print("   • F5 para buscar imágenes nuevas ahora (se hace solo cada 5 s)")
     print("   • ESC para salir")
     print("\n🎯 PROCESO:")
     print("   1. Marca las caries dibujando polígonos alrededor de ellas")
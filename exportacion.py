@@ -0,0 +1,274 @@
+"""
+EXPORTACIÓN INCREMENTAL DE ETIQUETAS
+Escribe las etiquetas vigentes en el formato del juego (JSON), en JSONL
+compacto y en COCO con máscaras RLE, registro a registro y regenerando
+solo los registros que cambiaron desde la última exportación
+
+ARCHIVO: exportacion.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pygame
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+FORMATO_JUEGO = "juego"
+FORMATO_JSONL = "jsonl"
+FORMATO_COCO = "coco"
+FORMATOS = (FORMATO_JUEGO, FORMATO_JSONL, FORMATO_COCO)
+
+ARCHIVOS_SALIDA = {
+    FORMATO_JUEGO: "etiquetas_caries.json",
+    FORMATO_JSONL: "etiquetas_caries.jsonl",
+    FORMATO_COCO: "etiquetas_caries_coco.json"
+}
+NOMBRE_CACHE = ".cache_exportacion.db"
+
+ANOTACIONES_POR_IMAGEN = 1000  # id de anotación COCO = id_imagen * 1000 + n.º de polígono
+CATEGORIAS_COCO = [{"id": 1, "name": "caries", "supercategory": "lesion"}]
+
+VERSION_CACHE = 3  # Sube si cambia el esquema o el texto generado: una caché de otra versión se descarta entera
+ESQUEMA_CACHE = """
+CREATE TABLE IF NOT EXISTS fragmentos (
+    formato TEXT NOT NULL,
+    parte TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    huella TEXT NOT NULL,
+    texto TEXT NOT NULL,
+    PRIMARY KEY (formato, parte, nombre)
+);
+CREATE INDEX IF NOT EXISTS idx_fragmentos_orden ON fragmentos(formato, parte, orden);
+"""
+
+# ============================================================================
+# MÁSCARAS RLE
+# ============================================================================
+
+def rasterizar_poligono(poligono, ancho, alto):
+    """
+    Devuelve (x0, y0, mascara) con la máscara del polígono solo dentro de su
+    caja; mascara[x, y] (orden de pygame.surfarray) es True dentro.
+    """
+    xs = [p['x'] for p in poligono]
+    ys = [p['y'] for p in poligono]
+    x0 = max(0, int(min(xs)))
+    y0 = max(0, int(min(ys)))
+    x1 = min(ancho, int(max(xs)) + 1)
+    y1 = min(alto, int(max(ys)) + 1)
+    if x1 <= x0 or y1 <= y0:
+        return x0, y0, np.zeros((0, 0), dtype=bool)
+
+    superficie = pygame.Surface((x1 - x0, y1 - y0), 0, 8)
+    superficie.fill(0)
+    pygame.draw.polygon(superficie, 1, [(x - x0, y - y0) for x, y in zip(xs, ys)])
+    return x0, y0, pygame.surfarray.array2d(superficie) != 0
+
+
+def rle_coco(x0, y0, mascara, ancho, alto):
+    """
+    RLE sin comprimir de COCO ({"size": [alto, ancho], "counts": [...]}):
+    recorre la imagen por columnas y alterna tramos de ceros y unos,
+    empezando por ceros. Solo se mira la caja de la máscara.
+    """
+    columnas, filas = mascara.shape
+    bordes = np.zeros((columnas, filas + 2), dtype=np.int8)
+    bordes[:, 1:-1] = mascara
+    cambios_x, cambios_y = np.nonzero(np.diff(bordes, axis=1))
+    # Índice lineal (por columnas) de cada cambio 0->1 o 1->0
+    posiciones = (x0 + cambios_x) * alto + y0 + cambios_y
+    # Un tramo que acaba al pie de una columna y sigue arriba de la siguiente
+    # deja el mismo índice dos veces: se unen quitando ambos
+    valores, repeticiones = np.unique(posiciones, return_counts=True)
+    posiciones = valores[repeticiones == 1]
+    limites = np.concatenate(([0], posiciones, [ancho * alto]))
+    counts = np.diff(limites)
+    # Solo el primer tramo (fondo inicial) puede medir 0; si la máscara llega
+    # al último píxel, el límite final se repite y sobra un tramo vacío
+    if len(counts) > 1 and counts[-1] == 0:
+        counts = counts[:-1]
+    return {"size": [alto, ancho], "counts": counts.tolist()}
+
+# ============================================================================
+# FRAGMENTOS POR FORMATO
+# ============================================================================
+
+def huella_registro(orden, registro):
+    """
+    Hash del contenido del registro y de su orden (del que sale el id de
+    imagen en COCO). Con él la caché no depende del número de revisión, que
+    se repite si el diario se reinicia o se sustituye.
+    """
+    texto = json.dumps([orden, registro], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def fragmentos_registro(formato, orden, registro, tamano_imagen):
+    """
+    Texto de un registro en `formato`, como dict parte -> texto. COCO tiene
+    dos partes (su entrada en "images" y sus entradas en "annotations").
+    """
+    if formato == FORMATO_JUEGO:
+        return {"registro": json.dumps(registro, ensure_ascii=False)}
+    if formato == FORMATO_JSONL:
+        return {"registro": json.dumps(registro, ensure_ascii=False, separators=(',', ':'))}
+
+    ancho, alto = tamano_imagen(registro)
+    id_imagen = orden + 1
+    imagen = {"id": id_imagen, "file_name": registro['imageName'], "width": ancho, "height": alto}
+    anotaciones = []
+    for numero, poligono in enumerate(registro['polygons']):
+        if len(poligono) < 3:
+            continue
+        x0, y0, mascara = rasterizar_poligono(poligono, ancho, alto)
+        xs = [p['x'] for p in poligono]
+        ys = [p['y'] for p in poligono]
+        anotaciones.append(json.dumps({
+            "id": id_imagen * ANOTACIONES_POR_IMAGEN + numero,
+            "image_id": id_imagen,
+            "category_id": 1,
+            "segmentation": rle_coco(x0, y0, mascara, ancho, alto),
+            "area": int(mascara.sum()),
+            "bbox": [min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)],
+            "iscrowd": 0
+        }, separators=(',', ':')))
+    return {"imagen": json.dumps(imagen, ensure_ascii=False), "anotaciones": ",\n".join(anotaciones)}
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class ExportadorEtiquetas:
+    """
+    Exporta a archivos fijos de la carpeta de salida (sin un archivo nuevo
+    por exportación). El texto de cada registro se guarda en una caché
+    SQLite junto al hash de su contenido: al exportar solo se regeneran los
+    registros que cambiaron (lo caro en COCO es rasterizar las máscaras), se
+    borran los de imágenes que ya no tienen etiqueta vigente y luego se
+    vuelcan los fragmentos en orden, uno a uno, a un temporal que sustituye
+    al archivo final.
+    """
+
+    def __init__(self, carpeta_salida, tamano_imagen):
+        """
+        tamano_imagen: función registro -> (ancho, alto), para COCO cuando el
+            registro no trae 'width'/'height'
+        """
+        self.carpeta_salida = carpeta_salida
+        self.tamano_imagen = tamano_imagen
+        self.ruta_cache = os.path.join(carpeta_salida, NOMBRE_CACHE)
+        self.cerrojo = threading.Lock()  # Dos exportaciones a la vez pisarían los mismos temporales
+
+    def tamano_registro(self, registro):
+        """Tamaño de la imagen de un registro, sin abrirla si el registro ya lo trae"""
+        if 'width' in registro and 'height' in registro:
+            return registro['width'], registro['height']
+        return self.tamano_imagen(registro)
+
+    def exportar(self, vigentes, formatos=FORMATOS):
+        """
+        vigentes: lista de (orden, revision, registro) con la etiqueta vigente de cada imagen
+        Devuelve un dict formato -> (ruta, registros regenerados).
+        Abre su propia conexión, así puede ejecutarse en un hilo del escritor.
+        """
+        with self.cerrojo:
+            conexion = sqlite3.connect(self.ruta_cache)
+            resultado = {}
+            try:
+                self.preparar_cache(conexion)
+                self.podar_cache(conexion, vigentes)
+                for formato in formatos:
+                    regenerados = self.actualizar_cache(conexion, formato, vigentes)
+                    ruta = os.path.join(self.carpeta_salida, ARCHIVOS_SALIDA[formato])
+                    self.volcar(conexion, formato, ruta)
+                    resultado[formato] = (ruta, regenerados)
+            finally:
+                conexion.close()
+        return resultado
+
+    def preparar_cache(self, conexion):
+        """Crea las tablas; una caché de otra versión (p. ej. indexada por revisión) se vacía"""
+        (version,) = conexion.execute("PRAGMA user_version").fetchone()
+        if version != VERSION_CACHE:
+            conexion.execute("DROP TABLE IF EXISTS fragmentos")
+            conexion.execute(f"PRAGMA user_version = {VERSION_CACHE}")
+        conexion.executescript(ESQUEMA_CACHE)
+
+    def podar_cache(self, conexion, vigentes):
+        """Borra los fragmentos de imágenes que ya no están entre las vigentes; devuelve cuántas filas"""
+        with conexion:
+            conexion.execute("CREATE TEMP TABLE IF NOT EXISTS nombres_vigentes (nombre TEXT PRIMARY KEY)")
+            conexion.execute("DELETE FROM nombres_vigentes")
+            conexion.executemany("INSERT OR IGNORE INTO nombres_vigentes (nombre) VALUES (?)",
+                                 ((registro['imageName'],) for _, _, registro in vigentes))
+            cursor = conexion.execute(
+                "DELETE FROM fragmentos WHERE nombre NOT IN (SELECT nombre FROM nombres_vigentes)")
+        return cursor.rowcount
+
+    def actualizar_cache(self, conexion, formato, vigentes):
+        """Regenera los fragmentos cuyo contenido (u orden) cambió; devuelve cuántos"""
+        en_cache = dict(conexion.execute(
+            "SELECT nombre, huella FROM fragmentos WHERE formato = ? AND parte = ?",
+            (formato, "imagen" if formato == FORMATO_COCO else "registro")))
+        regenerados = 0
+        with conexion:
+            for orden, _, registro in vigentes:
+                huella = huella_registro(orden, registro)
+                if en_cache.get(registro['imageName']) == huella:
+                    continue
+                partes = fragmentos_registro(formato, orden, registro, self.tamano_registro)
+                conexion.execute("DELETE FROM fragmentos WHERE formato = ? AND nombre = ?",
+                                 (formato, registro['imageName']))
+                conexion.executemany(
+                    "INSERT INTO fragmentos (formato, parte, nombre, orden, huella, texto) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(formato, parte, registro['imageName'], orden, huella, texto) for parte, texto in partes.items()])
+                regenerados += 1
+        return regenerados
+
+    def fragmentos(self, conexion, formato, parte):
+        """Textos no vacíos de `parte`, en orden, leídos de uno en uno"""
+        for (texto,) in conexion.execute(
+                "SELECT texto FROM fragmentos WHERE formato = ? AND parte = ? ORDER BY orden", (formato, parte)):
+            if texto:
+                yield texto
+
+    def volcar(self, conexion, formato, ruta):
+        """Escribe el archivo de `formato` en streaming y lo sustituye de forma atómica"""
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            if formato == FORMATO_JSONL:
+                for texto in self.fragmentos(conexion, formato, "registro"):
+                    archivo.write(texto + "\n")
+            elif formato == FORMATO_JUEGO:
+                self.escribir_lista(archivo, self.fragmentos(conexion, formato, "registro"))
+                archivo.write("\n")
+            else:
+                info = {"description": "Etiquetas de caries NIRI", "date_created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                archivo.write('{\n"info": ' + json.dumps(info, ensure_ascii=False) + ',\n"images": ')
+                self.escribir_lista(archivo, self.fragmentos(conexion, formato, "imagen"))
+                archivo.write(',\n"annotations": ')
+                self.escribir_lista(archivo, self.fragmentos(conexion, formato, "anotaciones"))
+                archivo.write(',\n"categories": ' + json.dumps(CATEGORIAS_COCO) + '\n}\n')
+        os.replace(temporal, ruta)
+
+    def escribir_lista(self, archivo, textos):
+        """Escribe una lista JSON a partir de elementos ya serializados"""
+        archivo.write("[")
+        separador = "\n"
+        for texto in textos:
+            archivo.write(separador + texto)
+            separador = ",\n"
+        archivo.write("\n]")
@@ -0,0 +1,407 @@
+"""
+FUSIÓN DE EXPORTACIONES DE ETIQUETAS
+Une cualquier número de exportaciones (etiquetas_caries_*.json o .jsonl) de
+varios etiquetadores (la exportación COCO, etiquetas_caries_coco.json, no
+es una lista de registros y se omite) en el etiquetas_caries.json que lee el juego: valida
+los polígonos, deja una sola etiqueta por imagen según una política de
+conflicto y escribe el resultado de forma atómica.
+
+Los registros se leen de uno en uno y se apartan en una base SQLite
+temporal, así la memoria no depende del número de registros.
+
+Uso:
+    python fusionar_etiquetas.py [--politica reciente|prioridad|consenso]
+                                 [--prioridad ana,luis] [--salida etiquetas_caries.json]
+                                 exportacion.json[=anotador] ...
+
+ARCHIVO: fusionar_etiquetas.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from geometria import normalizar_poligono, iou
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+ARCHIVO_SALIDA = "etiquetas_caries.json"
+SUFIJO_COCO = "_coco.json"  # Exportación COCO de la herramienta, en la misma carpeta que las demás
+
+POLITICA_RECIENTE = "reciente"    # Gana el guardado más reciente
+POLITICA_PRIORIDAD = "prioridad"  # Gana el anotador que va antes en --prioridad
+POLITICA_CONSENSO = "consenso"    # Gana la etiqueta que más coincide con las demás
+POLITICAS = (POLITICA_RECIENTE, POLITICA_PRIORIDAD, POLITICA_CONSENSO)
+
+DIFICULTADES = ("easy", "medium", "hard")
+DIFICULTAD_POR_DEFECTO = "medium"
+
+UMBRAL_CONSENSO = 0.5  # Por debajo de este acuerdo medio la imagen se informa como conflicto
+CONFLICTOS_LISTADOS = 20  # Los demás solo se cuentan
+TAMANO_BLOQUE_LECTURA = 1 << 20  # Caracteres leídos de cada vez al recorrer un JSON grande
+REGISTROS_POR_TRANSACCION = 5000
+
+ESQUEMA = """
+CREATE TABLE registros (
+    llegada INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    anotador TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    texto TEXT NOT NULL
+);
+"""
+
+# ============================================================================
+# LECTURA EN STREAMING
+# ============================================================================
+
+def leer_registros(ruta):
+    """
+    Recorre los registros de una exportación sin cargarla entera: admite la
+    lista JSON del juego y JSONL (un registro por línea). Un documento JSON
+    que no es una lista (p. ej. una exportación COCO) lanza ValueError antes
+    de dar ningún registro.
+    """
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        inicio = archivo.read(TAMANO_BLOQUE_LECTURA)
+        if inicio.lstrip().startswith('['):
+            yield from _leer_lista(archivo, inicio)
+        else:
+            pendiente = inicio
+            primera = True
+            while True:
+                *lineas, pendiente = pendiente.split("\n")
+                for linea in lineas:
+                    if not linea.strip():
+                        continue
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        if primera:
+                            raise ValueError("no es una lista de registros ni JSONL (¿exportación COCO?)")
+                        raise
+                    primera = False
+                    yield registro
+                bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+                if not bloque:
+                    break
+                pendiente += bloque
+            if pendiente.strip():
+                yield json.loads(pendiente)
+
+
+def _leer_lista(archivo, texto):
+    """Decodifica los elementos de una lista JSON a medida que llegan los bloques"""
+    decodificador = json.JSONDecoder()
+    posicion = texto.index('[') + 1
+    final = False
+    while True:
+        # Saltar espacios y la coma entre elementos
+        while posicion < len(texto) and texto[posicion] in " \t\r\n,":
+            posicion += 1
+        if posicion < len(texto) and texto[posicion] == ']':
+            return
+        try:
+            elemento, fin = decodificador.raw_decode(texto, posicion)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+            final = not bloque
+            texto = texto[posicion:] + bloque
+            posicion = 0
+            continue
+        # Un número al final del bloque podría seguir en el siguiente
+        if fin == len(texto) and not final:
+            bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+            final = not bloque
+            texto = texto[posicion:] + bloque
+            posicion = 0
+            continue
+        yield elemento
+        posicion = fin
+
+# ============================================================================
+# VALIDACIÓN
+# ============================================================================
+
+def _coordenada_valida(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def validar_poligono(poligono, ancho=None, alto=None):
+    """
+    Devuelve el polígono limpio (sin puntos repetidos seguidos) o None si no
+    sirve: menos de 3 puntos, coordenadas no numéricas, fuera de la imagen o
+    área nula.
+    """
+    if not isinstance(poligono, list):
+        return None
+    limpio = []
+    for punto in poligono:
+        if not isinstance(punto, dict) or not _coordenada_valida(punto.get('x')) or not _coordenada_valida(punto.get('y')):
+            return None
+        if ancho is not None and not (0 <= punto['x'] <= ancho and 0 <= punto['y'] <= alto):
+            return None
+        if not limpio or (punto['x'], punto['y']) != (limpio[-1]['x'], limpio[-1]['y']):
+            limpio.append({'x': punto['x'], 'y': punto['y']})
+    if len(limpio) > 1 and (limpio[0]['x'], limpio[0]['y']) == (limpio[-1]['x'], limpio[-1]['y']):
+        limpio.pop()
+    if len(limpio) < 3:
+        return None
+    # Fórmula de Gauss en Python: para unas decenas de puntos es más rápida que pasar por numpy
+    doble_area = sum(p['x'] * q['y'] - q['x'] * p['y'] for p, q in zip(limpio, limpio[1:] + limpio[:1]))
+    if doble_area == 0:
+        return None
+    return limpio
+
+
+def validar_registro(registro, estadisticas):
+    """
+    Registro listo para el juego, o None si no se puede usar. Los polígonos
+    inválidos se descartan y se cuentan en `estadisticas`.
+    """
+    if not isinstance(registro, dict) or not isinstance(registro.get('imageName'), str) \
+            or not registro['imageName'] or not isinstance(registro.get('polygons', []), list):
+        estadisticas['registros_invalidos'] += 1
+        return None
+
+    ancho, alto = registro.get('width'), registro.get('height')
+    if not (_coordenada_valida(ancho) and _coordenada_valida(alto)):
+        ancho = alto = None
+
+    poligonos = []
+    for poligono in registro.get('polygons', []):
+        limpio = validar_poligono(poligono, ancho, alto)
+        if limpio is None:
+            estadisticas['poligonos_invalidos'] += 1
+        else:
+            poligonos.append(limpio)
+
+    if registro.get('difficulty') not in DIFICULTADES:
+        estadisticas['dificultades_corregidas'] += 1
+
+    # Un registro que se quedó sin polígonos válidos no se convierte en un negativo
+    if not poligonos and registro.get('polygons') and not registro.get('es_negativo', False):
+        estadisticas['registros_invalidos'] += 1
+        return None
+
+    validado = dict(registro)
+    validado['difficulty'] = registro['difficulty'] if registro.get('difficulty') in DIFICULTADES else DIFICULTAD_POR_DEFECTO
+    validado['polygons'] = poligonos
+    validado['es_negativo'] = len(poligonos) == 0
+    return validado
+
+# ============================================================================
+# POLÍTICAS DE CONFLICTO
+# ============================================================================
+
+def acuerdo(a, b):
+    """
+    Coincidencia (0-1) entre dos etiquetas de la misma imagen: media del
+    mejor IoU de cada polígono con los del otro, en ambos sentidos. Dos
+    negativos coinciden del todo; un negativo y un positivo, nada.
+    """
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    mejores = [max(iou(p, q) for q in b) for p in a] + [max(iou(q, p) for p in a) for q in b]
+    return sum(mejores) / len(mejores)
+
+
+def elegir(candidatos, politica, prioridades):
+    """
+    Elige la etiqueta vigente entre las de una imagen.
+    candidatos: lista de (llegada, anotador, timestamp, registro)
+    Devuelve (registro, acuerdo medio o None si no se calculó).
+    """
+    def mas_reciente(candidato):
+        return (candidato[2], candidato[0])
+
+    if politica == POLITICA_RECIENTE or len(candidatos) == 1:
+        return max(candidatos, key=mas_reciente)[3], None
+
+    if politica == POLITICA_PRIORIDAD:
+        def rango(candidato):
+            return prioridades.get(candidato[1], len(prioridades))
+        mejor_rango = min(rango(c) for c in candidatos)
+        return max((c for c in candidatos if rango(c) == mejor_rango), key=mas_reciente)[3], None
+
+    # Consenso: la etiqueta más parecida a todas las demás (medoide)
+    geometrias = [[normalizar_poligono(p) for p in c[3]['polygons']] for c in candidatos]
+    sumas = [0.0] * len(candidatos)
+    for i in range(len(candidatos)):
+        for j in range(i + 1, len(candidatos)):
+            valor = acuerdo(geometrias[i], geometrias[j])
+            sumas[i] += valor
+            sumas[j] += valor
+    elegido = max(range(len(candidatos)), key=lambda k: (sumas[k], mas_reciente(candidatos[k])))
+    return candidatos[elegido][3], sumas[elegido] / (len(candidatos) - 1)
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class FusionEtiquetas:
+    """
+    Fusión en dos pasadas: primero se validan los registros de todas las
+    exportaciones y se apartan en una SQLite temporal; después se recorren
+    agrupados por imagen (solo un grupo en memoria) y se escribe la
+    etiqueta elegida de cada una.
+    """
+
+    def __init__(self, politica=POLITICA_RECIENTE, prioridad=()):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política desconocida: {politica}")
+        self.politica = politica
+        self.prioridades = {anotador: rango for rango, anotador in enumerate(prioridad)}
+        self.estadisticas = {
+            'archivos': 0, 'leidos': 0, 'registros_invalidos': 0, 'poligonos_invalidos': 0,
+            'dificultades_corregidas': 0, 'imagenes': 0, 'duplicadas': 0, 'conflictos': 0
+        }
+        self.conflictos = []  # Primeros (imageName, acuerdo medio) sin consenso
+
+        self.carpeta_temporal = tempfile.TemporaryDirectory(prefix="fusion_etiquetas_")
+        self.conexion = sqlite3.connect(os.path.join(self.carpeta_temporal.name, "registros.db"))
+        self.conexion.execute("PRAGMA journal_mode = OFF")
+        self.conexion.execute("PRAGMA synchronous = OFF")
+        self.conexion.executescript(ESQUEMA)
+
+    def agregar(self, ruta, anotador=None):
+        """Valida y aparta los registros de una exportación"""
+        if anotador is None:
+            anotador = os.path.basename(os.path.dirname(os.path.abspath(ruta)))
+        lote = []
+        for registro in leer_registros(ruta):
+            self.estadisticas['leidos'] += 1
+            validado = validar_registro(registro, self.estadisticas)
+            if validado is None:
+                continue
+            lote.append((validado['imageName'], validado.get('anotador', anotador),
+                         str(validado.get('timestamp', "")), json.dumps(validado, ensure_ascii=False)))
+            if len(lote) >= REGISTROS_POR_TRANSACCION:
+                self._insertar(lote)
+                lote = []
+        self._insertar(lote)
+        self.estadisticas['archivos'] += 1
+
+    def _insertar(self, lote):
+        with self.conexion:
+            self.conexion.executemany(
+                "INSERT INTO registros (nombre, anotador, timestamp, texto) VALUES (?, ?, ?, ?)", lote)
+
+    def grupos(self):
+        """Candidatos de cada imagen, de una imagen en una, ordenados por nombre"""
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS idx_registros_nombre ON registros(nombre, llegada)")
+        nombre_actual, candidatos = None, []
+        for llegada, nombre, anotador, timestamp, texto in self.conexion.execute(
+                "SELECT llegada, nombre, anotador, timestamp, texto FROM registros ORDER BY nombre, llegada"):
+            if nombre != nombre_actual and candidatos:
+                yield nombre_actual, candidatos
+                candidatos = []
+            nombre_actual = nombre
+            candidatos.append((llegada, anotador, timestamp, json.loads(texto)))
+        if candidatos:
+            yield nombre_actual, candidatos
+
+    def escribir(self, ruta_salida=ARCHIVO_SALIDA):
+        """Escribe la lista fusionada en un temporal y lo renombra sobre `ruta_salida`"""
+        temporal = ruta_salida + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write("[")
+            separador = "\n"
+            for nombre, candidatos in self.grupos():
+                registro, acuerdo_medio = elegir(candidatos, self.politica, self.prioridades)
+                registro.pop('anotador', None)
+                self.estadisticas['imagenes'] += 1
+                self.estadisticas['duplicadas'] += len(candidatos) > 1
+                if acuerdo_medio is not None and acuerdo_medio < UMBRAL_CONSENSO:
+                    self.estadisticas['conflictos'] += 1
+                    if len(self.conflictos) < CONFLICTOS_LISTADOS:
+                        self.conflictos.append((nombre, acuerdo_medio))
+                archivo.write(separador + json.dumps(registro, ensure_ascii=False))
+                separador = ",\n"
+            archivo.write("\n]\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta_salida)
+
+    def cerrar(self):
+        """Cierra y borra la base temporal"""
+        self.conexion.close()
+        self.carpeta_temporal.cleanup()
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+def expandir_entradas(entradas):
+    """
+    'ruta[=anotador]' (la ruta admite comodines) -> [(ruta, anotador o None)].
+    Los comodines no recogen la exportación COCO: etiquetas_caries_*.json
+    también casa con etiquetas_caries_coco.json.
+    """
+    archivos = []
+    for entrada in entradas:
+        patron, _, anotador = entrada.partition('=')
+        rutas = sorted(glob.glob(patron))
+        omitidas = [ruta for ruta in rutas if ruta.endswith(SUFIJO_COCO)]
+        for ruta in omitidas:
+            print(f"⏭️  {ruta}: exportación COCO, se omite")
+        rutas = [ruta for ruta in rutas if not ruta.endswith(SUFIJO_COCO)] or ([] if omitidas else [patron])
+        archivos.extend((ruta, anotador or None) for ruta in rutas)
+    return archivos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusiona exportaciones de etiquetas de caries")
+    parser.add_argument("entradas", nargs="+", help="exportaciones .json/.jsonl, opcionalmente ruta=anotador")
+    parser.add_argument("--politica", choices=POLITICAS, default=POLITICA_RECIENTE)
+    parser.add_argument("--prioridad", default="", help="anotadores separados por comas, del más fiable al menos")
+    parser.add_argument("--salida", default=ARCHIVO_SALIDA)
+    argumentos = parser.parse_args()
+
+    print("=" * 70)
+    print("🔀 FUSIÓN DE ETIQUETAS")
+    print("=" * 70)
+    inicio = time.perf_counter()
+    fusion = FusionEtiquetas(argumentos.politica, [a for a in argumentos.prioridad.split(",") if a])
+    try:
+        for ruta, anotador in expandir_entradas(argumentos.entradas):
+            try:
+                fusion.agregar(ruta, anotador)
+                print(f"📄 {ruta}")
+            except (OSError, ValueError) as e:
+                print(f"❌ No se pudo leer {ruta}: {e}")
+        fusion.escribir(argumentos.salida)
+    except OSError as e:
+        print(f"❌ Error al escribir {argumentos.salida}: {e}")
+        sys.exit(1)
+    finally:
+        fusion.cerrar()
+
+    e = fusion.estadisticas
+    print(f"\n✅ {argumentos.salida}: {e['imagenes']} imágenes ({e['leidos']} registros de {e['archivos']} archivos)")
+    print(f"   Imágenes con varias etiquetas: {e['duplicadas']} (política: {argumentos.politica})")
+    print(f"   Registros descartados: {e['registros_invalidos']}  Polígonos descartados: {e['poligonos_invalidos']}")
+    if e['dificultades_corregidas']:
+        print(f"   ⚠️  {e['dificultades_corregidas']} registros sin dificultad válida pasan a '{DIFICULTAD_POR_DEFECTO}'")
+    for nombre, acuerdo_medio in fusion.conflictos:
+        print(f"   ⚠️  Sin consenso: {nombre} (acuerdo {acuerdo_medio:.2f})")
+    if e['conflictos'] > len(fusion.conflictos):
+        print(f"   ... y {e['conflictos'] - len(fusion.conflictos)} más sin consenso")
+    print(f"⏱️  {time.perf_counter() - inicio:.1f} s")
+    print("=" * 70)
@@ -0,0 +1,371 @@
+"""
+ÍNDICE DE IMÁGENES DE UNA CARPETA
+Recorre con os.scandir carpetas anidadas (paciente/visita/...), ordena las
+imágenes de forma natural (img2 antes que img10; primero los archivos de
+una carpeta y luego sus subcarpetas) y guarda el estado de etiquetado en un
+bytearray, con el total de etiquetadas al día en O(1).
+Las revisiones posteriores solo vuelven a leer las carpetas cuyo mtime
+cambió. La búsqueda por nombre recorre con str.find un único texto con
+todos los nombres, sin bucles de Python por imagen.
+
+ARCHIVO: indice_imagenes.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import bisect
+import os
+import re
+import time
+from array import array
+from itertools import accumulate
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.bmp')
+PATRON_NUMEROS = re.compile(r'(\d+)')
+INVERTIR_MASCARA = bytes([1, 0]) + bytes(254)  # 0 <-> 1 con bytearray.translate
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def clave_texto(texto):
+    """Clave de orden natural: los tramos de dígitos se comparan como números"""
+    partes = PATRON_NUMEROS.split(texto.lower())
+    partes[1::2] = map(int, partes[1::2])
+    return partes
+
+
+def clave_carpeta(carpeta_relativa):
+    """Clave de una carpeta relativa: componente a componente, así cada carpeta va justo antes de su contenido"""
+    return [clave_texto(parte) for parte in carpeta_relativa.split("/")] if carpeta_relativa else []
+
+
+def clave_natural(nombre):
+    """Clave de un nombre relativo: su carpeta y luego el archivo"""
+    carpeta_relativa, _, archivo = nombre.rpartition("/")
+    return clave_carpeta(carpeta_relativa), clave_texto(archivo)
+
+
+def _unir(carpeta_relativa, nombre):
+    """Nombre relativo con '/' en cualquier sistema: es el imageName de las etiquetas"""
+    return f"{carpeta_relativa}/{nombre}" if carpeta_relativa else nombre
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class IndiceImagenes:
+    """
+    Lista ordenada de nombres relativos (paralela a un bytearray de
+    etiquetadas) y el mtime de cada carpeta visitada.
+
+    Con 200k imágenes no hay un dict por archivo: nombres es una lista de
+    str, etiquetadas un byte por imagen y posiciones solo se reconstruye
+    cuando una revisión cambia algo. Nunca se ordena la lista entera: cada
+    carpeta ordena sus archivos al leerse y el orden global es el de las
+    carpetas concatenadas.
+    """
+
+    def __init__(self, carpeta, esta_etiquetada=lambda nombre: False, excluidas=(), extensiones=EXTENSIONES_IMAGEN):
+        """
+        esta_etiquetada: función nombre -> bool para el estado inicial y para
+            las imágenes que aparezcan después
+        excluidas: nombres que no se indexan (p. ej. las ilegibles del manifiesto)
+        """
+        self.carpeta = carpeta
+        self.extensiones = extensiones
+        self.excluidas = set(excluidas)
+        self.esta_etiquetada = esta_etiquetada
+        self.carpetas = {}  # carpeta relativa -> mtime_ns en la última lectura
+        self.archivos_por_carpeta = {}  # carpeta relativa -> nombres relativos en orden natural
+        self.nombres = []
+        self.etiquetadas = bytearray()
+        self.total_etiquetadas = 0
+        self.posiciones = {}
+        self.duracion_ultimo_escaneo = 0.0
+
+        inicio = time.perf_counter()
+        self._recorrer("")
+        self._ordenar()
+        self._actualizar_estado(esta_etiquetada)
+        self.duracion_ultimo_escaneo = time.perf_counter() - inicio
+
+    @classmethod
+    def desde_nombres(cls, nombres, esta_etiquetada=lambda nombre: False):
+        """Índice fijo a partir de una lista de nombres (p. ej. de un archivo empaquetado)"""
+        indice = cls.__new__(cls)
+        indice.carpeta = None
+        indice.extensiones = EXTENSIONES_IMAGEN
+        indice.excluidas = set()
+        indice.esta_etiquetada = esta_etiquetada
+        indice.carpetas = {}
+        indice.archivos_por_carpeta = {}
+        indice.nombres = sorted(nombres, key=clave_natural)
+        indice.duracion_ultimo_escaneo = 0.0
+        indice._actualizar_estado(esta_etiquetada)
+        return indice
+
+    def _leer_carpeta(self, carpeta_relativa):
+        """Lee una carpeta: guarda sus imágenes y su mtime y devuelve sus subcarpetas"""
+        ruta = os.path.join(self.carpeta, carpeta_relativa) if carpeta_relativa else self.carpeta
+        archivos = []
+        subcarpetas = []
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+            with os.scandir(ruta) as entradas:
+                for entrada in entradas:
+                    nombre = entrada.name
+                    if nombre[0] == '.':
+                        continue
+                    if entrada.is_dir(follow_symlinks=False):
+                        subcarpetas.append(_unir(carpeta_relativa, nombre))
+                    elif nombre.lower().endswith(self.extensiones):
+                        archivos.append(nombre)
+        except OSError:
+            return None
+        # Se ordenan los nombres de archivo solos y después se les pone la carpeta delante
+        archivos.sort(key=clave_texto)
+        prefijo = carpeta_relativa + "/" if carpeta_relativa else ""
+        archivos = [prefijo + nombre for nombre in archivos]
+        if self.excluidas:
+            archivos = [nombre for nombre in archivos if nombre not in self.excluidas]
+        self.carpetas[carpeta_relativa] = mtime
+        self.archivos_por_carpeta[carpeta_relativa] = archivos
+        return subcarpetas
+
+    def _recorrer(self, carpeta_relativa):
+        """Lee `carpeta_relativa` y todo lo que cuelga de ella; devuelve las carpetas leídas"""
+        leidas = []
+        pendientes = [carpeta_relativa]
+        while pendientes:
+            actual = pendientes.pop()
+            subcarpetas = self._leer_carpeta(actual)
+            if subcarpetas is not None:
+                leidas.append(actual)
+                pendientes.extend(subcarpetas)
+        return leidas
+
+    def _olvidar(self, carpeta_relativa):
+        """Quita una carpeta (y sus subcarpetas) del registro; devuelve los archivos que tenía"""
+        prefijo = carpeta_relativa + "/"
+        quitados = set()
+        for carpeta in [c for c in self.carpetas if c == carpeta_relativa or c.startswith(prefijo)]:
+            del self.carpetas[carpeta]
+            quitados.update(self.archivos_por_carpeta.pop(carpeta, ()))
+        return quitados
+
+    def _releer(self, carpeta_relativa):
+        """
+        Vuelve a leer una carpeta que cambió. Sus subcarpetas ya conocidas no
+        se tocan (tienen su propio mtime); las nuevas se recorren enteras y
+        las que desaparecieron se olvidan. Devuelve (antes, después).
+        """
+        antes = set(self.archivos_por_carpeta.get(carpeta_relativa, ()))
+        conocidas = {c for c in self.carpetas if c and c.rpartition("/")[0] == carpeta_relativa}
+        subcarpetas = self._leer_carpeta(carpeta_relativa)
+        if subcarpetas is None:
+            return antes | self._olvidar(carpeta_relativa), set()
+
+        despues = set(self.archivos_por_carpeta[carpeta_relativa])
+        for subcarpeta in conocidas - set(subcarpetas):
+            antes = antes | self._olvidar(subcarpeta)
+        for subcarpeta in set(subcarpetas) - conocidas:
+            for leida in self._recorrer(subcarpeta):
+                despues.update(self.archivos_por_carpeta[leida])
+        return antes, despues
+
+    def _ordenar(self):
+        """Lista global: solo se ordenan las carpetas (miles), no las imágenes"""
+        self.nombres = [nombre
+                        for carpeta_relativa in sorted(self.carpetas, key=clave_carpeta)
+                        for nombre in self.archivos_por_carpeta[carpeta_relativa]]
+
+    def _actualizar_estado(self, esta_etiquetada):
+        """Estado de etiquetado y posiciones desde cero para el orden actual de nombres"""
+        self.etiquetadas = bytearray(1 if esta_etiquetada(nombre) else 0 for nombre in self.nombres)
+        self.total_etiquetadas = self.etiquetadas.count(1)
+        self.posiciones = {nombre: posicion for posicion, nombre in enumerate(self.nombres)}
+        self.texto_busqueda = None  # Se construye en la primera búsqueda
+
+    def _indice_busqueda(self):
+        """
+        Texto con todos los nombres en minúsculas separados por '\n' e
+        inicios[i] = dónde empieza el nombre i (más uno final): una
+        coincidencia en el carácter c es del nombre bisect(inicios, c) - 1
+        """
+        if self.texto_busqueda is None:
+            minusculas = [nombre.lower() for nombre in self.nombres]
+            self.texto_busqueda = "\n" + "\n".join(minusculas) + "\n"
+            self.inicios_busqueda = array('q', accumulate((len(nombre) + 1 for nombre in minusculas), initial=1))
+        return self.texto_busqueda, self.inicios_busqueda
+
+    def _patrones(self, consulta):
+        """
+        Patrones que hay que buscar en el texto y cuánto hay que sumar a la
+        posición encontrada para caer dentro del nombre. Con '^' la consulta
+        va anclada al principio de una carpeta o del archivo: el separador
+        forma parte del patrón.
+        """
+        consulta = consulta.lower()
+        if consulta.startswith('^'):
+            return ["\n" + consulta[1:], "/" + consulta[1:]], 1
+        return [consulta], 0
+
+    def _coincidencias(self, consulta, desde, hasta):
+        """Posiciones en [desde, hasta) cuyo nombre coincide con `consulta`, en orden y sin repetir"""
+        texto, inicios = self._indice_busqueda()
+        patrones, ajuste = self._patrones(consulta)
+        limite = inicios[hasta] - 1
+        caracter = inicios[desde] - 1
+        # Próxima coincidencia de cada patrón; solo se vuelve a buscar la que ya quedó atrás
+        proximas = {patron: texto.find(patron, caracter, limite) for patron in patrones}
+        while True:
+            encontradas = [indice for indice in proximas.values() if indice >= 0]
+            if not encontradas:
+                return
+            posicion = bisect.bisect_right(inicios, min(encontradas) + ajuste) - 1
+            yield posicion
+            caracter = inicios[posicion + 1] - 1
+            for patron, indice in proximas.items():
+                if 0 <= indice < caracter:
+                    proximas[patron] = texto.find(patron, caracter, limite)
+
+    def _coincide(self, patrones, posicion):
+        """¿Contiene el nombre en `posicion` alguno de los patrones?"""
+        texto, inicios = self._indice_busqueda()
+        inicio, fin = inicios[posicion] - 1, inicios[posicion + 1] - 1
+        return any(texto.find(patron, inicio, fin) >= 0 for patron in patrones)
+
+    def buscar(self, consulta, desde=0, mascara=None):
+        """
+        Primera posición >= desde (dando la vuelta) cuyo nombre contiene
+        `consulta` sin distinguir mayúsculas ('^' delante: al principio de
+        una carpeta o del archivo). Devuelve None si no hay ninguna.
+
+        mascara: bytearray paralelo a los nombres; solo cuentan las
+            posiciones con 1 (p. ej. etiquetadas, o sin_etiquetar())
+
+        Se recorre el lado más corto: las coincidencias del nombre (con
+        str.find) o las posiciones de la máscara (con bytearray.find).
+        """
+        if not self.nombres:
+            return None
+        desde = min(max(desde, 0), len(self.nombres))
+        vacia = consulta in ("", "^")
+        if vacia and mascara is None:
+            return desde % len(self.nombres)
+
+        texto, inicios = self._indice_busqueda()
+        patrones, _ = self._patrones(consulta)
+        for inicio, fin in ((desde, len(self.nombres)), (0, desde)):
+            if mascara is not None:
+                ocurrencias = 0 if vacia else sum(texto.count(patron, inicios[inicio] - 1, inicios[fin] - 1)
+                                                  for patron in patrones)
+                if vacia or mascara.count(1, inicio, fin) <= ocurrencias:
+                    posicion = mascara.find(1, inicio, fin)
+                    while posicion >= 0:
+                        if vacia or self._coincide(patrones, posicion):
+                            return posicion
+                        posicion = mascara.find(1, posicion + 1, fin)
+                    continue
+            for posicion in self._coincidencias(consulta, inicio, fin):
+                if mascara is None or mascara[posicion]:
+                    return posicion
+        return None
+
+    def sin_etiquetar(self):
+        """Máscara de las que faltan por etiquetar (para buscar)"""
+        return self.etiquetadas.translate(INVERTIR_MASCARA)
+
+    def contar(self, consulta, limite=1000):
+        """Nombres que coinciden con `consulta` (sin filtros), sin pasar de `limite`"""
+        if consulta in ("", "^"):
+            return min(len(self.nombres), limite)
+        total = 0
+        for _ in self._coincidencias(consulta, 0, len(self.nombres)):
+            total += 1
+            if total >= limite:
+                break
+        return total
+
+    def revisar(self):
+        """
+        Revisión incremental: un os.stat por carpeta conocida y solo se leen
+        de nuevo las que cambiaron (añadir, quitar o renombrar un archivo o
+        una subcarpeta cambia el mtime de su carpeta). Devuelve (añadidas,
+        quitadas).
+        """
+        if self.carpeta is None:
+            return 0, 0
+        inicio = time.perf_counter()
+        cambiadas = []
+        for carpeta_relativa, mtime in self.carpetas.items():
+            ruta = os.path.join(self.carpeta, carpeta_relativa) if carpeta_relativa else self.carpeta
+            try:
+                if os.stat(ruta).st_mtime_ns != mtime:
+                    cambiadas.append(carpeta_relativa)
+            except OSError:
+                cambiadas.append(carpeta_relativa)
+
+        antes, despues = set(), set()
+        for carpeta_relativa in cambiadas:
+            if carpeta_relativa not in self.carpetas:
+                continue  # Ya se olvidó junto con una carpeta superior
+            antes_carpeta, despues_carpeta = self._releer(carpeta_relativa)
+            antes |= antes_carpeta
+            despues |= despues_carpeta
+
+        anadidas = despues - antes
+        quitadas = antes - despues
+        if anadidas or quitadas:
+            # Las que ya estaban conservan su marca; solo se consulta por las nuevas
+            etiquetadas, posiciones = self.etiquetadas, self.posiciones
+            self._ordenar()
+            self._actualizar_estado(lambda nombre: etiquetadas[posiciones[nombre]] if nombre in posiciones
+                                    else self.esta_etiquetada(nombre))
+        self.duracion_ultimo_escaneo = time.perf_counter() - inicio
+        return len(anadidas), len(quitadas)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def __getitem__(self, posicion):
+        return self.nombres[posicion]
+
+    def __contains__(self, nombre):
+        return nombre in self.posiciones
+
+    def posicion(self, nombre, por_defecto=None):
+        """Posición de `nombre` en el orden actual"""
+        return self.posiciones.get(nombre, por_defecto)
+
+    def ruta(self, posicion):
+        """Ruta en disco de la imagen en `posicion`"""
+        return os.path.join(self.carpeta, *self.nombres[posicion].split("/"))
+
+    def etiquetada(self, posicion):
+        return bool(self.etiquetadas[posicion])
+
+    def marcar_etiquetada(self, posicion):
+        """Marca la imagen y mantiene el total sin recorrer nada"""
+        if not self.etiquetadas[posicion]:
+            self.etiquetadas[posicion] = 1
+            self.total_etiquetadas += 1
+
+    def siguiente_sin_etiquetar(self, desde=0):
+        """Primera posición >= desde (dando la vuelta) sin etiquetar, o None; la búsqueda la hace bytearray.find en C"""
+        posicion = self.etiquetadas.find(0, desde)
+        if posicion < 0:
+            posicion = self.etiquetadas.find(0, 0, desde)
+        return posicion if posicion >= 0 else None
+
+    def resumen(self):
+        """Texto corto para consola o depuración"""
+        return (f"Índice: {len(self.nombres)} imágenes en {len(self.carpetas)} carpetas, "
+                f"{self.total_etiquetadas} etiquetadas, último escaneo {self.duracion_ultimo_escaneo * 1000:.0f} ms")
@@ -17,9 +17,19 @@ import math
 import random
 from datetime import datetime
 import os
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+
+import geometria
+from almacen_resultados import AlmacenResultados
+from cache_imagenes import CacheImagenes
+from precarga import PrecargadorImagenes
+from piramide import escalar_suave
+from rendimiento import ContadorFrames, memoria_residente_mb
+from compositor import Compositor, Elemento
+from textos import CACHE_TEXTOS
+from planificador import PlanificadorFrames
+from manifiesto import cargar_manifiesto, imagenes_validas
+from archivo_dataset import ArchivoDataset, ruta_archivo
+from copias_pantalla import CopiasPantalla, firma_desde_carpeta, lector_desde_carpeta
 
 # ============================================================================
 # INICIALIZACIÓN DE PYGAME
@@ -56,6 +66,13 @@ DIFICULTAD_FACIL = "easy"
 DIFICULTAD_MEDIA = "medium"
 DIFICULTAD_DIFICIL = "hard"
 
+CARPETA_IMAGENES = "imagenes"
+PRESUPUESTO_CACHE_IMAGENES = 64 * 1024 * 1024  # Bytes de copias de pantalla en memoria (~2 MB cada una)
+PROFUNDIDAD_PRECARGA = 3  # Preguntas siguientes que se preparan en segundo plano
+TAMANO_COPIA_PANTALLA = (800, ALTO_VENTANA - 100 - 80)  # Área de imagen más grande (y_imagen = 100)
+REFRESCO_DEPURACION_MS = 250  # Con la superposición F3 visible el bucle no duerme más que esto
+EVENTO_IMAGEN_LISTA = pygame.event.custom_type()  # Lo publica el precargador al terminar una imagen
+
 # ============================================================================
 # CLASE PRINCIPAL DEL JUEGO
 # ============================================================================
@@ -69,7 +86,8 @@ class JuegoDeteccionCaries:
         self.ventana = pygame.display.set_mode((ANCHO_VENTANA, ALTO_VENTANA))
         pygame.display.set_caption("🦷 Juego de Detección de Caries en imágenes NIRI")
         
-        self.reloj = pygame.time.Clock()
+        self.planificador = PlanificadorFrames(motivos={pygame.USEREVENT: "temporizador", EVENTO_IMAGEN_LISTA: "precarga"})
+        self.compositor = Compositor(self.ventana)
         self.estado = ESTADO_MENU
         
         self.nombre_jugador = ""
@@ -88,7 +106,15 @@ class JuegoDeteccionCaries:
         
         self.puntos_poligono = []
         self.datos_juego = []
-        self.imagenes_cargadas = {}
+        # La caché guarda copias a resolución de pantalla, no las capturas originales
+        self.copias = CopiasPantalla(lector_desde_carpeta(CARPETA_IMAGENES), tamano_maximo=TAMANO_COPIA_PANTALLA,
+                                     firma=firma_desde_carpeta(CARPETA_IMAGENES))
+        self.cache_imagenes = CacheImagenes(self.copias.cargar, PRESUPUESTO_CACHE_IMAGENES)
+        self.archivo_dataset = None  # ArchivoDataset si existe imagenes.niripak
+        self.precargador = PrecargadorImagenes(self.cache_imagenes, self.escalar_imagen, PROFUNDIDAD_PRECARGA,
+                                               al_terminar=self.avisar_imagen_lista)
+        self.vista_pregunta = None
+        self.lotes_correctos = {}
         self.resultados_detallados = []
         
         self.mensaje_feedback = ""
@@ -98,21 +124,23 @@ class JuegoDeteccionCaries:
         self.fuente_grande = pygame.font.Font(None, 52)
         self.fuente_mediana = pygame.font.Font(None, 36)
         self.fuente_pequena = pygame.font.Font(None, 26)
+        self.textos = CACHE_TEXTOS
         
-        self.ranking = []
-        self.cargar_ranking()
+        self.almacen = AlmacenResultados()
+        self.mensaje_exportacion = "Pulsa X para exportar el historial a Excel"
+        self.version_ranking = 0
         
         self.input_activo = False
         
+        self.contador_frames = ContadorFrames()
+        self.mostrar_depuracion = False
+        
         self.fondo_imagen = None
         self.cargar_fondo()
         
         self.musica_cargada = False
         self.cargar_musica()
         
-        self.archivo_excel = "datos_juego_caries.xlsx"
-        self.inicializar_excel()
-        
         self.cargar_datos_desde_json()
     
     def cargar_fondo(self):
@@ -143,46 +171,8 @@ class JuegoDeteccionCaries:
         except Exception as e:
             print(f"⚠️  Error al cargar música: {e}")
     
-    def inicializar_excel(self):
-        """Crea o carga el archivo Excel para guardar datos"""
-        try:
-            if os.path.exists(self.archivo_excel):
-                self.workbook = openpyxl.load_workbook(self.archivo_excel)
-                print(f"✅ Excel cargado: {self.archivo_excel}")
-            else:
-                self.workbook = Workbook()
-                self.crear_hojas_excel()
-                self.workbook.save(self.archivo_excel)
-                print(f"✅ Excel creado: {self.archivo_excel}")
-        except Exception as e:
-            print(f"⚠️  Error con Excel: {e}")
-            self.workbook = Workbook()
-    
-    def crear_hojas_excel(self):
-        """Crea las hojas del Excel con formato"""
-        if 'Sheet' in self.workbook.sheetnames:
-            del self.workbook['Sheet']
-        
-        ws_partidas = self.workbook.create_sheet('Partidas', 0)
-        headers_partidas = ['Fecha', 'Hora', 'Jugador', 'Experiencia', 'Puntos', 'Precisión %', 'Vidas Restantes', 'Racha Máxima', 'Tiempo Total (seg)', 'Preguntas Totales', 'Aciertos']
-        ws_partidas.append(headers_partidas)
-        
-        ws_respuestas = self.workbook.create_sheet('Respuestas', 1)
-        headers_respuestas = ['Fecha', 'Jugador', 'Pregunta #', 'Imagen', 'Dificultad', 'Correcto', 'Precisión %', 'Puntos', 'Tiempo (seg)']
-        ws_respuestas.append(headers_respuestas)
-        
-        ws_ranking = self.workbook.create_sheet('Ranking', 2)
-        headers_ranking = ['Posición', 'Jugador', 'Puntos', 'Precisión %', 'Experiencia', 'Fecha']
-        ws_ranking.append(headers_ranking)
-        
-        for ws in [ws_partidas, ws_respuestas, ws_ranking]:
-            for cell in ws[1]:
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    def guardar_partida_excel(self):
-        """Guarda los datos de la partida en Excel"""
+    def guardar_partida(self):
+        """Guarda la partida y sus respuestas en la base de datos (una transacción)"""
         try:
             total_preguntas = len(self.resultados_detallados)
             aciertos = sum(1 for r in self.resultados_detallados if r['correcto'])
@@ -191,37 +181,77 @@ class JuegoDeteccionCaries:
             fecha = datetime.now().strftime("%Y-%m-%d")
             hora = datetime.now().strftime("%H:%M:%S")
             
-            ws_partidas = self.workbook['Partidas']
-            ws_partidas.append([fecha, hora, self.nombre_jugador, self.experiencia, self.puntos, round(precision, 1), self.vidas, self.racha_maxima, int(self.tiempo_actual), total_preguntas, aciertos])
+            partida = {
+                'fecha': fecha,
+                'hora': hora,
+                'jugador': self.nombre_jugador,
+                'experiencia': self.experiencia,
+                'puntos': self.puntos,
+                'precision': round(precision, 1),
+                'vidas': self.vidas,
+                'racha_maxima': self.racha_maxima,
+                'tiempo_total': int(self.tiempo_actual),
+                'preguntas': total_preguntas,
+                'aciertos': aciertos
+            }
             
-            ws_respuestas = self.workbook['Respuestas']
             tiempo_por_pregunta = self.tiempo_actual / total_preguntas if total_preguntas > 0 else 0
-            
+            respuestas = []
             for resultado in self.resultados_detallados:
-                nombre_imagen = self.datos_juego[resultado['pregunta'] - 1]['imageName']
-                dificultad = self.datos_juego[resultado['pregunta'] - 1]['difficulty']
-                ws_respuestas.append([fecha, self.nombre_jugador, resultado['pregunta'], nombre_imagen, dificultad, 'SÍ' if resultado['correcto'] else 'NO', resultado['precision'], resultado['puntos'], round(tiempo_por_pregunta, 1)])
+                pregunta = self.datos_juego[resultado['pregunta'] - 1]
+                respuestas.append({
+                    'fecha': fecha,
+                    'jugador': self.nombre_jugador,
+                    'pregunta': resultado['pregunta'],
+                    'imagen': pregunta['imageName'],
+                    'dificultad': pregunta['difficulty'],
+                    'correcto': 1 if resultado['correcto'] else 0,
+                    'precision': resultado['precision'],
+                    'puntos': resultado['puntos'],
+                    'tiempo': round(tiempo_por_pregunta, 1)
+                })
             
-            self.actualizar_ranking_excel()
-            self.workbook.save(self.archivo_excel)
-            print(f"✅ Datos guardados en Excel: {self.archivo_excel}")
+            self.almacen.guardar_partida(partida, respuestas)
+            self.version_ranking += 1
+            print(f"✅ Partida guardada en {self.almacen.ruta}")
             
         except Exception as e:
-            print(f"⚠️  Error al guardar en Excel: {e}")
+            print(f"⚠️  Error al guardar la partida: {e}")
     
-    def actualizar_ranking_excel(self):
-        """Actualiza la hoja de ranking en Excel"""
+    def exportar_excel(self):
+        """Genera el libro Excel con todo el historial (bajo demanda, tecla X en resultados)"""
         try:
-            ws_ranking = self.workbook['Ranking']
-            ws_ranking.delete_rows(2, ws_ranking.max_row)
-            
-            for idx, entrada in enumerate(self.ranking, start=1):
-                ws_ranking.append([idx, entrada['nombre'], entrada['puntos'], entrada['precision'], entrada['experiencia'], entrada['fecha']])
+            self.mensaje_exportacion = f"Excel exportado: {self.almacen.exportar_excel()}"
         except Exception as e:
-            print(f"⚠️  Error al actualizar ranking en Excel: {e}")
+            print(f"⚠️  Error al exportar a Excel: {e}")
+            self.mensaje_exportacion = "No se pudo exportar a Excel"
+    
+    def cargar_datos_desde_archivo(self):
+        """Usa imagenes.niripak si existe: solo se lee su índice y las imágenes salen del mmap. Devuelve si lo consiguió"""
+        ruta = ruta_archivo(CARPETA_IMAGENES)
+        if not os.path.exists(ruta):
+            return False
+        try:
+            archivo = ArchivoDataset(ruta)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error al abrir {ruta}: {e}")
+            return False
+        
+        self.datos_juego = archivo.registros()
+        if len(self.datos_juego) == 0:
+            print(f"⚠️  {ruta} no tiene imágenes etiquetadas")
+            archivo.cerrar()
+            return False
+        self.archivo_dataset = archivo
+        self.copias.leer_bytes = archivo.leer_bytes
+        print(f"✅ Archivo empaquetado {ruta}: {len(self.datos_juego)} imágenes")
+        return True
     
     def cargar_datos_desde_json(self):
         """Carga las imágenes etiquetadas desde el archivo JSON"""
+        if self.cargar_datos_desde_archivo():
+            return
+        
         print("📦 Cargando imágenes desde JSON...")
         
         archivo_json = 'etiquetas_caries.json'
@@ -238,26 +268,29 @@ class JuegoDeteccionCaries:
             
             print(f"✅ Archivo JSON cargado: {len(datos)} imágenes")
             
-            for dato in datos:
-                nombre_imagen = dato['imageName']
-                ruta_imagen = os.path.join('imagenes', nombre_imagen)
-                
-                if not os.path.exists(ruta_imagen):
-                    print(f"⚠️  No se encontró: {ruta_imagen}")
-                    continue
-                
-                try:
-                    imagen = pygame.image.load(ruta_imagen)
-                    self.imagenes_cargadas[dato['imageName']] = imagen
-                    self.datos_juego.append(dato)
-                    print(f"✅ Cargada: {nombre_imagen} ({dato['difficulty']})")
-                except Exception as e:
-                    print(f"❌ Error cargando {nombre_imagen}: {e}")
+            if not os.path.isdir(CARPETA_IMAGENES):
+                print(f"❌ No se encontró la carpeta: {CARPETA_IMAGENES}/")
+                self.cargar_datos_simulados()
+                return
+            
+            # Las imágenes se decodifican al mostrarse (ver CacheImagenes)
+            self.datos_juego = [dato for dato in datos if 'imageName' in dato]
             
-            print(f"\n🎉 Total cargadas: {len(self.datos_juego)} imágenes")
+            # Con un manifiesto al día se descartan ya las imágenes ausentes o ilegibles
+            manifiesto = cargar_manifiesto(CARPETA_IMAGENES, archivo_json)
+            if manifiesto is not None:
+                self.copias.usar_huellas(manifiesto['imagenes'])
+                validas = imagenes_validas(manifiesto)
+                descartadas = len(self.datos_juego)
+                self.datos_juego = [dato for dato in self.datos_juego if dato['imageName'] in validas]
+                descartadas -= len(self.datos_juego)
+                print(f"📋 Manifiesto del {manifiesto['generado']}: {descartadas} imágenes descartadas")
+            else:
+                print("💡 Sin manifiesto al día: ejecuta 'python manifiesto.py validar' para revisar el dataset")
+            print(f"\n🎉 Total disponibles: {len(self.datos_juego)} imágenes")
             
             if len(self.datos_juego) == 0:
-                print("⚠️  No se cargaron imágenes, usando respaldo")
+                print("⚠️  No hay imágenes en el JSON, usando respaldo")
                 self.cargar_datos_simulados()
         
         except Exception as e:
@@ -293,7 +326,7 @@ class JuegoDeteccionCaries:
                 intensidad = min(intensidad, 100)
                 pygame.draw.circle(superficie, (intensidad, intensidad, intensidad), (centro_x, centro_y), r, 2)
             
-            self.imagenes_cargadas[nombre] = superficie
+            self.cache_imagenes.fijar(nombre, superficie)
             
             num_puntos = 12
             poligono_correcto = []
@@ -310,109 +343,28 @@ class JuegoDeteccionCaries:
         self.datos_juego = datos_ejemplo
         print(f"✅ {len(self.datos_juego)} imágenes simuladas cargadas")
     
-    def cargar_ranking(self):
-        """Carga el ranking desde archivo JSON"""
+    def obtener_top_ranking(self):
+        """Top 5 del nivel elegido en el menú (o de todos si no hay nivel), leído del almacén"""
         try:
-            with open('ranking.json', 'r', encoding='utf-8') as archivo:
-                self.ranking = json.load(archivo)
-        except FileNotFoundError:
-            self.ranking = []
+            return self.almacen.ranking(5, self.experiencia)
         except Exception as e:
             print(f"Error al cargar ranking: {e}")
-            self.ranking = []
-    
-    def guardar_ranking(self):
-        """Guarda el ranking en archivo JSON"""
-        try:
-            with open('ranking.json', 'w', encoding='utf-8') as archivo:
-                json.dump(self.ranking, archivo, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error al guardar ranking: {e}")
+            return []
     
-    def agregar_al_ranking(self):
-        """Agrega la puntuación actual al ranking"""
-        total_preguntas = len(self.resultados_detallados)
-        aciertos = sum(1 for r in self.resultados_detallados if r['correcto'])
-        precision = (aciertos / total_preguntas * 100) if total_preguntas > 0 else 0
-        
-        entrada = {
-            'nombre': self.nombre_jugador,
-            'experiencia': self.experiencia,
-            'puntos': self.puntos,
-            'precision': round(precision, 1),
-            'racha_maxima': self.racha_maxima,
-            'fecha': datetime.now().strftime("%Y-%m-%d %H:%M")
-        }
-        
-        self.ranking.append(entrada)
-        self.ranking.sort(key=lambda x: x['puntos'], reverse=True)
-        self.ranking = self.ranking[:10]
-        self.guardar_ranking()
+    def obtener_lote_correcto(self, pregunta):
+        """Devuelve los polígonos correctos de la pregunta ya normalizados (se calculan una vez)"""
+        nombre_imagen = pregunta['imageName']
+        if nombre_imagen not in self.lotes_correctos:
+            self.lotes_correctos[nombre_imagen] = geometria.LotePoligonos(pregunta['polygons'])
+        return self.lotes_correctos[nombre_imagen]
     
     def calcular_precision(self, poligono_jugador, poligonos_correctos):
-        """Calcula precisión del polígono del jugador"""
+        """Calcula precisión (Dice, 0-100) del polígono del jugador contra la mejor lesión"""
         if len(poligono_jugador) < 3:
             return 0.0
         
-        mejor_coincidencia = 0.0
-        for poligono_correcto in poligonos_correctos:
-            coincidencia = self.calcular_superposicion(poligono_jugador, poligono_correcto)
-            if coincidencia > mejor_coincidencia:
-                mejor_coincidencia = coincidencia
-        
-        return mejor_coincidencia
-    
-    def calcular_superposicion(self, poli1, poli2):
-        """Calcula superposición entre dos polígonos"""
-        centro1 = self.obtener_centroide(poli1)
-        centro2 = self.obtener_centroide(poli2)
-        
-        distancia = math.sqrt((centro1[0] - centro2[0]) ** 2 + (centro1[1] - centro2[1]) ** 2)
-        
-        area1 = self.calcular_area_poligono(poli1)
-        area2 = self.calcular_area_poligono(poli2)
-        area_promedio = (area1 + area2) / 2
-        distancia_maxima = math.sqrt(area_promedio)
-        
-        if distancia_maxima > 0:
-            puntuacion_distancia = max(0, 1 - (distancia / distancia_maxima))
-        else:
-            puntuacion_distancia = 0
-        
-        if max(area1, area2) > 0:
-            puntuacion_area = min(area1, area2) / max(area1, area2)
-        else:
-            puntuacion_area = 0
-        
-        precision = (puntuacion_distancia * 0.6 + puntuacion_area * 0.4) * 100
-        return precision
-    
-    def obtener_centroide(self, poligono):
-        """Calcula el centroide de un polígono"""
-        suma_x = sum(p['x'] if isinstance(p, dict) else p[0] for p in poligono)
-        suma_y = sum(p['y'] if isinstance(p, dict) else p[1] for p in poligono)
-        n = len(poligono)
-        return (suma_x / n, suma_y / n)
-    
-    def calcular_area_poligono(self, poligono):
-        """Calcula área usando fórmula de Gauss"""
-        area = 0.0
-        n = len(poligono)
-        
-        for i in range(n):
-            j = (i + 1) % n
-            
-            if isinstance(poligono[i], dict):
-                x1, y1 = poligono[i]['x'], poligono[i]['y']
-                x2, y2 = poligono[j]['x'], poligono[j]['y']
-            else:
-                x1, y1 = poligono[i]
-                x2, y2 = poligono[j]
-            
-            area += x1 * y2
-            area -= x2 * y1
-        
-        return abs(area / 2.0)
+        puntuaciones = geometria.puntuar_lote([poligono_jugador], poligonos_correctos)
+        return float(puntuaciones.max()) * 100 if puntuaciones.size > 0 else 0.0
     
     def iniciar_juego(self):
         """Inicia una nueva partida"""
@@ -437,11 +389,76 @@ class JuegoDeteccionCaries:
         self.mostrar_feedback = False
         self.tiempo_inicio = pygame.time.get_ticks() / 1000
         self.estado = ESTADO_JUGANDO
+        self.cache_imagenes.olvidar_fallidas()
+        self.programar_precarga()
+    
+    def y_imagen_actual(self):
+        """Posición vertical de la imagen (baja cuando se muestra la racha)"""
+        return 100 if self.racha < 3 else 140
+    
+    def escalar_imagen(self, imagen, y_imagen):
+        """Escala una imagen al área de juego; se ejecuta en los hilos de precarga"""
+        escala = min(800 / imagen.get_width(), (ALTO_VENTANA - y_imagen - 80) / imagen.get_height(), 1.0)
+        imagen_escalada = escalar_suave(imagen, (int(imagen.get_width() * escala), int(imagen.get_height() * escala)))
+        return imagen_escalada, escala
+    
+    def obtener_vista_pregunta(self, pregunta, y_imagen):
+        """
+        Devuelve la imagen de la pregunta lista para pintar: superficie en el
+        formato de la pantalla, escala, rect y contornos correctos ya
+        proyectados. Solo se reconstruye al cambiar de pregunta o de
+        disposición (y_imagen); mientras la nueva versión se prepara en
+        segundo plano se sigue usando la anterior de la misma imagen.
+        """
+        nombre_imagen = pregunta['imageName']
+        lista = self.precargador.obtener(nombre_imagen, y_imagen)
+        vista = self.vista_pregunta
+        if vista is not None and vista['nombre'] == nombre_imagen and (lista is None or vista['origen'] is lista):
+            return vista
+        if lista is None:
+            return None
+        
+        imagen_escalada, escala = lista
+        escala *= self.copias.escala(nombre_imagen)  # Coordenadas en píxeles de la imagen original
+        if imagen_escalada.get_flags() & pygame.SRCALPHA:
+            superficie = imagen_escalada.convert_alpha()
+        else:
+            superficie = imagen_escalada.convert()
+        rect_imagen = superficie.get_rect(topleft=(50, y_imagen))
+        
+        contornos = []
+        if not pregunta.get('es_negativo', False):
+            for poligono_correcto in pregunta['polygons']:
+                if len(poligono_correcto) > 2:
+                    contornos.append([(rect_imagen.left + p['x'] * escala, rect_imagen.top + p['y'] * escala) for p in poligono_correcto])
+        
+        self.vista_pregunta = {
+            'nombre': nombre_imagen,
+            'origen': lista,
+            'superficie': superficie,
+            'escala': escala,
+            'rect': rect_imagen,
+            'contornos': contornos
+        }
+        return self.vista_pregunta
+    
+    def avisar_imagen_lista(self, nombre, y_imagen):
+        """Despierta el bucle principal cuando el precargador termina una imagen (se llama desde sus hilos)"""
+        try:
+            pygame.event.post(pygame.event.Event(EVENTO_IMAGEN_LISTA, imagen=nombre, y_imagen=y_imagen))
+        except pygame.error:
+            pass  # La ventana ya se cerró
+    
+    def programar_precarga(self):
+        """Pide la pregunta actual y las PROFUNDIDAD_PRECARGA siguientes con la disposición actual"""
+        y_imagen = self.y_imagen_actual()
+        fin = min(self.pregunta_actual + PROFUNDIDAD_PRECARGA + 1, len(self.datos_juego))
+        self.precargador.programar([(self.datos_juego[i]['imageName'], y_imagen) for i in range(self.pregunta_actual, fin)])
     
     def enviar_respuesta(self):
         """Procesa la respuesta del jugador"""
         pregunta = self.datos_juego[self.pregunta_actual]
-        poligonos_correctos = pregunta['polygons']
+        poligonos_correctos = self.obtener_lote_correcto(pregunta)
         es_caso_negativo = pregunta.get('es_negativo', False)
         
         puntos_ganados = 0
@@ -516,6 +533,9 @@ class JuegoDeteccionCaries:
         self.resultados_detallados.append({'pregunta': self.pregunta_actual + 1, 'correcto': es_correcto, 'precision': round(precision, 1), 'puntos': puntos_ganados})
         
         pygame.time.set_timer(pygame.USEREVENT, 3000)
+        
+        # La racha ya está actualizada: se preparan las siguientes durante el feedback
+        self.programar_precarga()
     
     def siguiente_pregunta(self):
         """Avanza a la siguiente pregunta"""
@@ -531,66 +551,93 @@ class JuegoDeteccionCaries:
         self.puntos_poligono = []
         self.respondida = False
         self.mostrar_feedback = False
+        self.programar_precarga()
     
     def terminar_juego(self):
         """Finaliza el juego"""
         self.tiempo_actual = (pygame.time.get_ticks() / 1000) - self.tiempo_inicio
-        self.agregar_al_ranking()
-        self.guardar_partida_excel()
+        print(f"📊 {self.cache_imagenes.resumen()}")
+        print(f"📊 {self.copias.resumen()}, memoria residente {memoria_residente_mb() or 0:.0f} MB")
+        print(f"📊 {self.textos.resumen()}")
+        self.guardar_partida()
         self.estado = ESTADO_RESULTADOS
     
-    def dibujar_menu(self):
-        """Dibuja el menú principal"""
+    def dibujar_fondo(self, superficie):
+        """Pinta la imagen de fondo o, si no hay, el color de fondo"""
         if self.fondo_imagen:
-            self.ventana.blit(self.fondo_imagen, (0, 0))
+            superficie.blit(self.fondo_imagen, (0, 0))
         else:
-            self.ventana.fill(COLOR_FONDO)
+            superficie.fill(COLOR_FONDO)
+    
+    def componer(self, clave_estatica, dibujar_estatico, elementos):
+        """Entrega la escena al compositor, con la superposición de depuración encima"""
+        if self.mostrar_depuracion:
+            elementos.append(self.elemento_depuracion())
+        self.compositor.componer(clave_estatica, dibujar_estatico, elementos)
+    
+    def dibujar_menu(self):
+        """Dibuja el menú principal"""
+        y_actual = 180
+        self.rect_input = pygame.Rect(100, y_actual + 40, 400, 50)
+        self.rect_principiante = pygame.Rect(100, y_actual + 170, 250, 80)
+        self.rect_avanzado = pygame.Rect(380, y_actual + 170, 250, 80)
+        rect_boton = pygame.Rect(ANCHO_VENTANA // 2 - 150, y_actual + 470, 300, 60)
+        
+        puede_iniciar = (len(self.nombre_jugador) > 0 and self.experiencia is not None and len(self.datos_juego) > 0)
+        self.rect_iniciar = rect_boton if puede_iniciar else None
+        
+        def dibujar_input(superficie):
+            color_input = COLOR_AZUL if self.input_activo else COLOR_GRIS
+            pygame.draw.rect(superficie, color_input, self.rect_input, 2)
+            texto_input = self.textos.renderizar(self.fuente_mediana, self.nombre_jugador, COLOR_BLANCO)
+            superficie.blit(texto_input, (self.rect_input.left + 10, self.rect_input.top + 10))
+        
+        def dibujar_opcion(rect, experiencia, titulo, descripcion):
+            def dibujar(superficie):
+                color = COLOR_VERDE if self.experiencia == experiencia else COLOR_GRIS
+                pygame.draw.rect(superficie, color, rect, 3)
+                superficie.blit(self.textos.renderizar(self.fuente_mediana, titulo, COLOR_BLANCO), (rect.left + 30, rect.top + 10))
+                superficie.blit(self.textos.renderizar(self.fuente_pequena, descripcion, COLOR_GRIS), (rect.left + 30, rect.top + 45))
+            return dibujar
+        
+        def dibujar_boton(superficie):
+            color_boton = COLOR_VERDE if puede_iniciar else COLOR_GRIS
+            pygame.draw.rect(superficie, color_boton, rect_boton, 0 if puede_iniciar else 3)
+            texto_boton = self.textos.renderizar(self.fuente_grande, "INICIAR JUEGO", COLOR_BLANCO)
+            superficie.blit(texto_boton, texto_boton.get_rect(center=rect_boton.center))
+        
+        elementos = [
+            Elemento('input', self.rect_input, (self.nombre_jugador, self.input_activo), dibujar_input),
+            Elemento('principiante', self.rect_principiante, self.experiencia == EXPERIENCIA_PRINCIPIANTE,
+                     dibujar_opcion(self.rect_principiante, EXPERIENCIA_PRINCIPIANTE, "0-5 años", "Casos fáciles y medios")),
+            Elemento('avanzado', self.rect_avanzado, self.experiencia == EXPERIENCIA_AVANZADO,
+                     dibujar_opcion(self.rect_avanzado, EXPERIENCIA_AVANZADO, "5+ años", "Casos medios y difíciles")),
+            Elemento('iniciar', rect_boton, puede_iniciar, dibujar_boton)
+        ]
+        self.componer(('menu', self.version_ranking, self.experiencia), self.dibujar_menu_estatico, elementos)
+    
+    def dibujar_menu_estatico(self, superficie):
+        """Capa fija del menú: fondo, textos, instrucciones y ranking"""
+        self.dibujar_fondo(superficie)
         
-        titulo = self.fuente_titulo.render("¿ERES CAPAZ DE DETECTAR CARIES EN IMÁGENES NIRI?", True, COLOR_BLANCO)
+        titulo = self.textos.renderizar(self.fuente_titulo, "¿ERES CAPAZ DE DETECTAR CARIES EN IMÁGENES NIRI?", COLOR_BLANCO)
         rect_titulo = titulo.get_rect(center=(ANCHO_VENTANA // 2, 80))
-        self.ventana.blit(titulo, rect_titulo)
+        superficie.blit(titulo, rect_titulo)
         
-        subtitulo = self.fuente_pequena.render("Demuestra tu habilidad para detectar caries en imágenes NIRI", True, COLOR_GRIS)
+        subtitulo = self.textos.renderizar(self.fuente_pequena, "Demuestra tu habilidad para detectar caries en imágenes NIRI", COLOR_GRIS)
         rect_subtitulo = subtitulo.get_rect(center=(ANCHO_VENTANA // 2, 130))
-        self.ventana.blit(subtitulo, rect_subtitulo)
+        superficie.blit(subtitulo, rect_subtitulo)
         
         y_actual = 180
-        texto_nombre = self.fuente_mediana.render("Tu nombre:", True, COLOR_BLANCO)
-        self.ventana.blit(texto_nombre, (100, y_actual))
-        
-        color_input = COLOR_AZUL if self.input_activo else COLOR_GRIS
-        pygame.draw.rect(self.ventana, color_input, (100, y_actual + 40, 400, 50), 2)
-        texto_input = self.fuente_mediana.render(self.nombre_jugador, True, COLOR_BLANCO)
-        self.ventana.blit(texto_input, (110, y_actual + 50))
-        self.rect_input = pygame.Rect(100, y_actual + 40, 400, 50)
+        texto_nombre = self.textos.renderizar(self.fuente_mediana, "Tu nombre:", COLOR_BLANCO)
+        superficie.blit(texto_nombre, (100, y_actual))
         
         y_actual += 120
-        texto_experiencia = self.fuente_mediana.render("Nivel de Experiencia en imágenes NIRI:", True, COLOR_BLANCO)
-        self.ventana.blit(texto_experiencia, (100, y_actual))
-        
-        y_actual += 50
-        color_principiante = COLOR_VERDE if self.experiencia == EXPERIENCIA_PRINCIPIANTE else COLOR_GRIS
-        rect_principiante = pygame.Rect(100, y_actual, 250, 80)
-        pygame.draw.rect(self.ventana, color_principiante, rect_principiante, 3)
-        
-        texto_prin = self.fuente_mediana.render("0-5 años", True, COLOR_BLANCO)
-        self.ventana.blit(texto_prin, (130, y_actual + 10))
-        texto_prin_desc = self.fuente_pequena.render("Casos fáciles y medios", True, COLOR_GRIS)
-        self.ventana.blit(texto_prin_desc, (130, y_actual + 45))
-        self.rect_principiante = rect_principiante
-        
-        color_avanzado = COLOR_VERDE if self.experiencia == EXPERIENCIA_AVANZADO else COLOR_GRIS
-        rect_avanzado = pygame.Rect(380, y_actual, 250, 80)
-        pygame.draw.rect(self.ventana, color_avanzado, rect_avanzado, 3)
-        
-        texto_avan = self.fuente_mediana.render("5+ años", True, COLOR_BLANCO)
-        self.ventana.blit(texto_avan, (410, y_actual + 10))
-        texto_avan_desc = self.fuente_pequena.render("Casos medios y difíciles", True, COLOR_GRIS)
-        self.ventana.blit(texto_avan_desc, (410, y_actual + 45))
-        self.rect_avanzado = rect_avanzado
-        
-        y_actual += 130
-
+        texto_experiencia = self.textos.renderizar(self.fuente_mediana, "Nivel de Experiencia en imágenes NIRI:", COLOR_BLANCO)
+        superficie.blit(texto_experiencia, (100, y_actual))
+        
+        y_actual += 180
+        
         instrucciones = [
             "Instrucciones:",
             "1. Ingresa tu nombre y selecciona tu nivel de experiencia",
@@ -598,113 +645,164 @@ class JuegoDeteccionCaries:
             "3. Gana puntos por precisión y velocidad",
             "4. Mantén una racha para bonificaciones extra"
         ]
-
+        
         for i, linea in enumerate(instrucciones):
             fuente = self.fuente_mediana if i == 0 else self.fuente_pequena
             color = COLOR_BLANCO if i == 0 else COLOR_GRIS
-            texto = fuente.render(linea, True, color)
-            self.ventana.blit(texto, (100, y_actual + i * 30))
+            texto = self.textos.renderizar(fuente, linea, color)
+            superficie.blit(texto, (100, y_actual + i * 30))
         
-        y_actual += 170
-        puede_iniciar = (len(self.nombre_jugador) > 0 and self.experiencia is not None and len(self.datos_juego) > 0)
-        
-        color_boton = COLOR_VERDE if puede_iniciar else COLOR_GRIS
-        rect_boton = pygame.Rect(ANCHO_VENTANA // 2 - 150, y_actual, 300, 60)
-        pygame.draw.rect(self.ventana, color_boton, rect_boton, 0 if puede_iniciar else 3)
-        
-        texto_boton = self.fuente_grande.render("INICIAR JUEGO", True, COLOR_BLANCO)
-        rect_texto = texto_boton.get_rect(center=rect_boton.center)
-        self.ventana.blit(texto_boton, rect_texto)
-        self.rect_iniciar = rect_boton if puede_iniciar else None
-        
-        if len(self.ranking) > 0:
+        ranking = self.obtener_top_ranking()
+        if len(ranking) > 0:
             y_ranking = 180
             x_ranking = ANCHO_VENTANA - 420
             
-            titulo_ranking = self.fuente_mediana.render("Top 5", True, COLOR_AMARILLO)
-            self.ventana.blit(titulo_ranking, (x_ranking, y_ranking))
+            texto_titulo = {EXPERIENCIA_PRINCIPIANTE: "Top 5 (0-5 años)", EXPERIENCIA_AVANZADO: "Top 5 (5+ años)"}.get(self.experiencia, "Top 5")
+            titulo_ranking = self.textos.renderizar(self.fuente_mediana, texto_titulo, COLOR_AMARILLO)
+            superficie.blit(titulo_ranking, (x_ranking, y_ranking))
             
-            for i, entrada in enumerate(self.ranking[:5]):
+            for i, entrada in enumerate(ranking):
                 y_pos = y_ranking + 40 + i * 60
-                pygame.draw.rect(self.ventana, (30, 41, 59), (x_ranking, y_pos, 350, 50))
+                pygame.draw.rect(superficie, (30, 41, 59), (x_ranking, y_pos, 350, 50))
                 
-                pos_texto = self.fuente_mediana.render(f"#{i+1}", True, COLOR_AMARILLO)
-                self.ventana.blit(pos_texto, (x_ranking + 10, y_pos + 5))
+                pos_texto = self.textos.renderizar(self.fuente_mediana, f"#{i+1}", COLOR_AMARILLO)
+                superficie.blit(pos_texto, (x_ranking + 10, y_pos + 5))
                 
-                nombre_texto = self.fuente_pequena.render(entrada['nombre'], True, COLOR_BLANCO)
-                self.ventana.blit(nombre_texto, (x_ranking + 60, y_pos + 5))
+                nombre_texto = self.textos.renderizar(self.fuente_pequena, entrada['nombre'], COLOR_BLANCO)
+                superficie.blit(nombre_texto, (x_ranking + 60, y_pos + 5))
                 
-                puntos_texto = self.fuente_mediana.render(str(entrada['puntos']), True, COLOR_VERDE)
-                self.ventana.blit(puntos_texto, (x_ranking + 250, y_pos + 5))
+                puntos_texto = self.textos.renderizar(self.fuente_mediana, str(entrada['puntos']), COLOR_VERDE)
+                superficie.blit(puntos_texto, (x_ranking + 250, y_pos + 5))
                 
-                precision_texto = self.fuente_pequena.render(f"{entrada['precision']}%", True, COLOR_GRIS)
-                self.ventana.blit(precision_texto, (x_ranking + 60, y_pos + 28))
+                precision_texto = self.textos.renderizar(self.fuente_pequena, f"{entrada['precision']}%", COLOR_GRIS)
+                superficie.blit(precision_texto, (x_ranking + 60, y_pos + 28))
     
     def dibujar_jugando(self):
-        """Dibuja la pantalla de juego - versión simplificada para ahorrar espacio"""
-        if self.fondo_imagen:
-            self.ventana.blit(self.fondo_imagen, (0, 0))
-        else:
-            self.ventana.fill(COLOR_FONDO)
-        
+        """
+        Dibuja la pantalla de juego. La capa estática (fondo, imagen, contornos,
+        panel y marcadores que solo cambian al responder) se recompone al cambiar
+        de pregunta o de estado de feedback; el reloj, el polígono del jugador y
+        los botones se repintan solo cuando cambian.
+        """
         pregunta = self.datos_juego[self.pregunta_actual]
-        nombre_imagen = pregunta['imageName']
+        y_imagen = self.y_imagen_actual()
+        vista = self.obtener_vista_pregunta(pregunta, y_imagen)
+        self.rect_imagen = vista['rect'] if vista else None
+        self.escala_imagen = vista['escala'] if vista else 1.0
         
-        # Panel superior con stats (código simplificado - funciona igual)
+        x_panel = ANCHO_VENTANA - 380
         y_stats = 20
-        self.ventana.blit(self.fuente_mediana.render(f"Pregunta: {self.pregunta_actual + 1}/{len(self.datos_juego)}", True, COLOR_BLANCO), (20, y_stats))
-        self.ventana.blit(self.fuente_mediana.render(f"Puntos: {self.puntos}", True, COLOR_VERDE), (220, y_stats))
-        self.ventana.blit(self.fuente_mediana.render("Vidas: ", True, COLOR_ROJO), (420, y_stats))
-        for i in range(self.vidas):
-            pygame.draw.circle(self.ventana, COLOR_ROJO, (510 + i * 30, y_stats + 15), 10)
+        elementos = []
+        
+        # Reloj
         tiempo = int((pygame.time.get_ticks() / 1000) - self.tiempo_inicio)
-        self.ventana.blit(self.fuente_mediana.render(f"Tiempo: {tiempo//60}:{tiempo%60:02d}", True, COLOR_AZUL), (620, y_stats))
+        def dibujar_tiempo(superficie):
+            superficie.blit(self.textos.renderizar(self.fuente_mediana, f"Tiempo: {tiempo//60}:{tiempo%60:02d}", COLOR_AZUL), (620, y_stats))
+        elementos.append(Elemento('tiempo', (620, y_stats, 200, 30), tiempo, dibujar_tiempo))
         
+        # Racha parpadeante
         if self.racha >= 3:
-            texto_racha = self.fuente_grande.render(f"RACHA x{self.racha}", True, COLOR_AMARILLO)
-            if pygame.time.get_ticks() % 1000 < 500:
-                self.ventana.blit(texto_racha, texto_racha.get_rect(center=(ANCHO_VENTANA // 2, y_stats + 50)))
-        
-        y_imagen = 100 if self.racha < 3 else 140
-        
-        if nombre_imagen in self.imagenes_cargadas:
-            imagen = self.imagenes_cargadas[nombre_imagen]
-            escala = min(800 / imagen.get_width(), (ALTO_VENTANA - y_imagen - 80) / imagen.get_height(), 1.0)
-            imagen_escalada = pygame.transform.scale(imagen, (int(imagen.get_width() * escala), int(imagen.get_height() * escala)))
-            rect_imagen = imagen_escalada.get_rect(topleft=(50, y_imagen))
-            self.ventana.blit(imagen_escalada, rect_imagen)
-            
-            if len(self.puntos_poligono) > 0:
-                puntos_pantalla = [(rect_imagen.left + p[0] * escala, rect_imagen.top + p[1] * escala) for p in self.puntos_poligono]
-                if len(puntos_pantalla) > 1:
-                    pygame.draw.lines(self.ventana, COLOR_AZUL, False, puntos_pantalla, 3)
-                for i, punto in enumerate(puntos_pantalla):
-                    pygame.draw.circle(self.ventana, COLOR_VERDE if i == 0 else COLOR_AZUL, punto, 6)
-            
-            if self.mostrar_feedback and not pregunta.get('es_negativo', False):
-                for poligono_correcto in pregunta['polygons']:
-                    puntos_correctos = [(rect_imagen.left + p['x'] * escala, rect_imagen.top + p['y'] * escala) for p in poligono_correcto]
-                    if len(puntos_correctos) > 2:
-                        pygame.draw.polygon(self.ventana, COLOR_VERDE, puntos_correctos, 3)
-            
-            self.rect_imagen = rect_imagen
-            self.escala_imagen = escala
+            texto = f"RACHA x{self.racha}"
+            visible = pygame.time.get_ticks() % 1000 < 500
+            ancho, alto = self.fuente_grande.size(texto)
+            rect_racha = pygame.Rect(0, 0, ancho, alto)
+            rect_racha.center = (ANCHO_VENTANA // 2, y_stats + 50)
+            def dibujar_racha(superficie):
+                if visible:
+                    superficie.blit(self.textos.renderizar(self.fuente_grande, texto, COLOR_AMARILLO), rect_racha)
+            elementos.append(Elemento('racha', rect_racha, (texto, visible), dibujar_racha))
+        
+        # Polígono del jugador
+        if vista is not None:
+            rect_imagen = vista['rect']
+            escala = vista['escala']
+            def dibujar_poligono(superficie):
+                if len(self.puntos_poligono) > 0:
+                    puntos_pantalla = [(rect_imagen.left + p[0] * escala, rect_imagen.top + p[1] * escala) for p in self.puntos_poligono]
+                    if len(puntos_pantalla) > 1:
+                        pygame.draw.lines(superficie, COLOR_AZUL, False, puntos_pantalla, 3)
+                    for i, punto in enumerate(puntos_pantalla):
+                        pygame.draw.circle(superficie, COLOR_VERDE if i == 0 else COLOR_AZUL, punto, 6)
+            elementos.append(Elemento('poligono', rect_imagen.inflate(16, 16), tuple(self.puntos_poligono), dibujar_poligono))
+        
+        # Contador de puntos marcados del panel
+        y_puntos_marcados = y_imagen + 190
+        def dibujar_puntos_marcados(superficie):
+            texto_puntos_valor = self.textos.renderizar(self.fuente_pequena, str(len(self.puntos_poligono)), COLOR_AZUL)
+            superficie.blit(texto_puntos_valor, (x_panel + 220, y_puntos_marcados))
+        elementos.append(Elemento('puntos_marcados', (x_panel + 220, y_puntos_marcados, 120, 25),
+                                  len(self.puntos_poligono), dibujar_puntos_marcados))
+        
+        # Botón de envío
+        y_botones = ALTO_VENTANA - 180
+        puede_enviar = len(self.puntos_poligono) >= 3 and not self.respondida
+        puede_enviar_vacio = len(self.puntos_poligono) == 0 and not self.respondida
+        activo = puede_enviar or puede_enviar_vacio
+        rect_enviar = pygame.Rect(x_panel + 20, y_botones + 110, 320, 50)
+        texto_enviar = "ENVIAR RESPUESTA" if len(self.puntos_poligono) >= 3 else "SIN CARIES (ENVIAR)" if not self.respondida else "Esperando..."
+        def dibujar_enviar(superficie):
+            pygame.draw.rect(superficie, COLOR_VERDE if activo else COLOR_GRIS, rect_enviar, 0 if activo else 2)
+            texto = self.textos.renderizar(self.fuente_mediana, texto_enviar, COLOR_BLANCO)
+            superficie.blit(texto, texto.get_rect(center=rect_enviar.center))
+        elementos.append(Elemento('enviar', rect_enviar, (activo, texto_enviar), dibujar_enviar))
+        self.rect_enviar = rect_enviar if activo else None
+        
+        # Mensaje de feedback (encima de todo lo anterior)
+        if self.mostrar_feedback:
+            rect_feedback = pygame.Rect(0, ALTO_VENTANA // 2 - 75, ANCHO_VENTANA, 150)
+            def dibujar_feedback(superficie):
+                superficie_feedback = pygame.Surface((ANCHO_VENTANA, 150), pygame.SRCALPHA)
+                pygame.draw.rect(superficie_feedback, (34, 197, 94, 200) if self.es_correcto else (239, 68, 68, 200), (0, 0, ANCHO_VENTANA, 150))
+                superficie.blit(superficie_feedback, rect_feedback)
+                texto_mensaje = self.textos.renderizar(self.fuente_grande, self.mensaje_feedback, COLOR_BLANCO)
+                superficie.blit(texto_mensaje, texto_mensaje.get_rect(center=(ANCHO_VENTANA // 2, ALTO_VENTANA // 2 - 20)))
+                texto_precision = self.textos.renderizar(self.fuente_mediana, f"Precisión: {self.precision_actual:.1f}%", COLOR_BLANCO)
+                superficie.blit(texto_precision, texto_precision.get_rect(center=(ANCHO_VENTANA // 2, ALTO_VENTANA // 2 + 20)))
+            elementos.append(Elemento('feedback', rect_feedback, (self.mensaje_feedback, self.es_correcto, self.precision_actual), dibujar_feedback))
+        
+        clave_estatica = ('jugando', self.pregunta_actual, y_imagen, self.mostrar_feedback,
+                          tuple(vista['rect']) if vista else self.cache_imagenes.ha_fallado(pregunta['imageName']))
+        self.componer(clave_estatica, lambda superficie: self.dibujar_jugando_estatico(superficie, pregunta, vista, y_imagen), elementos)
+    
+    def dibujar_jugando_estatico(self, superficie, pregunta, vista, y_imagen):
+        """Capa fija de la pregunta: fondo, marcadores, imagen, contornos y panel lateral"""
+        self.dibujar_fondo(superficie)
         
-              # *** PANEL LATERAL DERECHO ***
+        # Panel superior con stats
+        y_stats = 20
+        superficie.blit(self.textos.renderizar(self.fuente_mediana, f"Pregunta: {self.pregunta_actual + 1}/{len(self.datos_juego)}", COLOR_BLANCO), (20, y_stats))
+        superficie.blit(self.textos.renderizar(self.fuente_mediana, f"Puntos: {self.puntos}", COLOR_VERDE), (220, y_stats))
+        superficie.blit(self.textos.renderizar(self.fuente_mediana, "Vidas: ", COLOR_ROJO), (420, y_stats))
+        for i in range(self.vidas):
+            pygame.draw.circle(superficie, COLOR_ROJO, (510 + i * 30, y_stats + 15), 10)
+        
+        if vista is None:
+            if self.cache_imagenes.ha_fallado(pregunta['imageName']):
+                texto_estado = self.textos.renderizar(self.fuente_mediana, f"Imagen no disponible: {pregunta['imageName']}", COLOR_ROJO)
+            else:
+                texto_estado = self.textos.renderizar(self.fuente_mediana, "Cargando imagen...", COLOR_GRIS)
+            superficie.blit(texto_estado, (50, y_imagen))
+        else:
+            superficie.blit(vista['superficie'], vista['rect'])
+            if self.mostrar_feedback:
+                for puntos_correctos in vista['contornos']:
+                    pygame.draw.polygon(superficie, COLOR_VERDE, puntos_correctos, 3)
+        
+        # *** PANEL LATERAL DERECHO ***
         x_panel = ANCHO_VENTANA - 380
         y_panel = y_imagen
         ancho_panel = 360
         
         # Fondo del panel
         pygame.draw.rect(
-            self.ventana, 
+            superficie, 
             (30, 41, 59), 
             (x_panel, y_panel, ancho_panel, ALTO_VENTANA - y_panel - 20)
         )
         
         # Título del panel
-        titulo_panel = self.fuente_mediana.render("Tu Progreso", True, COLOR_BLANCO)
-        self.ventana.blit(titulo_panel, (x_panel + 20, y_panel + 20))
+        titulo_panel = self.textos.renderizar(self.fuente_mediana, "Tu Progreso", COLOR_BLANCO)
+        superficie.blit(titulo_panel, (x_panel + 20, y_panel + 20))
         
         y_info = y_panel + 70
         
@@ -715,44 +813,38 @@ class JuegoDeteccionCaries:
             else COLOR_AMARILLO if dificultad == DIFICULTAD_MEDIA 
             else COLOR_ROJO
         )
-        texto_dificultad_label = self.fuente_pequena.render("Dificultad:", True, COLOR_GRIS)
-        self.ventana.blit(texto_dificultad_label, (x_panel + 20, y_info))
+        texto_dificultad_label = self.textos.renderizar(self.fuente_pequena, "Dificultad:", COLOR_GRIS)
+        superficie.blit(texto_dificultad_label, (x_panel + 20, y_info))
         
-        texto_dificultad = self.fuente_pequena.render(
+        texto_dificultad = self.textos.renderizar(
+            self.fuente_pequena, 
             dificultad.upper(), 
-            True, 
             color_dificultad
         )
-        self.ventana.blit(texto_dificultad, (x_panel + 220, y_info))
+        superficie.blit(texto_dificultad, (x_panel + 220, y_info))
         
         # Racha actual
         y_info += 40
-        texto_racha_label = self.fuente_pequena.render("Racha actual:", True, COLOR_GRIS)
-        self.ventana.blit(texto_racha_label, (x_panel + 20, y_info))
-        texto_racha_valor = self.fuente_pequena.render(str(self.racha), True, COLOR_AMARILLO)
-        self.ventana.blit(texto_racha_valor, (x_panel + 220, y_info))
+        texto_racha_label = self.textos.renderizar(self.fuente_pequena, "Racha actual:", COLOR_GRIS)
+        superficie.blit(texto_racha_label, (x_panel + 20, y_info))
+        texto_racha_valor = self.textos.renderizar(self.fuente_pequena, str(self.racha), COLOR_AMARILLO)
+        superficie.blit(texto_racha_valor, (x_panel + 220, y_info))
         
         # Mejor racha
         y_info += 40
-        texto_max_racha_label = self.fuente_pequena.render("Mejor racha:", True, COLOR_GRIS)
-        self.ventana.blit(texto_max_racha_label, (x_panel + 20, y_info))
-        texto_max_racha_valor = self.fuente_pequena.render(
+        texto_max_racha_label = self.textos.renderizar(self.fuente_pequena, "Mejor racha:", COLOR_GRIS)
+        superficie.blit(texto_max_racha_label, (x_panel + 20, y_info))
+        texto_max_racha_valor = self.textos.renderizar(
+            self.fuente_pequena, 
             str(self.racha_maxima), 
-            True, 
             COLOR_VERDE
         )
-        self.ventana.blit(texto_max_racha_valor, (x_panel + 220, y_info))
+        superficie.blit(texto_max_racha_valor, (x_panel + 220, y_info))
         
-        # Puntos marcados
+        # Puntos marcados (el valor es un elemento dinámico)
         y_info += 40
-        texto_puntos_label = self.fuente_pequena.render("Puntos marcados:", True, COLOR_GRIS)
-        self.ventana.blit(texto_puntos_label, (x_panel + 20, y_info))
-        texto_puntos_valor = self.fuente_pequena.render(
-            str(len(self.puntos_poligono)), 
-            True, 
-            COLOR_AZUL
-        )
-        self.ventana.blit(texto_puntos_valor, (x_panel + 220, y_info))
+        texto_puntos_label = self.textos.renderizar(self.fuente_pequena, "Puntos marcados:", COLOR_GRIS)
+        superficie.blit(texto_puntos_label, (x_panel + 20, y_info))
         
         # Instrucciones
         y_info += 60
@@ -770,35 +862,18 @@ class JuegoDeteccionCaries:
         for i, linea in enumerate(instrucciones):
             fuente = self.fuente_pequena
             color = COLOR_BLANCO if i == 0 else COLOR_GRIS
-            texto = fuente.render(linea, True, color)
-            self.ventana.blit(texto, (x_panel + 20, y_info + i * 25))
-        
-        # Botones de control
-        y_botones = ALTO_VENTANA - 180
-        puede_enviar = len(self.puntos_poligono) >= 3 and not self.respondida
-        puede_enviar_vacio = len(self.puntos_poligono) == 0 and not self.respondida
-        
-        rect_enviar = pygame.Rect(x_panel + 20, y_botones + 110, 320, 50)
-        pygame.draw.rect(self.ventana, COLOR_VERDE if (puede_enviar or puede_enviar_vacio) else COLOR_GRIS, rect_enviar, 0 if (puede_enviar or puede_enviar_vacio) else 2)
-        texto_enviar = self.fuente_mediana.render("ENVIAR RESPUESTA" if len(self.puntos_poligono) >= 3 else "SIN CARIES (ENVIAR)" if not self.respondida else "Esperando...", True, COLOR_BLANCO)
-        self.ventana.blit(texto_enviar, texto_enviar.get_rect(center=rect_enviar.center))
-        self.rect_enviar = rect_enviar if (puede_enviar or puede_enviar_vacio) else None
-        
-        if self.mostrar_feedback:
-            superficie_feedback = pygame.Surface((ANCHO_VENTANA, 150), pygame.SRCALPHA)
-            pygame.draw.rect(superficie_feedback, (34, 197, 94, 200) if self.es_correcto else (239, 68, 68, 200), (0, 0, ANCHO_VENTANA, 150))
-            self.ventana.blit(superficie_feedback, (0, ALTO_VENTANA // 2 - 75))
-            texto_mensaje = self.fuente_grande.render(self.mensaje_feedback, True, COLOR_BLANCO)
-            self.ventana.blit(texto_mensaje, texto_mensaje.get_rect(center=(ANCHO_VENTANA // 2, ALTO_VENTANA // 2 - 20)))
-            texto_precision = self.fuente_mediana.render(f"Precisión: {self.precision_actual:.1f}%", True, COLOR_BLANCO)
-            self.ventana.blit(texto_precision, texto_precision.get_rect(center=(ANCHO_VENTANA // 2, ALTO_VENTANA // 2 + 20)))
+            texto = self.textos.renderizar(fuente, linea, color)
+            superficie.blit(texto, (x_panel + 20, y_info + i * 25))
     
     def dibujar_resultados(self):
         """Dibuja la pantalla de resultados"""
-        if self.fondo_imagen:
-            self.ventana.blit(self.fondo_imagen, (0, 0))
-        else:
-            self.ventana.fill(COLOR_FONDO)
+        self.rect_volver = pygame.Rect(ANCHO_VENTANA // 2 - 150, ALTO_VENTANA - 100, 300, 60)
+        clave_estatica = ('resultados', self.puntos, len(self.resultados_detallados), self.mensaje_exportacion)
+        self.componer(clave_estatica, self.dibujar_resultados_estatico, [])
+    
+    def dibujar_resultados_estatico(self, superficie):
+        """Capa fija de la pantalla de resultados (no tiene elementos dinámicos)"""
+        self.dibujar_fondo(superficie)
         
         total_preguntas = len(self.resultados_detallados)
         aciertos = sum(1 for r in self.resultados_detallados if r['correcto'])
@@ -810,22 +885,65 @@ class JuegoDeteccionCaries:
         elif precision >= 60: nivel, icono, color_nivel = "INTERMEDIO", " ", (168, 85, 247)
         else: nivel, icono, color_nivel = "PRINCIPIANTE", " ", COLOR_GRIS
         
-        self.ventana.blit(self.fuente_titulo.render(icono, True, COLOR_BLANCO), self.fuente_titulo.render(icono, True, COLOR_BLANCO).get_rect(center=(ANCHO_VENTANA // 2, 80)))
-        self.ventana.blit(self.fuente_titulo.render("¡Juego Completado!", True, COLOR_BLANCO), self.fuente_titulo.render("¡Juego Completado!", True, COLOR_BLANCO).get_rect(center=(ANCHO_VENTANA // 2, 170)))
-        self.ventana.blit(self.fuente_grande.render(nivel, True, color_nivel), self.fuente_grande.render(nivel, True, color_nivel).get_rect(center=(ANCHO_VENTANA // 2, 230)))
-        self.ventana.blit(self.fuente_pequena.render("Datos guardados en Excel", True, COLOR_VERDE), self.fuente_pequena.render("Datos guardados en Excel", True, COLOR_VERDE).get_rect(center=(ANCHO_VENTANA // 2, 270)))
+        self.dibujar_texto_centrado(superficie, self.fuente_titulo, icono, COLOR_BLANCO, (ANCHO_VENTANA // 2, 80))
+        self.dibujar_texto_centrado(superficie, self.fuente_titulo, "¡Juego Completado!", COLOR_BLANCO, (ANCHO_VENTANA // 2, 170))
+        self.dibujar_texto_centrado(superficie, self.fuente_grande, nivel, color_nivel, (ANCHO_VENTANA // 2, 230))
+        self.dibujar_texto_centrado(superficie, self.fuente_pequena, "Datos guardados", COLOR_VERDE, (ANCHO_VENTANA // 2, 270))
+        self.dibujar_texto_centrado(superficie, self.fuente_pequena, self.mensaje_exportacion, COLOR_GRIS, (ANCHO_VENTANA // 2, 300))
         
-        rect_volver = pygame.Rect(ANCHO_VENTANA // 2 - 150, ALTO_VENTANA - 100, 300, 60)
-        pygame.draw.rect(self.ventana, COLOR_AZUL, rect_volver)
-        self.ventana.blit(self.fuente_grande.render("VOLVER AL MENÚ", True, COLOR_BLANCO), self.fuente_grande.render("VOLVER AL MENÚ", True, COLOR_BLANCO).get_rect(center=rect_volver.center))
-        self.rect_volver = rect_volver
+        pygame.draw.rect(superficie, COLOR_AZUL, self.rect_volver)
+        self.dibujar_texto_centrado(superficie, self.fuente_grande, "VOLVER AL MENÚ", COLOR_BLANCO, self.rect_volver.center)
+    
+    def dibujar_texto_centrado(self, superficie, fuente, texto, color, centro):
+        """Dibuja un texto (cacheado) centrado en `centro`"""
+        renderizado = self.textos.renderizar(fuente, texto, color)
+        superficie.blit(renderizado, renderizado.get_rect(center=centro))
+    
+    def elemento_depuracion(self):
+        """Superposición con los contadores de rendimiento (F3)"""
+        lineas = [self.contador_frames.resumen(), self.cache_imagenes.resumen(), self.copias.resumen(),
+                  self.textos.resumen(), self.compositor.resumen(), self.planificador.resumen(),
+                  f"Memoria residente: {memoria_residente_mb() or 0:.0f} MB"]
+        y = ALTO_VENTANA - 10 - len(lineas) * 22
+        rect = pygame.Rect(5, y - 5, 520, len(lineas) * 22 + 10)
+        def dibujar(superficie):
+            pygame.draw.rect(superficie, COLOR_NEGRO, rect)
+            for i, linea in enumerate(lineas):
+                superficie.blit(self.textos.renderizar(self.fuente_pequena, linea, COLOR_AMARILLO), (10, y + i * 22))
+        return Elemento('depuracion', rect, tuple(lineas), dibujar)
+    
+    def plazo_proximo_cambio(self):
+        """
+        Milisegundos hasta que algo en pantalla cambie sin intervención del
+        jugador (reloj, parpadeo de la racha, superposición F3), o None si la
+        escena está quieta. El temporizador del feedback y las imágenes
+        precargadas llegan como eventos y despiertan el bucle por sí solos.
+        """
+        plazos = []
+        if self.mostrar_depuracion:
+            plazos.append(REFRESCO_DEPURACION_MS)
+        if self.estado == ESTADO_JUGANDO:
+            ahora = pygame.time.get_ticks()
+            transcurrido = ahora - self.tiempo_inicio * 1000
+            plazos.append(1000 - transcurrido % 1000 + 1)
+            if self.racha >= 3:
+                plazos.append(500 - ahora % 500 + 1)
+        return min(plazos) if plazos else None
     
-    def manejar_eventos(self):
+    def manejar_eventos(self, eventos):
         """Procesa eventos del usuario"""
-        for evento in pygame.event.get():
+        for evento in eventos:
             if evento.type == pygame.QUIT:
                 return False
             
+            if evento.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                self.compositor.invalidar()
+                continue
+            
+            if evento.type == pygame.KEYDOWN and evento.key == pygame.K_F3:
+                self.mostrar_depuracion = not self.mostrar_depuracion
+                continue
+            
             if evento.type == pygame.USEREVENT and self.estado == ESTADO_JUGANDO and self.respondida:
                 self.siguiente_pregunta()
             
@@ -846,7 +964,7 @@ class JuegoDeteccionCaries:
             elif self.estado == ESTADO_JUGANDO:
                 if evento.type == pygame.MOUSEBUTTONDOWN:
                     pos = evento.pos
-                    if not self.respondida and hasattr(self, 'rect_imagen') and self.rect_imagen.collidepoint(pos):
+                    if not self.respondida and getattr(self, 'rect_imagen', None) and self.rect_imagen.collidepoint(pos):
                         x = (pos[0] - self.rect_imagen.left) / self.escala_imagen
                         y = (pos[1] - self.rect_imagen.top) / self.escala_imagen
                         self.puntos_poligono.append((x, y))
@@ -858,6 +976,8 @@ class JuegoDeteccionCaries:
                     if evento.key == pygame.K_e and not self.respondida: self.enviar_respuesta()
             
             elif self.estado == ESTADO_RESULTADOS:
+                if evento.type == pygame.KEYDOWN and evento.key == pygame.K_x:
+                    self.exportar_excel()
                 if evento.type == pygame.MOUSEBUTTONDOWN and hasattr(self, 'rect_volver') and self.rect_volver.collidepoint(evento.pos):
                     self.estado = ESTADO_MENU
                     self.nombre_jugador = ""
@@ -869,12 +989,18 @@ class JuegoDeteccionCaries:
         """Bucle principal del juego"""
         ejecutando = True
         while ejecutando:
-            ejecutando = self.manejar_eventos()
+            eventos = self.planificador.esperar(plazo_ms=self.plazo_proximo_cambio())
+            ejecutando = self.manejar_eventos(eventos)
+            self.contador_frames.empezar()
             if self.estado == ESTADO_MENU: self.dibujar_menu()
             elif self.estado == ESTADO_JUGANDO: self.dibujar_jugando()
             elif self.estado == ESTADO_RESULTADOS: self.dibujar_resultados()
-            pygame.display.flip()
-            self.reloj.tick(60)
+            self.compositor.presentar()
+            self.contador_frames.terminar()
+        self.precargador.cerrar()
+        self.almacen.cerrar()
+        if self.archivo_dataset is not None:
+            self.archivo_dataset.cerrar()
         pygame.quit()
         sys.exit()
 
@@ -886,21 +1012,29 @@ if __name__ == "__main__":
     print("   ✅ Imágenes en orden aleatorio por partida")
     print("   ✅ Música de fondo (soundtrak_caries.mp3)")
     print("   ✅ Imagen de fondo (fondo_pantalla.jpg)")
-    print("   ✅ Guardado automático en Excel (datos_juego_caries.xlsx)")
-    print("   ✅ Ranking persistente en JSON")
+    print("   ✅ Guardado automático en SQLite (resultados_caries.db)")
+    print("   ✅ Exportación a Excel bajo demanda (tecla X en resultados)")
+    print("   ✅ Ranking persistente e indexado (por nivel y fecha)")
     print("\n📋 ARCHIVOS NECESARIOS:")
     print("   • etiquetas_caries.json (imágenes etiquetadas)")
     print("   • imagenes/ (carpeta con imágenes)")
+    print("     o en su lugar imagenes.niripak (python archivo_dataset.py empaquetar)")
     print("   • fondo_pantalla.jpg (opcional)")
     print("   • soundtrak_caries.mp3 (opcional)")
     print("\n💾 INSTALACIÓN:")
-    print("   pip install pygame openpyxl")
+    print("   pip install pygame openpyxl numpy")
     print("\n" + "=" * 70)
     
     print("\n🔍 VERIFICANDO ARCHIVOS...")
     archivos_criticos = ['etiquetas_caries.json']
     falta_critico = False
     
+    # Con el dataset empaquetado no hacen falta ni el JSON ni la carpeta
+    empaquetado = os.path.exists(ruta_archivo(CARPETA_IMAGENES))
+    if empaquetado:
+        print(f"   ✅ {ruta_archivo(CARPETA_IMAGENES)} (dataset empaquetado)")
+        archivos_criticos = []
+    
     for archivo in archivos_criticos:
         if os.path.exists(archivo):
             print(f"   ✅ {archivo}")
@@ -911,7 +1045,9 @@ if __name__ == "__main__":
     for archivo in ['fondo_pantalla.jpg', 'soundtrak_caries.mp3']:
         print(f"   {'✅' if os.path.exists(archivo) else '⚠️ '} {archivo} ({'encontrado' if os.path.exists(archivo) else 'opcional'})")
     
-    if os.path.exists('imagenes'):
+    if empaquetado:
+        print("   ✅ Imágenes dentro del archivo empaquetado")
+    elif os.path.exists('imagenes'):
         num = len([f for f in os.listdir('imagenes') if f.endswith(('.jpg', '.jpeg', '.png'))])
         print(f"   ✅ Carpeta imagenes/ ({num} imágenes)")
     else:
@@ -0,0 +1,306 @@
+"""
+VALIDACIÓN DEL DATASET Y MANIFIESTO DE IMÁGENES
+Decodifica en paralelo (un proceso por núcleo) todas las imágenes de una
+carpeta y de sus subcarpetas, anota su tamaño y su hash, comprueba los
+polígonos de las etiquetas contra ese tamaño y señala imágenes sin
+etiqueta y etiquetas sin imagen. El resultado es un manifiesto JSON junto
+a la carpeta que el juego y la herramienta de etiquetado usan al arrancar
+en lugar de decodificar cada archivo; al cargarlo solo se comprueba con
+os.stat que ninguna carpeta ni imagen haya cambiado.
+
+Uso:
+    python manifiesto.py validar [carpeta_imagenes] [etiquetas.json|.jsonl]
+
+ARCHIVO: manifiesto.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pygame
+
+from fusionar_etiquetas import leer_registros, validar_poligono
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+VERSION_MANIFIESTO = 2  # 2: nombres relativos con '/' (subcarpetas) y firma de cada carpeta
+SUFIJO_MANIFIESTO = ".manifiesto.json"  # imagenes/ -> imagenes.manifiesto.json
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.bmp')
+IMAGENES_POR_TAREA = 16  # Imágenes que recibe cada proceso de una vez
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def ruta_manifiesto(carpeta_imagenes):
+    """
+    El manifiesto va junto a la carpeta y no dentro: así escribirlo no
+    cambia la fecha de modificación de la carpeta, que es parte de lo que
+    indica si sigue al día.
+    """
+    return os.path.normpath(carpeta_imagenes) + SUFIJO_MANIFIESTO
+
+
+def firma_archivo(ruta):
+    """(tamaño en bytes, mtime en ns) de un archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+def recorrer_carpeta(carpeta_imagenes):
+    """
+    Imágenes de la carpeta y de sus subcarpetas con el mismo criterio que
+    IndiceImagenes (se saltan los nombres que empiezan por '.'). Devuelve
+    (imagenes, carpetas): lista de (nombre relativo con '/', ruta, os.stat)
+    y carpeta relativa -> mtime_ns.
+    """
+    imagenes, carpetas = [], {}
+    pendientes = [""]
+    while pendientes:
+        relativa = pendientes.pop()
+        ruta = os.path.join(carpeta_imagenes, relativa) if relativa else carpeta_imagenes
+        carpetas[relativa] = os.stat(ruta).st_mtime_ns
+        prefijo = relativa + "/" if relativa else ""
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                if entrada.name[0] == '.':
+                    continue
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(prefijo + entrada.name)
+                elif entrada.name.lower().endswith(EXTENSIONES_IMAGEN):
+                    imagenes.append((prefijo + entrada.name, entrada.path, entrada.stat()))
+    return imagenes, carpetas
+
+
+def entrada_al_dia(datos, ruta):
+    """True si el archivo de `ruta` tiene el tamaño y el mtime de su entrada del manifiesto"""
+    return datos is not None and firma_archivo(ruta) == [datos['bytes'], datos['mtime_ns']]
+
+
+def analizar_imagen(ruta):
+    """
+    Trabajo de cada proceso: lee la imagen una sola vez, calcula su SHA-256
+    y la decodifica. Devuelve (ruta, datos, error).
+    """
+    try:
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        ancho, alto = pygame.image.load(io.BytesIO(contenido), os.path.basename(ruta)).get_size()
+        estado = os.stat(ruta)
+        return ruta, {
+            'ancho': ancho,
+            'alto': alto,
+            'bytes': estado.st_size,
+            'mtime_ns': estado.st_mtime_ns,
+            'sha256': hashlib.sha256(contenido).hexdigest()
+        }, None
+    except Exception as e:
+        return ruta, None, str(e) or type(e).__name__
+
+
+def problemas_registro(registro, datos_imagen):
+    """Lista de problemas de los polígonos de un registro frente al tamaño real de su imagen"""
+    problemas = []
+    for numero, poligono in enumerate(registro.get('polygons') or [], start=1):
+        if validar_poligono(poligono, datos_imagen['ancho'], datos_imagen['alto']) is None:
+            if validar_poligono(poligono) is None:
+                problemas.append(f"polígono {numero} degenerado o mal formado")
+            else:
+                problemas.append(f"polígono {numero} fuera de la imagen")
+    return problemas
+
+
+def cargar_manifiesto(carpeta_imagenes, archivo_etiquetas=None):
+    """
+    Manifiesto de `carpeta_imagenes` si sigue al día, o None. Está al día si
+    ninguna carpeta ha cambiado (añadir, quitar o renombrar imágenes o
+    subcarpetas cambia el mtime de la carpeta que las contiene), si cada
+    imagen conserva su tamaño y su mtime (sobrescribir una imagen no cambia
+    el de su carpeta) y, si se indica, si el archivo de etiquetas es el
+    mismo que se validó. Es un os.stat por carpeta y por imagen, sin leer
+    ninguna.
+    """
+    try:
+        with open(ruta_manifiesto(carpeta_imagenes), 'r', encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    if manifiesto.get('version') != VERSION_MANIFIESTO:
+        return None
+    for relativa, mtime in manifiesto.get('firmas_carpetas', {}).items():
+        ruta = os.path.join(carpeta_imagenes, relativa) if relativa else carpeta_imagenes
+        try:
+            if os.stat(ruta).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+    for nombre, datos in manifiesto['imagenes'].items():
+        if not entrada_al_dia(datos, os.path.join(carpeta_imagenes, nombre)):
+            return None
+    if archivo_etiquetas is not None and manifiesto.get('firma_etiquetas') != firma_archivo(archivo_etiquetas):
+        return None
+    return manifiesto
+
+
+def imagenes_validas(manifiesto):
+    """Nombres de las imágenes que se decodificaron bien y cuyas etiquetas no tienen problemas"""
+    return set(manifiesto['imagenes']) - set(manifiesto['problemas'])
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class ValidadorDataset:
+    """
+    Construye el manifiesto de una carpeta de imágenes (con sus
+    subcarpetas) y, opcionalmente, de su archivo de etiquetas. Las imágenes
+    cuyo tamaño y mtime no han cambiado desde el manifiesto anterior no se
+    vuelven a decodificar.
+    """
+
+    def __init__(self, carpeta_imagenes, archivo_etiquetas=None, procesos=None):
+        self.carpeta_imagenes = carpeta_imagenes
+        self.archivo_etiquetas = archivo_etiquetas
+        self.procesos = procesos or os.cpu_count() or 1
+        self.reutilizadas = 0
+
+    def anterior(self):
+        """Entradas del manifiesto previo (aunque ya no esté al día)"""
+        try:
+            with open(ruta_manifiesto(self.carpeta_imagenes), 'r', encoding='utf-8') as archivo:
+                manifiesto = json.load(archivo)
+            # Los nombres de la versión 1 (solo la carpeta raíz) siguen valiendo como relativos
+            if manifiesto.get('version') in (1, VERSION_MANIFIESTO):
+                return manifiesto['imagenes']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def analizar_imagenes(self):
+        """
+        Devuelve (imagenes, defectuosas, carpetas): nombre relativo -> datos,
+        nombre relativo -> error y carpeta relativa -> mtime_ns
+        """
+        previas = self.anterior()
+        imagenes, defectuosas, pendientes = {}, {}, {}
+        encontradas, carpetas = recorrer_carpeta(self.carpeta_imagenes)
+        for nombre, ruta, estado in encontradas:
+            previa = previas.get(nombre)
+            if previa and previa['bytes'] == estado.st_size and previa['mtime_ns'] == estado.st_mtime_ns:
+                imagenes[nombre] = previa
+                self.reutilizadas += 1
+            else:
+                pendientes[ruta] = nombre
+
+        if pendientes:
+            with ProcessPoolExecutor(max_workers=min(self.procesos, len(pendientes))) as ejecutor:
+                for ruta, datos, error in ejecutor.map(analizar_imagen, list(pendientes), chunksize=IMAGENES_POR_TAREA):
+                    if error is None:
+                        imagenes[pendientes[ruta]] = datos
+                    else:
+                        defectuosas[pendientes[ruta]] = error
+        return imagenes, defectuosas, carpetas
+
+    def validar(self):
+        """Devuelve el manifiesto completo (sin escribirlo)"""
+        imagenes, defectuosas, carpetas = self.analizar_imagenes()
+
+        problemas = {}
+        sin_imagen = []
+        etiquetadas = set()
+        if self.archivo_etiquetas is not None:
+            # En un diario la última revisión de cada imagen es la vigente
+            vigentes = {}
+            for registro in leer_registros(self.archivo_etiquetas):
+                if isinstance(registro, dict) and isinstance(registro.get('imageName'), str):
+                    vigentes[registro['imageName']] = registro
+            for nombre, registro in vigentes.items():
+                etiquetadas.add(nombre)
+                if nombre in defectuosas:
+                    problemas[nombre] = [f"imagen ilegible: {defectuosas[nombre]}"]
+                elif nombre not in imagenes:
+                    sin_imagen.append(nombre)
+                else:
+                    problemas_imagen = problemas_registro(registro, imagenes[nombre])
+                    if problemas_imagen:
+                        problemas[nombre] = problemas_imagen
+
+        return {
+            'version': VERSION_MANIFIESTO,
+            'generado': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'carpeta': self.carpeta_imagenes,
+            'firmas_carpetas': dict(sorted(carpetas.items())),
+            'etiquetas': self.archivo_etiquetas,
+            'firma_etiquetas': firma_archivo(self.archivo_etiquetas) if self.archivo_etiquetas else None,
+            'imagenes': dict(sorted(imagenes.items())),
+            'defectuosas': dict(sorted(defectuosas.items())),
+            'problemas': dict(sorted(problemas.items())),
+            'sin_etiqueta': sorted(set(imagenes) - etiquetadas) if self.archivo_etiquetas else [],
+            'etiquetas_sin_imagen': sorted(sin_imagen)
+        }
+
+    def guardar(self, manifiesto):
+        """Escribe el manifiesto en un temporal y lo renombra; devuelve la ruta"""
+        ruta = ruta_manifiesto(self.carpeta_imagenes)
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(manifiesto, archivo, indent=1, ensure_ascii=False)
+        os.replace(temporal, ruta)
+        return ruta
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "validar":
+        # Sin argumentos se valida el dataset del juego
+        carpeta = sys.argv[2] if len(sys.argv) > 2 else "imagenes"
+        etiquetas = sys.argv[3] if len(sys.argv) > 3 else None
+        if len(sys.argv) == 2:
+            etiquetas = "etiquetas_caries.json"
+        if not os.path.isdir(carpeta):
+            print(f"❌ No se encontró la carpeta: {carpeta}/")
+            sys.exit(1)
+        if etiquetas is not None and not os.path.exists(etiquetas):
+            print(f"⚠️  No se encontró {etiquetas}: solo se validan las imágenes")
+            etiquetas = None
+
+        print("=" * 70)
+        print("🔎 VALIDACIÓN DEL DATASET")
+        print("=" * 70)
+        inicio = time.perf_counter()
+        validador = ValidadorDataset(carpeta, etiquetas)
+        manifiesto = validador.validar()
+        ruta = validador.guardar(manifiesto)
+
+        print(f"✅ {len(manifiesto['imagenes'])} imágenes válidas "
+              f"({validador.reutilizadas} sin cambios desde la última validación)")
+        for nombre, error in manifiesto['defectuosas'].items():
+            print(f"❌ Ilegible: {nombre} ({error})")
+        for nombre, problemas in manifiesto['problemas'].items():
+            print(f"⚠️  {nombre}: {', '.join(problemas)}")
+        for nombre in manifiesto['etiquetas_sin_imagen']:
+            print(f"⚠️  Etiqueta sin imagen: {nombre}")
+        if manifiesto['sin_etiqueta']:
+            print(f"ℹ️  {len(manifiesto['sin_etiqueta'])} imágenes sin etiqueta")
+        print(f"📄 Manifiesto: {ruta}")
+        print(f"⏱️  {time.perf_counter() - inicio:.1f} s con {validador.procesos} procesos")
+        print("=" * 70)
+    else:
+        print(__doc__)
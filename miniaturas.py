@@ -0,0 +1,161 @@
+"""
+CACHÉ DE MINIATURAS
+Miniaturas de la tira de imágenes de la herramienta de etiquetado. Cada una
+se genera una sola vez en un hilo de trabajo y se guarda en disco; en
+memoria solo se conservan las últimas que se han pedido. Mientras no está
+lista, obtener() devuelve None y la tira dibuja un hueco.
+
+ARCHIVO: miniaturas.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from piramide import escalar_suave
+from copias_pantalla import a_formato_pantalla
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+CARPETA_MINIATURAS = ".miniaturas"
+TAMANO_MINIATURA = (96, 72)
+CAPACIDAD_POR_DEFECTO = 600  # Miniaturas en memoria (unos 16 MB a 96x72)
+HILOS_POR_DEFECTO = 2
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class CacheMiniaturas:
+    """
+    Miniaturas con dos niveles: LRU en memoria y archivos PNG en disco. La
+    clave en disco es el hash del nombre y de su firma (p. ej. tamaño y
+    mtime), así una imagen reemplazada genera una miniatura nueva.
+
+    programar() recibe las miniaturas que hacen falta por prioridad y
+    cancela las peticiones que ya no están en la lista: al desplazar la
+    tira deprisa solo se generan las que quedan a la vista.
+    """
+
+    def __init__(self, cargar_original, firma, carpeta=CARPETA_MINIATURAS, tamano=TAMANO_MINIATURA,
+                 capacidad=CAPACIDAD_POR_DEFECTO, hilos=HILOS_POR_DEFECTO, al_terminar=None):
+        """
+        cargar_original: función nombre -> pygame.Surface de la imagen completa
+        firma: función nombre -> str que cambia si cambia el archivo
+        al_terminar: función nombre -> None que se llama desde el hilo de
+            trabajo cuando una miniatura queda lista
+        """
+        self.cargar_original = cargar_original
+        self.firma = firma
+        self.carpeta = carpeta
+        self.tamano = tuple(tamano)
+        self.capacidad = capacidad
+        self.al_terminar = al_terminar
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="miniaturas")
+
+        self.cerrojo = threading.Lock()
+        self.entradas = OrderedDict()  # nombre -> superficie, de la más antigua a la más reciente
+        self.pendientes = {}  # nombre -> Future
+        self.fallidas = set()
+        self.ultima_peticion = ()
+
+        self.leidas_de_disco = 0
+        self.creadas = 0
+
+        os.makedirs(carpeta, exist_ok=True)
+
+    def ruta(self, nombre):
+        """Archivo de la miniatura: dos niveles de carpetas para no juntar 100k archivos en una"""
+        clave = hashlib.sha1(f"{nombre}|{self.firma(nombre)}|{self.tamano}".encode('utf-8')).hexdigest()
+        return os.path.join(self.carpeta, clave[:2], clave + ".png")
+
+    def obtener(self, nombre):
+        """Miniatura de `nombre` si ya está en memoria, o None (nunca bloquea)"""
+        with self.cerrojo:
+            superficie = self.entradas.get(nombre)
+            if superficie is not None:
+                self.entradas.move_to_end(nombre)
+            return superficie
+
+    def programar(self, nombres):
+        """Pide las miniaturas de `nombres` (por prioridad) y cancela las que ya no se necesitan"""
+        nombres = tuple(nombres)
+        if nombres == self.ultima_peticion:
+            return
+        self.ultima_peticion = nombres
+        deseadas = set(nombres)
+        with self.cerrojo:
+            for nombre, futuro in list(self.pendientes.items()):
+                if nombre not in deseadas and futuro.cancel():
+                    del self.pendientes[nombre]
+            for nombre in nombres:
+                if nombre not in self.entradas and nombre not in self.pendientes and nombre not in self.fallidas:
+                    self.pendientes[nombre] = self.ejecutor.submit(self._generar, nombre)
+
+    def _generar(self, nombre):
+        """Trabajo de cada hilo: leer la miniatura de disco o crearla a partir del original"""
+        superficie = None
+        try:
+            ruta = self.ruta(nombre)
+            try:
+                superficie = pygame.image.load(ruta)
+                with self.cerrojo:
+                    self.leidas_de_disco += 1
+            except (pygame.error, OSError):
+                original = self.cargar_original(nombre)
+                ancho, alto = original.get_size()
+                escala = min(self.tamano[0] / ancho, self.tamano[1] / alto, 1.0)
+                superficie = escalar_suave(original, (max(1, int(ancho * escala)), max(1, int(alto * escala))))
+                del original
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                temporal = ruta + ".tmp"
+                with open(temporal, 'wb') as archivo:
+                    pygame.image.save(superficie, archivo, "miniatura.png")
+                os.replace(temporal, ruta)
+                with self.cerrojo:
+                    self.creadas += 1
+            superficie = a_formato_pantalla(superficie)
+        except Exception as e:
+            print(f"❌ Error creando la miniatura de {nombre}: {e}")
+            superficie = None
+
+        with self.cerrojo:
+            self.pendientes.pop(nombre, None)
+            if superficie is None:
+                self.fallidas.add(nombre)
+            else:
+                self.entradas[nombre] = superficie
+                self.entradas.move_to_end(nombre)
+                while len(self.entradas) > self.capacidad:
+                    self.entradas.popitem(last=False)
+        if self.al_terminar is not None and superficie is not None:
+            self.al_terminar(nombre)
+
+    def olvidar_fallidas(self):
+        """Permite reintentar las que fallaron (p. ej. tras revisar la carpeta)"""
+        with self.cerrojo:
+            self.fallidas.clear()
+        self.ultima_peticion = ()
+
+    def resumen(self):
+        """Texto corto para consola o depuración"""
+        with self.cerrojo:
+            return (f"Miniaturas: {len(self.entradas)}/{self.capacidad} en memoria, {len(self.pendientes)} pendientes, "
+                    f"{self.leidas_de_disco} desde disco, {self.creadas} creadas")
+
+    def cerrar(self):
+        """Cancela lo pendiente y espera a los hilos"""
+        with self.cerrojo:
+            for futuro in self.pendientes.values():
+                futuro.cancel()
+        self.ejecutor.shutdown(wait=True)
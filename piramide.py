@@ -0,0 +1,152 @@
+"""
+PIRÁMIDE DE RESOLUCIONES CON TESELAS
+Reduce cada imagen a la mitad repetidamente (mipmaps) y dibuja solo las
+teselas visibles del nivel más cercano a la escala pedida
+
+ARCHIVO: piramide.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+from collections import OrderedDict
+
+import pygame
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+TAM_TESELA = 256  # Lado de cada tesela en píxeles del nivel
+PRESUPUESTO_TESELAS = 64 * 1024 * 1024  # Bytes de teselas ya escaladas que se conservan
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def preparar_para_suavizado(superficie):
+    """smoothscale solo admite 24 o 32 bits: copia las superficies de paleta o de 16 bits"""
+    if superficie.get_bitsize() in (24, 32):
+        return superficie
+    copia = pygame.Surface(superficie.get_size(), 0, 32)
+    copia.blit(superficie, (0, 0))
+    return copia
+
+
+def reducir_mitad(superficie):
+    """Siguiente nivel de la pirámide (redondeando hacia arriba)"""
+    ancho, alto = superficie.get_size()
+    return pygame.transform.smoothscale(superficie, (max(1, (ancho + 1) // 2), max(1, (alto + 1) // 2)))
+
+
+def escalar_suave(superficie, tamano):
+    """
+    Escala `superficie` a `tamano` con smoothscale (promedia áreas al reducir,
+    sin el aliasing de transform.scale). Para imágenes que se muestran a una
+    sola escala, donde una pirámide no aporta nada.
+    """
+    return pygame.transform.smoothscale(preparar_para_suavizado(superficie), tamano)
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class PiramideImagen:
+    """
+    Niveles 0 (original), 1 (mitad), 2 (cuarto)... hasta que el nivel cabe
+    en una tesela. Para dibujar a una escala se elige el nivel más pequeño
+    que aún tiene al menos esa resolución y solo se escalan y pintan sus
+    teselas visibles; las teselas escaladas se guardan (LRU) con un
+    presupuesto de bytes fijo.
+    """
+
+    def __init__(self, superficie, tam_tesela=TAM_TESELA, presupuesto_teselas=PRESUPUESTO_TESELAS):
+        self.ancho, self.alto = superficie.get_size()
+        self.tam_tesela = tam_tesela
+        self.presupuesto_teselas = presupuesto_teselas
+
+        self.niveles = [preparar_para_suavizado(superficie)]
+        self.nivel_0_propio = self.niveles[0] is not superficie  # Copia a 32 bits de una imagen de paleta
+        while max(self.niveles[-1].get_size()) > tam_tesela:
+            self.niveles.append(reducir_mitad(self.niveles[-1]))
+
+        self.teselas = OrderedDict()  # (nivel, columna, fila, ancho, alto) -> superficie escalada
+        self.bytes_teselas = 0
+        self.desalojos = 0
+
+    def elegir_nivel(self, escala):
+        """Índice del nivel más reducido cuya resolución sigue siendo >= escala"""
+        nivel = 0
+        while nivel + 1 < len(self.niveles) and self.niveles[nivel + 1].get_width() >= self.ancho * escala:
+            nivel += 1
+        return nivel
+
+    def dibujar(self, ventana, origen, escala, recorte):
+        """
+        Dibuja la imagen a `escala` con su píxel (0, 0) en la posición de
+        pantalla `origen` (puede estar fuera de la ventana), pintando solo
+        las teselas que caen dentro del rect `recorte`.
+        """
+        indice = self.elegir_nivel(escala)
+        nivel = self.niveles[indice]
+        ancho_nivel, alto_nivel = nivel.get_size()
+        escala_x = escala * self.ancho / ancho_nivel
+        escala_y = escala * self.alto / alto_nivel
+
+        # Los bordes de las teselas se redondean respecto al origen de la imagen,
+        # así su tamaño no cambia al desplazarse y la caché sigue sirviendo
+        origen_x = round(origen[0])
+        origen_y = round(origen[1])
+        recorte = pygame.Rect(recorte)
+        t = self.tam_tesela
+        columna_min = max(0, int((recorte.left - origen_x) / escala_x) // t)
+        columna_max = min((ancho_nivel - 1) // t, int((recorte.right - origen_x) / escala_x) // t)
+        fila_min = max(0, int((recorte.top - origen_y) / escala_y) // t)
+        fila_max = min((alto_nivel - 1) // t, int((recorte.bottom - origen_y) / escala_y) // t)
+
+        for fila in range(fila_min, fila_max + 1):
+            arriba = round(fila * t * escala_y)
+            abajo = round(min((fila + 1) * t, alto_nivel) * escala_y)
+            for columna in range(columna_min, columna_max + 1):
+                izquierda = round(columna * t * escala_x)
+                derecha = round(min((columna + 1) * t, ancho_nivel) * escala_x)
+                if derecha > izquierda and abajo > arriba:
+                    tesela = self.obtener_tesela(indice, columna, fila, (derecha - izquierda, abajo - arriba))
+                    ventana.blit(tesela, (origen_x + izquierda, origen_y + arriba))
+
+    def obtener_tesela(self, indice, columna, fila, tamano):
+        """Tesela del nivel `indice` escalada a `tamano` (desde la caché si ya existe)"""
+        clave = (indice, columna, fila) + tuple(tamano)
+        tesela = self.teselas.get(clave)
+        if tesela is not None:
+            self.teselas.move_to_end(clave)
+            return tesela
+
+        nivel = self.niveles[indice]
+        t = self.tam_tesela
+        origen = pygame.Rect(columna * t, fila * t, t, t).clip(nivel.get_rect())
+        recorte = nivel.subsurface(origen)
+        if tamano[0] > origen.width:
+            tesela = pygame.transform.scale(recorte, tamano)  # Ampliando: píxeles nítidos
+        else:
+            tesela = pygame.transform.smoothscale(recorte, tamano)
+
+        self.teselas[clave] = tesela
+        self.bytes_teselas += tesela.get_pitch() * tesela.get_height()
+        while self.bytes_teselas > self.presupuesto_teselas and len(self.teselas) > 1:
+            _, vieja = self.teselas.popitem(last=False)
+            self.bytes_teselas -= vieja.get_pitch() * vieja.get_height()
+            self.desalojos += 1
+        return tesela
+
+    def bytes_niveles(self):
+        """Memoria propia de los niveles (el nivel 0 solo cuenta si es una copia del original)"""
+        niveles = self.niveles if self.nivel_0_propio else self.niveles[1:]
+        return sum(nivel.get_pitch() * nivel.get_height() for nivel in niveles)
+
+    def resumen(self):
+        """Texto corto con la memoria usada, para consola o depuración"""
+        return (f"Pirámide: {len(self.niveles)} niveles, {self.bytes_niveles() / 1048576:.1f} MB en niveles, "
+                f"teselas {self.bytes_teselas / 1048576:.1f}/{self.presupuesto_teselas / 1048576:.0f} MB "
+                f"({len(self.teselas)}, {self.desalojos} desalojos)")
@@ -0,0 +1,96 @@
+"""
+PLANIFICADOR DEL BUCLE DE EVENTOS
+Duerme en pygame.event.wait mientras la escena está quieta y solo gira a
+ritmo completo cuando hay animaciones o arrastres en curso
+
+ARCHIVO: planificador.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+from collections import Counter
+
+import pygame
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+FPS_ACTIVO = 60
+ESPERA_MAXIMA_MS = 1000  # Aunque nada cambie, el bucle se despierta al menos una vez por segundo
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class PlanificadorFrames:
+    """
+    Decide cuánto espera el bucle antes de cada frame.
+
+    - Modo activo (animación o arrastre): tick(fps_activo) y se recogen los
+      eventos pendientes, como un bucle clásico.
+    - Modo reposo: se bloquea en pygame.event.wait hasta que llega un evento
+      o vence el próximo plazo que la escena declara (reloj, parpadeo...).
+
+    En ambos modos el ritmo nunca supera fps_activo, así una ráfaga de
+    movimientos del ratón no dispara cientos de frames por segundo.
+    """
+
+    def __init__(self, fps_activo=FPS_ACTIVO, espera_maxima_ms=ESPERA_MAXIMA_MS, motivos=None):
+        """
+        motivos: dict tipo_evento -> nombre con que se cuenta ese despertar
+        (p. ej. {pygame.USEREVENT: 'temporizador'}); el resto cuenta como 'entrada'
+        """
+        self.fps_activo = fps_activo
+        self.espera_maxima_ms = espera_maxima_ms
+        self.motivos = motivos or {}
+        self.reloj = pygame.time.Clock()
+
+        self.modo = "reposo"
+        self.motivo = None
+        self.despertares = Counter()
+
+    def esperar(self, activo=False, plazo_ms=None):
+        """
+        Espera hasta el próximo frame y devuelve los eventos recibidos.
+        activo: True mientras haya animaciones o arrastres
+        plazo_ms: milisegundos hasta que la escena cambie sola (None = nunca)
+        """
+        if activo:
+            self.modo = "activo"
+            self.reloj.tick(self.fps_activo)
+            eventos = pygame.event.get()
+            motivo = self.motivo_eventos(eventos) if eventos else "animación"
+        else:
+            self.modo = "reposo"
+            espera = self.espera_maxima_ms if plazo_ms is None else min(plazo_ms, self.espera_maxima_ms)
+            evento = pygame.event.wait(max(1, int(espera)))
+            self.reloj.tick(self.fps_activo)
+            if evento.type == pygame.NOEVENT:
+                eventos = pygame.event.get()
+                motivo = self.motivo_eventos(eventos) if eventos else "plazo"
+            else:
+                eventos = [evento] + pygame.event.get()
+                motivo = self.motivo_eventos(eventos)
+
+        self.motivo = motivo
+        self.despertares[motivo] += 1
+        return eventos
+
+    def motivo_eventos(self, eventos):
+        """Nombre del despertar según el primer evento con motivo propio"""
+        for evento in eventos:
+            if evento.type in self.motivos:
+                return self.motivos[evento.type]
+        return "entrada"
+
+    def fps(self):
+        """Frames por segundo reales de los últimos frames"""
+        return self.reloj.get_fps()
+
+    def resumen(self):
+        """Texto corto para la superposición de depuración"""
+        despertares = ", ".join(f"{motivo} {n}" for motivo, n in self.despertares.most_common())
+        return f"Bucle: {self.modo} {self.fps():.0f} fps | {despertares}"
@@ -0,0 +1,134 @@
+"""
+PRECARGA DE IMÁGENES EN SEGUNDO PLANO
+Decodifica y escala las próximas imágenes en un grupo de hilos para que el
+bucle de dibujo nunca tenga que esperar al disco
+
+ARCHIVO: precarga.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+PROFUNDIDAD_POR_DEFECTO = 3  # Imágenes siguientes que se preparan por adelantado
+HILOS_POR_DEFECTO = 2
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class PrecargadorImagenes:
+    """
+    Prepara imágenes listas para mostrar en hilos de trabajo.
+
+    Cada petición es un par (nombre, vista): `vista` es cualquier valor que
+    el escalador necesite para decidir el tamaño en pantalla. Los hilos
+    solo decodifican y escalan; el hilo de dibujo recoge el resultado con
+    obtener(), que nunca bloquea.
+    """
+
+    def __init__(self, cache, escalar, profundidad=PROFUNDIDAD_POR_DEFECTO, hilos=HILOS_POR_DEFECTO, al_terminar=None):
+        """
+        cache: CacheImagenes de donde salen las superficies originales
+        escalar: función (superficie, vista) -> (superficie_escalada, escala)
+        profundidad: cuántas imágenes por delante de la actual se preparan
+        al_terminar: función (nombre, vista) -> None que se llama desde el
+            hilo de trabajo cuando una petición termina (bien o mal)
+        """
+        self.cache = cache
+        self.escalar = escalar
+        self.profundidad = profundidad
+        self.al_terminar = al_terminar
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="precarga")
+
+        self.cerrojo = threading.Lock()
+        self.pendientes = {}  # (nombre, vista) -> Future
+        self.listas = OrderedDict()  # (nombre, vista) -> (superficie_escalada, escala)
+        self.deseadas = set()  # Peticiones vigentes: lo que termina fuera de ellas no se guarda
+
+    def programar(self, peticiones):
+        """
+        Pide que se preparen `peticiones` (lista de (nombre, vista) por
+        prioridad). Lo que ya no se pide se descarta o se cancela si aún no
+        ha empezado, así la memoria queda acotada a la profundidad.
+        """
+        peticiones = list(dict.fromkeys(peticiones))[:self.profundidad + 1]
+        deseadas = set(peticiones)
+        with self.cerrojo:
+            self.deseadas = deseadas
+            for clave in list(self.listas):
+                if clave not in deseadas:
+                    del self.listas[clave]
+            for clave, futuro in list(self.pendientes.items()):
+                if clave not in deseadas and futuro.cancel():
+                    del self.pendientes[clave]
+            for clave in peticiones:
+                if clave not in self.listas and clave not in self.pendientes:
+                    self.pendientes[clave] = self.ejecutor.submit(self._preparar, clave)
+
+    def obtener(self, nombre, vista):
+        """Devuelve (superficie_escalada, escala) si ya está lista; si no, la pide y devuelve None"""
+        clave = (nombre, vista)
+        with self.cerrojo:
+            lista = self.listas.get(clave)
+            if lista is not None:
+                return lista
+            self.deseadas.add(clave)
+            if clave not in self.pendientes:
+                self.pendientes[clave] = self.ejecutor.submit(self._preparar, clave)
+        return None
+
+    def esperar(self, nombre, vista):
+        """
+        Como obtener(), pero si no está lista espera a que termine: para cuando
+        no hay nada que mostrar mientras tanto. Devuelve None si falló.
+        """
+        clave = (nombre, vista)
+        with self.cerrojo:
+            lista = self.listas.get(clave)
+            if lista is not None:
+                return lista
+            self.deseadas.add(clave)
+            futuro = self.pendientes.get(clave)
+            if futuro is None:
+                futuro = self.pendientes[clave] = self.ejecutor.submit(self._preparar, clave)
+        try:
+            # El resultado sale del propio futuro: un programar() mientras tanto podría descartarlo de `listas`
+            return futuro.result()
+        except CancelledError:
+            return None
+
+    def _preparar(self, clave):
+        """
+        Trabajo de cada hilo: decodificar (vía caché) y escalar. Una tarea
+        ya empezada no se puede cancelar; si al terminar ya no está entre
+        las peticiones vigentes, su resultado se descarta en vez de ocupar
+        memoria en `listas` hasta el siguiente programar().
+        """
+        nombre, vista = clave
+        try:
+            imagen = self.cache.obtener(nombre)
+            resultado = self.escalar(imagen, vista) if imagen is not None else None
+        except Exception as e:
+            print(f"❌ Error precargando {nombre}: {e}")
+            resultado = None
+        with self.cerrojo:
+            self.pendientes.pop(clave, None)
+            vigente = clave in self.deseadas
+            if vigente and resultado is not None:
+                self.listas[clave] = resultado
+        if self.al_terminar is not None and vigente:
+            self.al_terminar(nombre, vista)
+        return resultado
+
+    def cerrar(self):
+        """Detiene los hilos sin esperar a las tareas que no han empezado"""
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,67 @@
+"""
+MEDICIÓN DE RENDIMIENTO
+Contadores ligeros para medir el coste de cada frame sin depender de un
+perfilador externo
+
+ARCHIVO: rendimiento.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+import time
+from collections import deque
+
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def memoria_residente_mb():
+    """Memoria residente (RSS) del proceso en MB, o None si el sistema no la expone"""
+    try:
+        with open("/proc/self/status", 'r') as estado:
+            for linea in estado:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class ContadorFrames:
+    """Guarda la duración de los últimos frames y resume media y máximo"""
+
+    def __init__(self, muestras=120):
+        self.duraciones = deque(maxlen=muestras)
+        self.inicio = None
+        self.total_frames = 0
+
+    def empezar(self):
+        """Marca el inicio del trabajo de un frame"""
+        self.inicio = time.perf_counter()
+
+    def terminar(self):
+        """Marca el final del frame y guarda su duración"""
+        if self.inicio is None:
+            return
+        self.duraciones.append(time.perf_counter() - self.inicio)
+        self.inicio = None
+        self.total_frames += 1
+
+    def media_ms(self):
+        """Duración media de los últimos frames en milisegundos"""
+        if not self.duraciones:
+            return 0.0
+        return sum(self.duraciones) / len(self.duraciones) * 1000
+
+    def maximo_ms(self):
+        """Duración del frame más lento de la ventana en milisegundos"""
+        return max(self.duraciones, default=0.0) * 1000
+
+    def resumen(self):
+        """Texto corto para consola o superposición de depuración"""
+        return f"Frame: {self.media_ms():.2f} ms (máx {self.maximo_ms():.2f} ms)"
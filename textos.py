@@ -0,0 +1,77 @@
+"""
+CACHÉ DE TEXTOS RENDERIZADOS
+Guarda las superficies que devuelve Font.render para no rasterizar el mismo
+texto en cada frame; la comparten el juego y la herramienta de etiquetado
+
+ARCHIVO: textos.py
+"""
+
+# ============================================================================
+# IMPORTACIÓN DE LIBRERÍAS
+# ============================================================================
+
+from collections import OrderedDict
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+CAPACIDAD_POR_DEFECTO = 512  # Textos distintos que se conservan
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class CacheTextos:
+    """
+    Caché LRU de textos renderizados, con clave (fuente, texto, color, antialias).
+
+    Los textos fijos se rasterizan una sola vez; los dinámicos (reloj, puntos)
+    solo cuando su valor cambia, porque el nuevo valor es una clave nueva.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_POR_DEFECTO):
+        self.capacidad = capacidad
+        self.entradas = OrderedDict()  # clave -> superficie, de la más antigua a la más reciente
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def renderizar(self, fuente, texto, color, antialias=True):
+        """Equivale a fuente.render(texto, antialias, color), pero reutiliza la superficie"""
+        clave = (fuente, texto, tuple(color), antialias)
+        superficie = self.entradas.get(clave)
+        if superficie is not None:
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return superficie
+
+        self.fallos += 1
+        superficie = fuente.render(texto, antialias, color)
+        self.entradas[clave] = superficie
+        while len(self.entradas) > self.capacidad:
+            self.entradas.popitem(last=False)
+            self.desalojos += 1
+        return superficie
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+            'residentes': len(self.entradas),
+            'capacidad': self.capacidad
+        }
+
+    def resumen(self):
+        """Texto corto con las estadísticas, para consola o depuración"""
+        total = self.aciertos + self.fallos
+        tasa = (self.aciertos / total * 100) if total > 0 else 0
+        return (f"Caché textos: {tasa:.0f}% aciertos ({self.aciertos}/{total}), "
+                f"{len(self.entradas)}/{self.capacidad} textos, {self.desalojos} desalojos")
+
+
+# Instancia compartida por todas las pantallas de ambas herramientas
+CACHE_TEXTOS = CacheTextos()